@@ -0,0 +1,195 @@
+"""
+Micro-benchmark: loading a framework catalog at NIST 800-53 scale.
+
+Builds a synthetic catalog shaped like NIST 800-53 Rev 5 (20 families,
+~300 base controls, ~1,300 controls and enhancements) and compares:
+
+- legacy: json.load + get_all_controls() dicts, regrouped by category the
+  way GapAssessment used to do it on every run
+- indexed: utils/framework_loader.Framework with every function built
+  (slotted records, one shared Category per category)
+- lazy: the same Framework when only one family is looked up
+- cached: a second FrameworkRegistry lookup of an unchanged file
+- validated: what a cold start costs without a bundle (parse + schema
+  check + one family looked up)
+- bundle: a cold start from the build_frameworks.py bundle (open, read
+  the header, one family looked up; no JSON file parsed or validated)
+
+Memory is what tracemalloc still holds after the load, parsed JSON
+included.
+
+Run with: python benchmarks/bench_framework_load.py
+"""
+
+import gc
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.framework_bundle import (  # noqa: E402
+    FrameworkBundle,
+    build_bundle,
+    validate_framework,
+)
+from utils.framework_loader import (  # noqa: E402
+    Framework,
+    FrameworkRegistry,
+    get_all_controls,
+)
+
+FAMILIES = [
+    ("AC", "Access Control"), ("AT", "Awareness and Training"),
+    ("AU", "Audit and Accountability"), ("CA", "Assessment and Authorization"),
+    ("CM", "Configuration Management"), ("CP", "Contingency Planning"),
+    ("IA", "Identification and Authentication"), ("IR", "Incident Response"),
+    ("MA", "Maintenance"), ("MP", "Media Protection"),
+    ("PE", "Physical and Environmental Protection"), ("PL", "Planning"),
+    ("PM", "Program Management"), ("PS", "Personnel Security"),
+    ("PT", "PII Processing and Transparency"), ("RA", "Risk Assessment"),
+    ("SA", "System and Services Acquisition"),
+    ("SC", "System and Communications Protection"),
+    ("SI", "System and Information Integrity"),
+    ("SR", "Supply Chain Risk Management"),
+]
+
+WORDS = ("organization system information access security control policy "
+         "procedures personnel account privileged monitor audit record "
+         "review authorized defined frequency implement mechanisms "
+         "protect integrity confidentiality incident response").split()
+
+
+def make_catalog(seed: int = 7) -> dict:
+    rng = random.Random(seed)
+
+    def sentence() -> str:
+        return " ".join(rng.choice(WORDS) for _ in range(rng.randint(25, 45)))
+
+    functions = []
+    for family_id, family_name in FAMILIES:
+        categories = []
+        for n in range(1, rng.randint(10, 22) + 1):
+            base = f"{family_id}-{n}"
+            subs = [{"id": base, "description": sentence().capitalize()}]
+            for e in range(1, rng.choice([0, 1, 2, 3, 4, 6, 8]) + 1):
+                subs.append({"id": f"{base}({e})",
+                             "description": sentence().capitalize()})
+            categories.append({"id": base, "name": f"{family_name} {n}",
+                               "subcategories": subs})
+        functions.append({"id": family_id, "name": family_name,
+                          "categories": categories})
+    return {"framework": "NIST 800-53 Rev 5", "version": "5.1.1",
+            "functions": functions}
+
+
+def legacy_load(path: str):
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    controls = get_all_controls(data)
+    categories = {}
+    for ctrl in controls:
+        cat = categories.setdefault(ctrl["category_id"], {
+            "function": ctrl["function"],
+            "function_id": ctrl["function_id"],
+            "category": ctrl["category"],
+            "category_id": ctrl["category_id"],
+            "controls": [],
+        })
+        cat["controls"].append(ctrl)
+    return data, controls, categories
+
+
+def indexed_load(path: str):
+    with open(path, "rb") as f:
+        framework = Framework("NIST 800-53 Rev 5", json.loads(f.read()))
+    framework.controls  # build every function
+    return framework
+
+
+def lazy_load(path: str):
+    with open(path, "rb") as f:
+        framework = Framework("NIST 800-53 Rev 5", json.loads(f.read()))
+    framework.control("AC-2(3)")  # builds the AC family only
+    return framework
+
+
+def validated_load(path: str):
+    with open(path, "rb") as f:
+        data = json.loads(f.read())
+    assert not validate_framework(data)
+    framework = Framework("NIST 800-53 Rev 5", data)
+    framework.control("AC-2(3)")
+    return framework
+
+
+def bundle_load(bundle_path: str):
+    bundle = FrameworkBundle.open(bundle_path)
+    framework = Framework(
+        "NIST 800-53 Rev 5", bundle.entry("NIST 800-53 Rev 5")["header"],
+        loader=lambda fid: bundle.function("NIST 800-53 Rev 5", fid),
+        locator=lambda node: bundle.locate("NIST 800-53 Rev 5", node))
+    framework.control("AC-2(3)")
+    return bundle, framework
+
+
+def measure(label: str, func, *args, repeats: int = 5):
+    times = []
+    for _ in range(repeats):
+        gc.collect()
+        start = time.perf_counter()
+        func(*args)
+        times.append(time.perf_counter() - start)
+
+    gc.collect()
+    tracemalloc.start()
+    kept = func(*args)  # noqa: F841 — hold the result while measuring
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"  {label:<34}{min(times) * 1000:>10.3f} ms"
+          f"{current / 1024 / 1024:>10.2f} MiB")
+
+
+def main():
+    catalog = make_catalog()
+    n_controls = sum(len(c["subcategories"]) for f in catalog["functions"]
+                     for c in f["categories"])
+    n_categories = sum(len(f["categories"]) for f in catalog["functions"])
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "nist_800_53.json")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(catalog, f)
+        size_kib = os.path.getsize(path) / 1024
+
+        print(f"\nSynthetic NIST 800-53 catalog: {len(FAMILIES)} families, "
+              f"{n_categories} base controls, {n_controls} controls + "
+              f"enhancements, {size_kib:.0f} KiB JSON\n")
+        print(f"  {'Load':<34}{'Time':>13}{'Memory':>14}")
+        measure("legacy dicts + regrouping", legacy_load, path)
+        measure("indexed (all functions built)", indexed_load, path)
+        measure("lazy (one family looked up)", lazy_load, path)
+        measure("validated cold start", validated_load, path)
+
+        bundle_path = os.path.join(directory, "frameworks.sqlite3")
+        build_bundle({"NIST 800-53 Rev 5": path}, bundle_path)
+        measure("bundle cold start", bundle_load, bundle_path)
+
+        registry = FrameworkRegistry(directory, bundle_path="")
+        registry.framework("NIST 800-53 Rev 5")
+        measure("cached registry lookup", registry.framework,
+                "NIST 800-53 Rev 5", repeats=100)
+
+        legacy = get_all_controls(catalog)
+        framework = Framework("NIST 800-53 Rev 5", catalog)
+        records = framework.controls
+        print(f"\n  Per-control record: dict {sys.getsizeof(legacy[0])} B, "
+              f"slotted {sys.getsizeof(records[0])} B")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Micro-benchmark: JSON extraction from model responses.
+
+Compares the old trim-from-the-end fallback (one json.loads per possible
+end position, O(n^2)) with utils/json_extract.py on pathological inputs
+of roughly the size of a max_tokens=4096 reply.
+
+Run with: python benchmarks/bench_json_extract.py
+"""
+
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.json_extract import extract_json  # noqa: E402
+
+
+def legacy_parse(result: str):
+    """The previous parse_json_response fallback, kept for comparison."""
+    result = result.strip()
+    start = min(s for s in (result.find("{"), result.find("[")) if s >= 0)
+    result = result[start:]
+    try:
+        return json.loads(result)
+    except json.JSONDecodeError:
+        for end_pos in range(len(result), 0, -1):
+            try:
+                return json.loads(result[:end_pos])
+            except json.JSONDecodeError:
+                continue
+        raise ValueError("Could not parse JSON")
+
+
+def make_items(n: int) -> list:
+    return [{
+        "control_id": f"PR.AA-{i:02d}",
+        "maturity_level": "Partially Implemented",
+        "score": 3,
+        "gap_description": "MFA is enforced for admins but not for all "
+                           "users; \"break-glass\" accounts are unmanaged.",
+        "recommendation": "Roll out MFA org-wide [phase 1], then {review}.",
+    } for i in range(n)]
+
+
+def cases(n: int) -> dict:
+    complete = json.dumps(make_items(n), indent=2)
+    return {
+        "trailing prose": complete + "\n\nLet me know if you need more. " * 40,
+        "truncated array": complete[: int(len(complete) * 0.9)],
+        "truncated in string": complete[: complete.rfind("break-glass") + 5],
+        "preamble + fences": "Here is the JSON:\n```json\n" + complete + "\n```",
+    }
+
+
+def timed(fn, text: str, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        try:
+            fn(text)
+        except ValueError:
+            pass
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main():
+    import contextlib
+    import io
+
+    for n in (10, 40):
+        print(f"\n{n} items")
+        print(f"  {'case':<22}{'chars':>8}{'legacy ms':>12}{'new ms':>10}"
+              f"{'speedup':>10}")
+        for name, text in cases(n).items():
+            # The extractor prints a warning on recovery; keep output clean
+            with contextlib.redirect_stdout(io.StringIO()):
+                legacy = timed(legacy_parse, text, repeat=1)
+                new = timed(extract_json, text, repeat=20)
+            print(f"  {name:<22}{len(text):>8}{legacy * 1000:>12.2f}"
+                  f"{new * 1000:>10.3f}{legacy / new:>9.0f}x")
+
+
+if __name__ == "__main__":
+    main()
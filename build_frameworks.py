@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+GRC Automation Toolkit — Framework Bundle Builder
+===================================================
+Location: grc_toolkit/build_frameworks.py
+
+Run with: python build_frameworks.py
+
+Validates every framework file in frameworks/ against the framework
+schema (utils/schemas.FRAMEWORK_FILE, plus duplicate/empty IDs) and writes
+the bundle the loader opens at startup (config.FRAMEWORK_BUNDLE_PATH).
+The bundle is only written if every file is valid; the command exits
+non-zero otherwise, so it can gate CI or a deploy.
+
+Re-run it after editing a framework file. Until then the app notices the
+change, parses and validates that one file itself and prints a reminder.
+
+Options:
+    --check          validate only, don't write the bundle
+    --output PATH    write the bundle somewhere else
+"""
+
+import argparse
+import os
+import sys
+
+import config
+from utils.framework_bundle import build_bundle
+from utils.framework_loader import FRAMEWORK_DIR, FRAMEWORK_FILES
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Validate frameworks/*.json and build the framework bundle")
+    parser.add_argument("--check", action="store_true",
+                        help="validate only, don't write the bundle")
+    parser.add_argument("--output", default=config.FRAMEWORK_BUNDLE_PATH,
+                        help="bundle path (default: GRC_FRAMEWORK_BUNDLE or "
+                             "%(default)s)")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+
+    sources = {}
+    for name, filename in FRAMEWORK_FILES.items():
+        path = os.path.join(FRAMEWORK_DIR, filename)
+        if os.path.exists(path):
+            sources[name] = path
+        else:
+            print(f"[INFO] {name}: no {path} (will use AI knowledge)")
+
+    known = set(FRAMEWORK_FILES.values())
+    for filename in sorted(os.listdir(FRAMEWORK_DIR)):
+        if filename.endswith(".json") and filename not in known:
+            print(f"[WARN] {FRAMEWORK_DIR}/{filename} is not listed in "
+                  f"FRAMEWORK_FILES and will not be loaded")
+
+    if not sources:
+        print(f"[ERROR] No framework files found in {FRAMEWORK_DIR}/")
+        sys.exit(1)
+
+    output = None if args.check else args.output
+    result = build_bundle(sources, output)
+    counts = result.pop("_counts", None)
+
+    if result:
+        for name, errors in result.items():
+            print(f"[ERROR] {name} ({sources[name]}): {len(errors)} problem(s)")
+            for error in errors:
+                print(f"  {error}")
+        print(f"\n[ERROR] {len(result)} of {len(sources)} framework file(s) "
+              f"invalid; bundle not written")
+        sys.exit(1)
+
+    for name, count in counts.items():
+        print(f"[OK] {name}: {count} controls ({sources[name]})")
+    if args.check:
+        print(f"\n[OK] All {len(sources)} framework file(s) are valid")
+    else:
+        size = os.path.getsize(output) / 1024
+        print(f"\n[OK] Framework bundle written: {output} ({size:.0f} KiB)")
+
+
+if __name__ == "__main__":
+    main()
@@ -20,6 +20,125 @@ MODEL = "claude-sonnet-4-20250514"
 # Max tokens for responses
 MAX_TOKENS = 4096
 
+# ──────────────────────────────────────────────
+# LLM backend
+# ──────────────────────────────────────────────
+# "anthropic" (default), "openai" for any OpenAI-compatible endpoint, or
+# "fake" for offline load tests (no network, canned responses).
+LLM_BACKEND = os.getenv("GRC_LLM_BACKEND", "anthropic")
+
+# OpenAI-compatible backend (OpenAI, Azure OpenAI, vLLM, Ollama, LiteLLM...)
+OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL", "")
+OPENAI_API_KEY = os.getenv("OPENAI_API_KEY", "")
+OPENAI_MODEL = os.getenv("GRC_OPENAI_MODEL", "gpt-4o")
+
+# Fake backend — latency is lognormal around the median; 0 jitter = fixed
+FAKE_LLM_LATENCY_SECONDS = float(os.getenv("GRC_FAKE_LATENCY", "0.5"))
+FAKE_LLM_LATENCY_JITTER = float(os.getenv("GRC_FAKE_JITTER", "0.3"))
+FAKE_LLM_ERROR_RATE = float(os.getenv("GRC_FAKE_ERROR_RATE", "0.0"))
+FAKE_LLM_RATE_LIMIT_RATE = float(os.getenv("GRC_FAKE_RATE_LIMIT_RATE", "0.0"))
+FAKE_LLM_SEED = int(os.getenv("GRC_FAKE_SEED", "0"))
+
+# Maximum number of Claude requests in flight at once (process-wide).
+# Batch runs (full-framework assessments, policy suites) fan out up to this
+# many concurrent calls; raise it if your API tier allows more.
+MAX_CONCURRENT_REQUESTS = int(os.getenv("GRC_MAX_CONCURRENT_REQUESTS", "8"))
+
+# How many gap assessment categories are evaluated at once. Every call is
+# still bounded by MAX_CONCURRENT_REQUESTS and the shared rate limits.
+GAP_ASSESSMENT_WORKERS = int(os.getenv("GRC_GAP_WORKERS",
+                                       str(MAX_CONCURRENT_REQUESTS)))
+
+# Bulk gap assessment packs several small categories into one request.
+# A pack is closed when its expected output (about GAP_BULK_TOKENS_PER_CONTROL
+# per control) would exceed GAP_BULK_MAX_TOKENS, or its prompt would exceed
+# GAP_BULK_INPUT_TOKENS. Larger categories are split across requests.
+GAP_BULK_MAX_TOKENS = int(os.getenv("GRC_GAP_BULK_MAX_TOKENS", "8192"))
+GAP_BULK_TOKENS_PER_CONTROL = 250
+GAP_BULK_INPUT_TOKENS = int(os.getenv("GRC_GAP_BULK_INPUT_TOKENS", "12000"))
+
+# Rate categories answered "none" / "unknown" locally as Not Implemented
+# instead of asking Claude (engines/gap_rules.py)
+GAP_LOCAL_RULES = os.getenv("GRC_GAP_LOCAL_RULES", "1") != "0"
+
+# How much narrative the concurrent gap assessment writes:
+#   "gaps"   — compact ratings first, then gap/recommendation text only for
+#              controls scoring below 4 (default)
+#   "scores" — ratings only; narrative on demand (GapAssessment.narrate)
+#   "full"   — full narrative for every control in one pass
+GAP_DETAIL = os.getenv("GRC_GAP_DETAIL", "gaps")
+
+# Follow-up requests for controls a category response left out or got
+# wrong; only those controls are asked for again (0 = mark them failed)
+GAP_REPAIR_ATTEMPTS = int(os.getenv("GRC_GAP_REPAIR_ATTEMPTS", "1"))
+
+# Executive summary / remediation roadmap: findings larger than
+# GAP_REPORT_DIRECT_TOKENS are summarized per function first (map) from
+# compact digests of at most GAP_REPORT_CHUNK_TOKENS each, then combined
+# (reduce), so no single request grows with the framework size.
+GAP_REPORT_DIRECT_TOKENS = int(os.getenv("GRC_GAP_REPORT_DIRECT_TOKENS", "20000"))
+GAP_REPORT_CHUNK_TOKENS = 6000
+GAP_REPORT_MAP_MAX_TOKENS = 1200
+
+# ──────────────────────────────────────────────
+# Rate limits — shared by every caller in the process
+# ──────────────────────────────────────────────
+# Defaults match Anthropic's Tier 1 limits for Claude Sonnet; raise them to
+# your organization's tier. Set a value to 0 to disable that budget.
+RATE_LIMIT_REQUESTS_PER_MINUTE = int(os.getenv("GRC_RATE_LIMIT_RPM", "50"))
+RATE_LIMIT_INPUT_TOKENS_PER_MINUTE = int(os.getenv("GRC_RATE_LIMIT_ITPM", "30000"))
+RATE_LIMIT_OUTPUT_TOKENS_PER_MINUTE = int(os.getenv("GRC_RATE_LIMIT_OTPM", "8000"))
+
+# Retries for rate limits, overload and transient network errors
+LLM_MAX_RETRIES = 6
+LLM_BACKOFF_BASE_SECONDS = 2.0
+LLM_BACKOFF_MAX_SECONDS = 60.0
+
+# ──────────────────────────────────────────────
+# Response cache — identical requests are served from disk
+# ──────────────────────────────────────────────
+LLM_CACHE_ENABLED = os.getenv("GRC_LLM_CACHE", "1") == "1"
+LLM_CACHE_PATH = os.getenv("GRC_LLM_CACHE_PATH", ".cache/llm_responses.sqlite3")
+LLM_CACHE_MAX_BYTES = 256 * 1024 * 1024     # 256 MB, LRU-evicted beyond this
+LLM_CACHE_TTL_SECONDS = 30 * 24 * 60 * 60   # 30 days
+
+# ──────────────────────────────────────────────
+# Framework bundle — frameworks/*.json validated and indexed ahead of time
+# by `python build_frameworks.py`; used at startup for unchanged files
+# ──────────────────────────────────────────────
+FRAMEWORK_BUNDLE_PATH = os.getenv("GRC_FRAMEWORK_BUNDLE", ".cache/frameworks.sqlite3")
+
+# ──────────────────────────────────────────────
+# Message Batches — offline bulk runs (cheaper, not interactive)
+# ──────────────────────────────────────────────
+# "anthropic" submits to the Message Batches API; "local" is a file-based
+# stand-in that answers requests through the normal client (for testing).
+BATCH_BACKEND = os.getenv("GRC_BATCH_BACKEND", "anthropic")
+BATCH_POLL_SECONDS = 30
+BATCH_TIMEOUT_SECONDS = 24 * 60 * 60
+
+# ──────────────────────────────────────────────
+# Telemetry — one record per LLM call
+# ──────────────────────────────────────────────
+# Comma-separated sinks: "memory" (per-run summary, always on), "jsonl"
+# (append every call to TELEMETRY_JSONL_PATH), "prometheus" (node_exporter
+# textfile at TELEMETRY_PROMETHEUS_PATH).
+TELEMETRY_SINKS = os.getenv("GRC_TELEMETRY_SINKS", "memory")
+TELEMETRY_JSONL_PATH = os.getenv("GRC_TELEMETRY_JSONL",
+                                 "outputs/telemetry/llm_calls.jsonl")
+TELEMETRY_PROMETHEUS_PATH = os.getenv("GRC_TELEMETRY_PROM",
+                                      "outputs/telemetry/grc_llm.prom")
+
+# USD per million tokens, matched by model-name prefix (for cost estimates)
+LLM_PRICES = {
+    "claude-sonnet-4": {"input": 3.00, "output": 15.00,
+                        "cache_write": 3.75, "cache_read": 0.30},
+    "claude-3-5-haiku": {"input": 0.80, "output": 4.00,
+                         "cache_write": 1.00, "cache_read": 0.08},
+    "claude-3-opus": {"input": 15.00, "output": 75.00,
+                      "cache_write": 18.75, "cache_read": 1.50},
+}
+
 # ──────────────────────────────────────────────
 # Supported Frameworks
 # ──────────────────────────────────────────────
@@ -53,3 +172,10 @@ GAP_ASSESSMENT_DIR = f"{OUTPUT_DIR}/gap_assessments"
 POLICY_DIR = f"{OUTPUT_DIR}/policies"
 PROCEDURE_DIR = f"{OUTPUT_DIR}/procedures"
 REPORT_DIR = f"{OUTPUT_DIR}/reports"
+BATCH_LOCAL_DIR = f"{OUTPUT_DIR}/batches"
+GAP_CHECKPOINT_DIR = f"{GAP_ASSESSMENT_DIR}/checkpoints"
+PORTFOLIO_DIR = f"{OUTPUT_DIR}/portfolios"
+
+# Append each gap assessment answer and category result to a JSONL
+# checkpoint as it arrives (see GapAssessment.resume)
+GAP_CHECKPOINTS = os.getenv("GRC_GAP_CHECKPOINTS", "1") != "0"
@@ -16,9 +16,12 @@ class AuditReadinessAssessor:
 
     def assess_readiness(self, gap_results: list = None,
                           evidence_summary: dict = None,
-                          policy_list: list = None) -> str:
+                          policy_list: list = None,
+                          on_token=None) -> str:
         """
         Comprehensive audit readiness assessment.
+
+        Pass on_token to receive the report text incrementally as it streams.
         """
         system_prompt = f"""You are a lead auditor preparing an organization for a 
 {self.framework} audit. Assess their readiness based on the available information.
@@ -85,7 +88,8 @@ EXISTING POLICIES:
 
 Provide a comprehensive audit readiness report."""
 
-        return chat(system_prompt, user_prompt, temperature=0.3, max_tokens=4096)
+        return chat(system_prompt, user_prompt, temperature=0.3, max_tokens=4096,
+                    on_token=on_token)
 
     def generate_audit_preparation_plan(self, audit_date: str,
                                          gap_results: list = None) -> str:
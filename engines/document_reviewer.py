@@ -9,6 +9,7 @@ Upload existing policies/procedures and get AI-powered analysis:
 
 import os
 from utils.ai_client import chat, structured_output
+from utils.schemas import REVIEW_RESULT
 from datetime import datetime
 import config
 
@@ -58,7 +59,7 @@ class DocumentReviewer:
                                          framework: str) -> dict:
         """
         Review an existing policy against a compliance framework.
-        Returns structured findings.
+        Returns structured findings in the shape of schemas.REVIEW_RESULT.
         """
         system_prompt = f"""You are a senior GRC auditor reviewing an existing policy document 
 for compliance with {framework}.
@@ -113,22 +114,12 @@ DOCUMENT CONTENT:
 
 Provide your comprehensive review in JSON format."""
 
-        try:
-            result = structured_output(system_prompt, user_prompt)
-            result["document_name"] = document_name
-            result["framework"] = framework
-            result["review_date"] = datetime.now().isoformat()
-            return result
-        except Exception as e:
-            # Fall back to text response
-            text_result = chat(system_prompt, user_prompt, max_tokens=4096)
-            return {
-                "document_name": document_name,
-                "framework": framework,
-                "review_date": datetime.now().isoformat(),
-                "review": text_result,
-                "format": "text"
-            }
+        result = structured_output(system_prompt, user_prompt,
+                                   max_tokens=4096, schema=REVIEW_RESULT)
+        result["document_name"] = document_name
+        result["framework"] = framework
+        result["review_date"] = datetime.now().isoformat()
+        return result
 
     def review_policy_quality(self, document_text: str,
                                document_name: str) -> str:
@@ -8,6 +8,7 @@ import json
 import os
 from datetime import datetime
 from utils.ai_client import chat, structured_output
+from utils.schemas import EVIDENCE_ITEMS
 import config
 
 
@@ -17,11 +18,8 @@ class EvidenceTracker:
         self.framework = framework_name
         self.evidence_items = []
 
-    def generate_evidence_requirements(self, controls: list = None) -> list:
-        """
-        Generate a comprehensive list of evidence needed for each control.
-        """
-        system_prompt = f"""You are a GRC auditor preparing an evidence request list for 
+    def _evidence_system_prompt(self) -> str:
+        return f"""You are a GRC auditor preparing an evidence request list for 
 a {self.framework} assessment of {self.company['name']} ({self.company['industry']}).
 
 For each control, identify the SPECIFIC evidence artifacts an auditor would 
@@ -39,12 +37,8 @@ For each evidence item, provide:
 
 Return as a JSON array."""
 
-        if controls:
-            control_text = json.dumps(controls[:30], indent=2)  # Limit for token size
-        else:
-            control_text = f"All major controls for {self.framework}"
-
-        user_prompt = f"""Generate evidence requirements for these controls:
+    def _evidence_user_prompt(self, control_text: str) -> str:
+        return f"""Generate evidence requirements for these controls:
 
 {control_text}
 
@@ -56,27 +50,80 @@ Company context:
 Be specific about what artifacts an auditor would request.
 Return as a JSON array of evidence items."""
 
-        try:
-            results = structured_output(system_prompt, user_prompt)
-            if isinstance(results, dict):
-                results = results.get("evidence_items", results.get("evidence", [results]))
-            if not isinstance(results, list):
-                results = [results]
-
-            # Add tracking fields
-            for item in results:
-                item["status"] = "Not Collected"
-                item["collected_date"] = None
-                item["file_path"] = None
-                item["notes"] = ""
-                item["reviewer"] = None
+    @staticmethod
+    def _normalize_evidence(results: list) -> list:
+        # Add tracking fields
+        for item in results:
+            item["status"] = "Not Collected"
+            item["collected_date"] = None
+            item["file_path"] = None
+            item["notes"] = ""
+            item["reviewer"] = None
+        return results
+
+    def generate_evidence_requirements(self, controls: list = None,
+                                       use_batch: bool = False,
+                                       backend=None) -> list:
+        """
+        Generate a comprehensive list of evidence needed for each control.
 
+        With use_batch=True, ALL controls are covered (in chunks of 30,
+        submitted as one offline Message Batches job) instead of only the
+        first 30.
+        """
+        if use_batch and controls:
+            return self._generate_evidence_batch(controls, backend)
+
+        system_prompt = self._evidence_system_prompt()
+
+        if controls:
+            control_text = json.dumps(controls[:30], indent=2)  # Limit for token size
+        else:
+            control_text = f"All major controls for {self.framework}"
+
+        user_prompt = self._evidence_user_prompt(control_text)
+
+        try:
+            results = structured_output(system_prompt, user_prompt,
+                                        schema=EVIDENCE_ITEMS)
+            results = self._normalize_evidence(results)
             self.evidence_items = results
             return results
         except Exception as e:
             print(f"[ERROR] Evidence generation failed: {e}")
             return []
 
+    def _generate_evidence_batch(self, controls: list, backend=None) -> list:
+        """Evidence requirements for every control via Message Batches."""
+        from utils.batch_client import BatchJob
+
+        job = BatchJob(backend)
+        system_prompt = self._evidence_system_prompt()
+        handles = []
+        for start in range(0, len(controls), 30):
+            chunk = controls[start:start + 30]
+            handles.append(job.add_structured(
+                system_prompt,
+                self._evidence_user_prompt(json.dumps(chunk, indent=2)),
+                label=f"controls {start + 1}-{start + len(chunk)}",
+                schema=EVIDENCE_ITEMS,
+            ))
+        job.run()
+
+        items = []
+        for handle in handles:
+            try:
+                items.extend(self._normalize_evidence(handle.result()))
+            except Exception as e:
+                print(f"[ERROR] Evidence generation failed: {e}")
+
+        # Chunks number their items independently — renumber globally
+        for idx, item in enumerate(items, 1):
+            item["evidence_id"] = f"EV-{idx:03d}"
+
+        self.evidence_items = items
+        return items
+
     def update_evidence_status(self, evidence_id: str, status: str,
                                 file_path: str = None, notes: str = ""):
         """Update the collection status of an evidence item."""
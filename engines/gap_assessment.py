@@ -8,19 +8,56 @@ organization's current state against a framework's requirements.
 HOW IT WORKS:
 1. Load the framework controls
 2. For each control category, ask the user about current state
-3. Send that info to Claude for evaluation
-4. Claude returns maturity ratings, gaps, and recommendations
-5. Results are saved and can be exported
+3. Send every category to Claude for evaluation concurrently
+   (up to config.GAP_ASSESSMENT_WORKERS at a time). Answers like "none"
+   are evaluated locally by engines/gap_rules.py without a request
+4. Claude returns maturity ratings first (a compact, fast response);
+   the gap and recommendation narrative is then written concurrently for
+   controls scoring below 4, or on demand with narrate(). Controls a
+   response leaves out or gets wrong are re-requested on their own
+5. Every answer and category result is appended to a JSONL checkpoint as
+   it arrives, so an interrupted run can be resumed with
+   GapAssessment.resume(checkpoint_path); save_results() marks the
+   checkpoint complete so it is no longer offered for resuming
+6. Results are saved and can be exported; the saved file fingerprints each
+   category's answer and controls, so GapAssessment.reassess(path) only
+   re-evaluates what changed since
 """
 
+import asyncio
+import hashlib
 import json
 import os
+import re
+import threading
 from datetime import datetime
-from utils.ai_client import chat, structured_output
-from utils.framework_loader import load_framework, get_all_controls
+from utils.ai_client import (
+    chat,
+    achat,
+    structured_output,
+    astructured_output,
+    run_sync,
+    iterate_sync,
+    gather_limited,
+)
+from utils.rate_limiter import estimate_tokens
+from utils.text_router import TextRouter, category_profiles
+from engines.gap_rules import (
+    classify_answer,
+    evaluate_locally,
+    is_not_applicable,
+)
+from utils.framework_loader import get_framework
+from utils.schemas import (
+    GAP_RESULTS, GAP_SCORES, GAP_NARRATIVES, SchemaValidationError,
+)
 import config
 
 
+def _sha256(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
 class GapAssessment:
     """
     Runs a gap assessment for a company against a framework.
@@ -43,15 +80,361 @@ class GapAssessment:
         """
         self.company = company_info
         self.framework_name = framework_name
-        self.framework_data = load_framework(framework_name)
-        self.controls = get_all_controls(self.framework_data)
+        # Indexed once per process (see utils/framework_loader.py)
+        self.framework = get_framework(framework_name)
+        self.controls = self.framework.controls
         self.results = []
         self.timestamp = datetime.now().isoformat()
 
-    def run_interactive_assessment(self) -> list:
+        # Checkpoint state (see _checkpoint and resume)
+        self.checkpoint_path = None
+        self._checkpoint_lock = threading.Lock()
+        self._answers = {}      # category_id -> answer already checkpointed
+        self._completed = {}    # category_id -> results from a checkpoint
+
+        # Incremental re-assessment state (see reassess)
+        self._fingerprints = {}  # category_id -> answer + hashes, for saving
+        self._prior = {}         # category_id -> fingerprint + results
+        self._carried = []       # categories carried forward unchanged
+
+    @property
+    def framework_data(self):
+        """The framework file as a read-only mapping."""
+        return self.framework.data
+
+    def _file_stem(self) -> str:
+        """Filesystem-safe "<company>_<framework>" for output file names."""
+        safe_company = self.company["name"].replace(" ", "_").replace("/", "_")
+        safe_framework = self.framework_name.replace(" ", "_").replace(":", "")
+        return f"{safe_company}_{safe_framework}"
+
+    # ────────────────────────────────────────────
+    # Checkpointing
+    # ────────────────────────────────────────────
+    def _checkpoint(self, record: dict):
+        """
+        Append one record to this assessment's JSONL checkpoint, creating
+        the file (with a header line) on first use. Safe to call from the
+        client's event loop thread.
+        """
+        if not config.GAP_CHECKPOINTS:
+            return
+        with self._checkpoint_lock:
+            if self.checkpoint_path is None:
+                self.checkpoint_path = self._new_checkpoint_file()
+                self._append_checkpoint_line({
+                    "type": "header",
+                    "company": self.company,
+                    "framework": self.framework_name,
+                    "timestamp": self.timestamp,
+                })
+                print(f"  [INFO] Checkpointing to {self.checkpoint_path}")
+            self._append_checkpoint_line(record)
+
+    def _new_checkpoint_file(self) -> str:
+        """
+        Create an empty, uniquely named checkpoint file. Assessments of the
+        same company and framework started at the same moment (web
+        sessions, batch runs) each get their own file.
+        """
+        os.makedirs(config.GAP_CHECKPOINT_DIR, exist_ok=True)
+        stamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+        base = os.path.join(config.GAP_CHECKPOINT_DIR,
+                            f"gap_checkpoint_{self._file_stem()}_{stamp}")
+        path, attempt = f"{base}.jsonl", 1
+        while True:
+            try:
+                with open(path, "x", encoding="utf-8"):
+                    return path
+            except FileExistsError:
+                attempt += 1
+                path = f"{base}_{attempt}.jsonl"
+
+    def _append_checkpoint_line(self, record: dict):
+        with open(self.checkpoint_path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    def _checkpoint_answer(self, cat_data: dict, answer: str):
+        """Record a category's answer once, before it is evaluated."""
+        cat_id = cat_data["category_id"]
+        self._fingerprints[cat_id] = self._fingerprint(cat_data, answer)
+        if self._answers.get(cat_id) == answer:
+            return
+        self._answers[cat_id] = answer
+        self._checkpoint({
+            "type": "answer",
+            "category_id": cat_id,
+            "category": cat_data["category"],
+            "answer": answer,
+        })
+
+    def _checkpoint_results(self, cat_id: str, results: list):
+        self._checkpoint({
+            "type": "results",
+            "category_id": cat_id,
+            "failed": self._is_failed(results),
+            "results": results,
+        })
+
+    @staticmethod
+    def _is_failed(results: list) -> bool:
+        """True if any control holds a failed-call placeholder (score 0)."""
+        return any(r.get("maturity") == "Not Assessed" and r.get("score") == 0
+                   for r in results)
+
+    def _mark_checkpoint_complete(self, results_path: str):
+        """Mark the checkpoint finished once its results are saved."""
+        if self.checkpoint_path is None:
+            return
+        with self._checkpoint_lock:
+            self._append_checkpoint_line({
+                "type": "complete",
+                "results_path": results_path,
+                "timestamp": datetime.now().isoformat(),
+            })
+
+    @staticmethod
+    def is_checkpoint_complete(checkpoint_path: str) -> bool:
+        """
+        True if the checkpoint's last record is a "complete" marker, i.e.
+        its results were saved and nothing was added since. Reads only the
+        end of the file.
+        """
+        try:
+            with open(checkpoint_path, "rb") as f:
+                f.seek(0, os.SEEK_END)
+                f.seek(max(0, f.tell() - 4096))
+                tail = f.read().decode("utf-8", errors="ignore")
+        except OSError:
+            return False
+        lines = [line for line in tail.splitlines() if line.strip()]
+        if not lines:
+            return False
+        try:
+            return json.loads(lines[-1]).get("type") == "complete"
+        except (json.JSONDecodeError, AttributeError):
+            return False
+
+    @staticmethod
+    def read_checkpoint(checkpoint_path: str) -> dict:
+        """
+        Parse a checkpoint file.
+
+        Returns:
+        --------
+        dict : header, answers (category_id -> answer), labels
+               (category_id -> name), results (category_id -> the latest
+               successful results) and complete (the "complete" record if
+               the results were saved and nothing was added since, else
+               None). A line cut off by a crash is ignored.
+        """
+        state = {"header": None, "answers": {}, "labels": {}, "results": {},
+                 "complete": None}
+        with open(checkpoint_path, "r", encoding="utf-8") as f:
+            for line_no, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    print(f"  [WARN] Ignoring unreadable checkpoint line "
+                          f"{line_no} in {checkpoint_path}")
+                    continue
+                kind = record.get("type")
+                if kind == "complete":
+                    state["complete"] = record
+                    continue
+                if kind != "header":
+                    state["complete"] = None
+                if kind == "header":
+                    state["header"] = record
+                elif kind == "answer":
+                    state["answers"][record["category_id"]] = record["answer"]
+                    state["labels"][record["category_id"]] = record["category"]
+                elif kind == "results":
+                    if record.get("failed"):
+                        state["results"].pop(record["category_id"], None)
+                    else:
+                        state["results"][record["category_id"]] = \
+                            record["results"]
+        if state["header"] is None:
+            raise ValueError(f"Not a gap assessment checkpoint: "
+                             f"{checkpoint_path}")
+        return state
+
+    @classmethod
+    def resume(cls, checkpoint_path: str, interactive: bool = False,
+               max_workers: int = None, on_progress=None):
+        """
+        Continue an interrupted assessment from its checkpoint.
+
+        Categories with results are kept as they are; answered categories
+        that are missing results or failed (the "Not Assessed"
+        placeholders) are evaluated again. New results are appended to
+        the same checkpoint.
+
+        Parameters:
+        -----------
+        checkpoint_path : str
+            A gap_checkpoint_*.jsonl file.
+
+        interactive : bool
+            Ask for the categories that were never answered (CLI). Otherwise
+            only the answered categories are assessed.
+
+        Returns:
+        --------
+        GapAssessment : The assessment, with .results filled in.
+        """
+        state = cls.read_checkpoint(checkpoint_path)
+        if state["complete"] is not None:
+            raise ValueError(f"Checkpoint {checkpoint_path} is complete; its "
+                             f"results were saved to "
+                             f"{state['complete'].get('results_path')}")
+        header = state["header"]
+        assessment = cls(header["company"], header["framework"])
+        assessment.timestamp = header["timestamp"]
+        assessment.checkpoint_path = checkpoint_path
+        assessment._answers = dict(state["answers"])
+        assessment._completed = dict(state["results"])
+
+        redo = [c for c, answer in state["answers"].items()
+                if c not in state["results"] and answer.lower() != "skip"
+                and not is_not_applicable(answer)]
+        print(f"  [INFO] Resuming {checkpoint_path}: "
+              f"{len(state['results'])} categories done, "
+              f"{len(redo)} to (re)assess.")
+
+        if interactive and assessment.controls:
+            assessment.run_interactive_assessment()
+        else:
+            assessment.run_assessment(state["answers"],
+                                      labels=state["labels"],
+                                      max_workers=max_workers,
+                                      on_progress=on_progress)
+        return assessment
+
+    # ────────────────────────────────────────────
+    # Incremental re-assessment
+    # ────────────────────────────────────────────
+    @staticmethod
+    def _fingerprint(cat_data: dict, answer: str) -> dict:
+        """Answer plus hashes of the answer text and the category's controls."""
+        controls = [[c["control_id"], c["description"]]
+                    for c in cat_data["controls"]]
+        return {
+            "category": cat_data["category"],
+            "answer": answer,
+            "input_hash": _sha256(" ".join(answer.split())),
+            "controls_hash": _sha256(json.dumps(controls)),
+        }
+
+    def _carry_forward(self, cat_data: dict, answer: str) -> bool:
+        """
+        Reuse the prior result for a category whose answer and controls
+        are unchanged (see reassess). Returns True if it was carried over.
+        """
+        cat_id = cat_data["category_id"]
+        prior = self._prior.get(cat_id)
+        if cat_id in self._completed or prior is None:
+            return False
+        current = self._fingerprint(cat_data, answer)
+        if (prior["input_hash"] != current["input_hash"]
+                or prior["controls_hash"] != current["controls_hash"]):
+            return False
+        self._completed[cat_id] = prior["results"]
+        self._carried.append(cat_id)
+        self._checkpoint_results(cat_id, prior["results"])
+        return True
+
+    @classmethod
+    def reassess(cls, prior_path: str, states: dict = None,
+                 interactive: bool = False, max_workers: int = None,
+                 on_progress=None):
+        """
+        Update a saved assessment after some answers changed.
+
+        Categories whose answer, controls and framework version match the
+        prior run are carried forward unchanged; only the rest are sent to
+        Claude, so a re-run costs in proportion to what changed.
+
+        Parameters:
+        -----------
+        prior_path : str
+            A gap_assessment_*.json file written by save_results().
+
+        states : dict, optional
+            Revised answers (category_id or function_id -> text). Every
+            other category keeps its prior answer.
+
+        interactive : bool
+            Walk through the categories in the CLI, showing each prior
+            answer; pressing Enter keeps it.
+
+        Returns:
+        --------
+        GapAssessment : The updated assessment, with .results filled in.
+        """
+        with open(prior_path, "r", encoding="utf-8") as f:
+            prior = json.load(f)
+        meta = prior.get("metadata", {})
+        assessment = cls(meta["company"], meta["framework"])
+
+        prior_categories = meta.get("categories") or {}
+        version = assessment.framework.version
+        if not prior_categories:
+            print("  [WARN] The prior file has no category fingerprints "
+                  "(saved by an older version); every category will be "
+                  "re-assessed.")
+        elif meta.get("framework_version") != version:
+            print(f"  [INFO] Framework version changed "
+                  f"({meta.get('framework_version')} → {version}); every "
+                  f"category will be re-assessed.")
+        else:
+            prior_results = {}
+            for r in prior.get("results", []):
+                prior_results.setdefault(r.get("category_id"), []).append(r)
+            assessment._prior = {
+                cat_id: dict(info, results=prior_results[cat_id])
+                for cat_id, info in prior_categories.items()
+                if cat_id in prior_results
+                and not cls._is_failed(prior_results[cat_id])
+            }
+
+        answers = {cat_id: info["answer"]
+                   for cat_id, info in prior_categories.items()}
+        labels = {cat_id: info["category"]
+                  for cat_id, info in prior_categories.items()}
+
+        if interactive and assessment.controls:
+            assessment.run_interactive_assessment(previous=answers)
+        else:
+            # Expand revised answers (function IDs, "none") per category
+            # so they take precedence over the prior ones
+            for cat_data, current_state in assessment._plan_categories(
+                    states or {}, labels):
+                answers[cat_data["category_id"]] = current_state or "skip"
+            assessment.run_assessment(answers, labels=labels,
+                                      max_workers=max_workers,
+                                      on_progress=on_progress)
+
+        answered = [a for a in assessment._answers.values() if a != "skip"]
+        print(f"  [INFO] Re-assessment: {len(assessment._carried)} categories "
+              f"carried forward, "
+              f"{len(answered) - len(assessment._carried)} re-evaluated.")
+        return assessment
+
+    def run_interactive_assessment(self, previous: dict = None) -> list:
         """
         Run the assessment interactively — asks you questions about each
-        control area, then Claude evaluates the gaps.
+        control area, then Claude evaluates all of them concurrently.
+
+        Parameters:
+        -----------
+        previous : dict, optional
+            category_id -> prior answer, shown as the default (see reassess).
 
         Returns:
         --------
@@ -69,25 +452,19 @@ class GapAssessment:
             return self._run_ai_only_assessment()
 
         # Group controls by category
-        categories = {}
-        for ctrl in self.controls:
-            cat_key = ctrl["category_id"]
-            if cat_key not in categories:
-                categories[cat_key] = {
-                    "function": ctrl["function"],
-                    "function_id": ctrl["function_id"],
-                    "category": ctrl["category"],
-                    "category_id": ctrl["category_id"],
-                    "controls": [],
-                }
-            categories[cat_key]["controls"].append(ctrl)
+        categories = self._group_by_category()
 
         total_categories = len(categories)
         current_cat = 0
+        states = {}
 
-        # Go through each category
+        # Collect the current state for every category first
         for cat_id, cat_data in categories.items():
             current_cat += 1
+            if cat_id in self._answers:
+                # Answered before an interrupted run (see resume)
+                states[cat_id] = self._answers[cat_id]
+                continue
             print(f"\n{'─'*60}")
             print(f"  [{current_cat}/{total_categories}] "
                   f"{cat_data['function_id']}: {cat_data['function']}")
@@ -102,43 +479,37 @@ class GapAssessment:
             # Ask user about current state
             print(f"\n  Describe your CURRENT state for this area.")
             print(f"  (What tools, processes, policies, controls exist?)")
-            print(f"  (Type 'skip' to skip, 'none' if nothing exists)")
+            print(f"  (Type 'skip' or 'N/A' to skip, 'none' if nothing exists)")
+            if previous and cat_id in previous:
+                print(f"\n  Previous answer: {previous[cat_id][:500]}")
+                print(f"  (Press Enter to keep it)")
             print()
 
-            current_state = input("  Your answer: ").strip()
-
-            # Handle skip
-            if current_state.lower() == "skip":
-                for ctrl in cat_data["controls"]:
-                    self.results.append({
-                        "control_id": ctrl["control_id"],
-                        "control_description": ctrl["description"],
-                        "function": ctrl["function"],
-                        "function_id": ctrl["function_id"],
-                        "category": ctrl["category"],
-                        "category_id": ctrl["category_id"],
-                        "maturity": "Not Assessed",
-                        "score": None,
-                        "current_state_assessment": "Skipped by assessor",
-                        "gap": "Not assessed",
-                        "recommendations": "Needs manual assessment",
-                        "priority": "N/A",
-                        "estimated_effort": "N/A",
-                    })
+            states[cat_id] = input("  Your answer: ").strip()
+            if not states[cat_id] and previous and cat_id in previous:
+                states[cat_id] = previous[cat_id]
+            if states[cat_id]:
+                self._checkpoint_answer(cat_data, states[cat_id])
+            if (states[cat_id].lower() == "skip"
+                    or is_not_applicable(states[cat_id])):
                 print("  ⏩ Skipped.")
-                continue
-
-            if current_state.lower() == "none":
-                current_state = "Nothing exists. No tools, no processes, no policies, no controls in this area."
 
-            # Send to Claude for evaluation
-            print("\n  🤖 Analyzing with Claude...")
-            assessment_results = self._evaluate_category(cat_data, current_state)
-            self.results.extend(assessment_results)
-
-            # Show results
-            print("\n  Results:")
-            for item in assessment_results:
+        # Then evaluate them all at once
+        answered = [k for k, v in states.items()
+                    if v and v.lower() != "skip" and not is_not_applicable(v)
+                    and k not in self._completed]
+        trivial = [k for k in answered
+                   if config.GAP_LOCAL_RULES and classify_answer(states[k])]
+        if trivial:
+            print(f"\n  ⚡ {len(trivial)} categories with nothing in place "
+                  f"are rated locally.")
+        print(f"\n  🤖 Analyzing {len(answered) - len(trivial)} categories "
+              f"with Claude (up to {config.GAP_ASSESSMENT_WORKERS} at a time)...")
+
+        def _show(event):
+            print(f"\n  [{event['completed']}/{event['total']}] "
+                  f"{event['category_id']}: {event['category']}")
+            for item in event["results"]:
                 icon = {
                     "Fully Implemented": "✅",
                     "Largely Implemented": "🟢",
@@ -151,6 +522,8 @@ class GapAssessment:
                 print(f"    {icon} {item.get('control_id', 'N/A')}: "
                       f"{item.get('maturity', 'Unknown')} ({score}/5)")
 
+        self.run_assessment(states, on_progress=_show)
+
         print(f"\n{'='*60}")
         print(f"  Assessment complete! {len(self.results)} controls assessed.")
         print(f"{'='*60}")
@@ -206,35 +579,16 @@ Assess at least 20 key controls. Return as a JSON array."""
 
         try:
             results = structured_output(system_prompt, user_prompt,
-                                        max_tokens=4096)
-            if isinstance(results, dict):
-                results = results.get("assessments", results.get("controls", [results]))
-            if not isinstance(results, list):
-                results = [results]
+                                        max_tokens=4096, schema=GAP_RESULTS)
             self.results = results
             return results
         except Exception as e:
             print(f"[ERROR] Assessment failed: {e}")
             return []
 
-    def _evaluate_category(self, category_data: dict,
-                           current_state: str) -> list:
-        """
-        Send a control category to Claude for evaluation.
-
-        Parameters:
-        -----------
-        category_data : dict
-            The category info including its controls.
-
-        current_state : str
-            The user's description of their current state for this area.
-
-        Returns:
-        --------
-        list : Assessment results for each control in the category.
-        """
-        system_prompt = f"""You are an expert GRC consultant performing a gap assessment 
+    def _assessor_context(self) -> str:
+        """Shared start of the category prompts: role, company, maturity scale."""
+        return f"""You are an expert GRC consultant performing a gap assessment 
 against {self.framework_name} for the following organization:
 
 Company: {self.company['name']}
@@ -250,7 +604,25 @@ MATURITY LEVELS (use these exactly):
 - "Minimally Implemented" (Score: 2) — Ad hoc, inconsistent, reactive
 - "Partially Implemented" (Score: 3) — Defined but not fully deployed or enforced
 - "Largely Implemented" (Score: 4) — Implemented with minor gaps
-- "Fully Implemented" (Score: 5) — Fully operational, monitored, and continuously improved
+- "Fully Implemented" (Score: 5) — Fully operational, monitored, and continuously improved"""
+
+    def _category_system_prompt(self, compact: bool = False) -> str:
+        """
+        System prompt for category evaluation (same for every category).
+        With compact=True only the ratings are requested.
+        """
+        if compact:
+            return self._assessor_context() + """
+
+For each control, respond with a JSON array of objects. Each object must have
+ONLY these fields (no explanations):
+- control_id: string
+- maturity: string (one of the levels above, exactly as written)
+- score: integer (1-5)
+- priority: string ("Critical", "High", "Medium", or "Low")
+- estimated_effort: string ("Quick Win", "Short-term", "Medium-term", or "Long-term")"""
+
+        return self._assessor_context() + """
 
 For each control, respond with a JSON array of objects. Each object must have:
 - control_id: string
@@ -263,12 +635,15 @@ For each control, respond with a JSON array of objects. Each object must have:
 - priority: string ("Critical", "High", "Medium", or "Low")
 - estimated_effort: string ("Quick Win", "Short-term", "Medium-term", or "Long-term")"""
 
+    def _category_user_prompt(self, category_data: dict,
+                              current_state: str) -> str:
+        """User prompt listing one category's controls and current state."""
         controls_text = "\n".join(
             [f"- {c['control_id']}: {c['description']}"
              for c in category_data["controls"]]
         )
 
-        user_prompt = f"""Assess these controls in the "{category_data['category']}" category:
+        return f"""Assess these controls in the "{category_data['category']}" category:
 
 CONTROLS:
 {controls_text}
@@ -278,70 +653,861 @@ ORGANIZATION'S CURRENT STATE FOR THIS AREA:
 
 Return your assessment as a JSON array with one object per control."""
 
-        try:
-            results = structured_output(system_prompt, user_prompt)
-
-            # Handle various response formats Claude might use
-            if isinstance(results, dict):
-                # Claude might wrap it in a key
-                for key in ["assessments", "controls", "results", "data"]:
-                    if key in results:
-                        results = results[key]
-                        break
-                else:
-                    # Single result, wrap in list
-                    results = [results]
+    def _narrative_system_prompt(self) -> str:
+        """System prompt for explaining ratings made in the compact pass."""
+        return self._assessor_context() + """
 
-            if not isinstance(results, list):
-                results = [results]
+Each control below has ALREADY been rated. Do not change the ratings;
+explain them. For each control, respond with a JSON array of objects.
+Each object must have:
+- control_id: string
+- current_state_assessment: string (what they currently have based on their description)
+- gap: string (what's missing or needs improvement to reach the next level)
+- recommendations: string (specific, actionable steps to close the gap)"""
 
-            # Add category metadata to each result
-            for item in results:
-                item["function"] = category_data["function"]
-                item["function_id"] = category_data["function_id"]
-                item["category"] = category_data["category"]
-                item["category_id"] = category_data["category_id"]
+    def _narrative_user_prompt(self, items: list, current_state: str) -> str:
+        """User prompt listing rated controls of one category."""
+        controls_text = "\n".join(
+            f"- {r['control_id']}: {r.get('control_description', '')} "
+            f"(rated {r['maturity']}, {r['score']}/5)"
+            for r in items
+        )
+        return f"""Explain these ratings in the "{items[0]['category']}" category:
 
-            return results
+CONTROLS:
+{controls_text}
+
+ORGANIZATION'S CURRENT STATE FOR THIS AREA:
+{current_state}
+
+Return a JSON array with one object per control."""
+
+    def _finalize_category_results(self, category_data: dict,
+                                   results: list) -> list:
+        """Attach category metadata to schema-validated results."""
+        descriptions = {c["control_id"]: c["description"]
+                        for c in category_data["controls"]}
+        for item in results:
+            if item.get("control_id") in descriptions:
+                item.setdefault("control_description",
+                                descriptions[item["control_id"]])
+            item["function"] = category_data["function"]
+            item["function_id"] = category_data["function_id"]
+            item["category"] = category_data["category"]
+            item["category_id"] = category_data["category_id"]
+
+        return results
+
+    def _failed_category_results(self, category_data: dict,
+                                 current_state: str, error) -> list:
+        """Placeholder results so a failed category isn't lost."""
+        return [{
+            "control_id": c["control_id"],
+            "control_description": c["description"],
+            "function": category_data["function"],
+            "function_id": category_data["function_id"],
+            "category": category_data["category"],
+            "category_id": category_data["category_id"],
+            "maturity": "Not Assessed",
+            "score": 0,
+            "current_state_assessment": current_state,
+            "gap": f"Automated assessment failed: {error}",
+            "recommendations": "Requires manual assessment",
+            "priority": "High",
+            "estimated_effort": "Unknown",
+        } for c in category_data["controls"]]
+
+    def _skipped_category_results(self, category_data: dict) -> list:
+        """Placeholder results for a category the assessor skipped."""
+        return [{
+            "control_id": c["control_id"],
+            "control_description": c["description"],
+            "function": category_data["function"],
+            "function_id": category_data["function_id"],
+            "category": category_data["category"],
+            "category_id": category_data["category_id"],
+            "maturity": "Not Assessed",
+            "score": None,
+            "current_state_assessment": "Skipped by assessor",
+            "gap": "Not assessed",
+            "recommendations": "Needs manual assessment",
+            "priority": "N/A",
+            "estimated_effort": "N/A",
+        } for c in category_data["controls"]]
+
+    @staticmethod
+    def _adhoc_category(cat_id: str, name: str) -> dict:
+        """
+        A one-control category for an ID that isn't in the framework file,
+        so Claude assesses the area from its own knowledge.
+        """
+        return {
+            "function": cat_id,
+            "function_id": cat_id,
+            "category": name,
+            "category_id": cat_id,
+            "controls": [{
+                "control_id": f"{cat_id}-GEN",
+                "description": name,
+            }],
+        }
+
+    @staticmethod
+    def _local_results(category_data: dict, current_state: str) -> list:
+        """Rule-based results for trivial answers, or None (see gap_rules)."""
+        if not config.GAP_LOCAL_RULES:
+            return None
+        return evaluate_locally(category_data, current_state)
+
+    async def _aevaluate_category(self, category_data: dict,
+                                  current_state: str,
+                                  compact: bool = False,
+                                  max_tokens: int = None) -> list:
+        """
+        Async version of _evaluate_category(). With compact=True only the
+        ratings are requested; the narrative fields are left empty and the
+        results marked narrative_pending (see narrate). max_tokens
+        overrides config.MAX_TOKENS for categories sized for a larger
+        response (bulk packs).
+        """
+        local = self._local_results(category_data, current_state)
+        if local is not None:
+            return local
 
+        system_prompt = self._category_system_prompt(compact)
+        user_prompt = self._category_user_prompt(category_data, current_state)
+        schema = GAP_SCORES if compact else GAP_RESULTS
+
+        try:
+            # Not marked for prompt caching: tools + system prompt come to
+            # ~450-600 tokens, under the 1,024-token cacheable minimum
+            items = await self._arequest_items(system_prompt, user_prompt,
+                                               schema, max_tokens=max_tokens)
         except Exception as e:
             print(f"  [ERROR] Failed to assess {category_data['category_id']}: {e}")
             # Return placeholder results so we don't lose the category
-            return [{
-                "control_id": c["control_id"],
-                "control_description": c["description"],
-                "function": category_data["function"],
-                "function_id": category_data["function_id"],
-                "category": category_data["category"],
-                "category_id": category_data["category_id"],
-                "maturity": "Not Assessed",
-                "score": 0,
-                "current_state_assessment": current_state,
-                "gap": f"Automated assessment failed: {e}",
-                "recommendations": "Requires manual assessment",
-                "priority": "High",
-                "estimated_effort": "Unknown",
-            } for c in category_data["controls"]]
-
-    def generate_executive_summary(self) -> str:
-        """Generate an executive summary of the entire assessment."""
-
-        # Calculate statistics
-        total = len(self.results)
-        assessed = [r for r in self.results
-                    if r.get("score") and r.get("score") > 0]
-        avg_score = (sum(r["score"] for r in assessed) / len(assessed)
-                     if assessed else 0)
+            return self._failed_category_results(category_data,
+                                                 current_state, e)
 
-        maturity_counts = {}
-        priority_counts = {}
+        return await self._assemble_category(category_data, current_state,
+                                             items, compact, max_tokens)
+
+    # Index of the array item a schema error is about: "$[3].score" -> 3
+    _ITEM_ERROR = re.compile(r"^\$\[(\d+)\]")
+
+    @classmethod
+    def _valid_items(cls, error: SchemaValidationError) -> list:
+        """The items of a response that failed validation which are valid."""
+        if not isinstance(error.instance, list):
+            return []
+        bad = set()
+        for message in error.errors:
+            match = cls._ITEM_ERROR.match(message)
+            if match is None:
+                return []  # the array itself is wrong
+            bad.add(int(match.group(1)))
+        return [item for i, item in enumerate(error.instance)
+                if i not in bad]
+
+    async def _arequest_items(self, system_prompt: str, user_prompt: str,
+                              schema: dict, max_tokens: int = None) -> list:
+        """
+        astructured_output() for control arrays that keeps whatever is
+        usable: on a schema mismatch the valid items are returned, and an
+        unparseable answer gives no items. API errors still raise.
+        """
+        try:
+            return await astructured_output(
+                system_prompt, user_prompt, max_tokens=max_tokens,
+                schema=schema)
+        except SchemaValidationError as e:
+            items = self._valid_items(e)
+            print(f"  [WARN] {len(e.errors)} schema error(s) in response; "
+                  f"kept {len(items)} valid item(s)")
+            return items
+        except ValueError as e:
+            print(f"  [WARN] Unparseable response: {str(e)[:120]}")
+            return []
+
+    @staticmethod
+    def _reconcile(controls: list, items: list) -> tuple:
+        """
+        Match returned items to the requested controls.
+
+        Returns:
+        --------
+        tuple : (dict control_id -> first item for it, list of controls
+                 with no item). Items for controls that weren't asked for
+                 are dropped.
+        """
+        wanted = {c["control_id"] for c in controls}
+        by_id = {}
+        for item in items:
+            control_id = str(item.get("control_id", "")).strip()
+            if control_id in wanted and control_id not in by_id:
+                item["control_id"] = control_id
+                by_id[control_id] = item
+        missing = [c for c in controls if c["control_id"] not in by_id]
+        return by_id, missing
+
+    async def _assemble_category(self, category_data: dict,
+                                 current_state: str, items: list,
+                                 compact: bool = False,
+                                 max_tokens: int = None) -> list:
+        """
+        Reconcile a category's response with its controls, re-request only
+        the controls that are missing or invalid (config.GAP_REPAIR_ATTEMPTS
+        follow-up calls, with the same max_tokens) and merge, in framework
+        order. Controls still missing after that get failed placeholders.
+        """
+        controls = category_data["controls"]
+        by_id, missing = self._reconcile(controls, items)
+        error = "control missing from the response"
+
+        for _ in range(config.GAP_REPAIR_ATTEMPTS):
+            if not missing:
+                break
+            print(f"  [INFO] Re-requesting {len(missing)} of {len(controls)} "
+                  f"controls in {category_data['category_id']}...")
+            subset = dict(category_data, controls=missing)
+            try:
+                retry_items = await self._arequest_items(
+                    self._category_system_prompt(compact),
+                    self._category_user_prompt(subset, current_state),
+                    GAP_SCORES if compact else GAP_RESULTS,
+                    max_tokens=max_tokens)
+            except Exception as e:
+                error = e
+                break
+            repaired, missing = self._reconcile(missing, retry_items)
+            by_id.update(repaired)
+
+        found = self._finalize_category_results(category_data,
+                                                list(by_id.values()))
+        if compact:
+            for item in found:
+                for field in self._NARRATIVE_FIELDS:
+                    item.setdefault(field, "")
+                item["narrative_pending"] = True
+        if missing:
+            print(f"  [ERROR] {len(missing)} control(s) in "
+                  f"{category_data['category_id']} could not be assessed")
+            failed = self._failed_category_results(
+                dict(category_data, controls=missing), current_state, error)
+            by_id.update((r["control_id"], r) for r in failed)
+
+        return [by_id[c["control_id"]] for c in controls]
+
+    _NARRATIVE_FIELDS = ("current_state_assessment", "gap", "recommendations")
+
+    async def _anarrate_category(self, items: list, current_state: str) -> list:
+        """Write the narrative for rated controls of one category."""
+        try:
+            return await astructured_output(
+                self._narrative_system_prompt(),
+                self._narrative_user_prompt(items, current_state),
+                schema=GAP_NARRATIVES)
+        except Exception as e:
+            print(f"  [ERROR] Failed to write findings for "
+                  f"{items[0]['category_id']}: {e}")
+            return []
+
+    def narrate(self, control_ids: list = None, max_workers: int = None,
+                on_progress=None) -> int:
+        """
+        Fill in current_state_assessment / gap / recommendations for
+        results rated in the compact pass, one request per category, all
+        categories concurrently.
+
+        Parameters:
+        -----------
+        control_ids : list, optional
+            Controls to explain (e.g. a row the user expanded). By default,
+            every pending control scoring below 4.
+
+        on_progress : callable, optional
+            Called in the calling thread as each category finishes with a
+            dict: category_id, completed, total.
+
+        Returns:
+        --------
+        int : Number of controls that received a narrative.
+        """
+        by_category, jobs = self._narrative_jobs(control_ids)
+        if not jobs:
+            return 0
+
+        if not control_ids:
+            count = sum(len(items) for items in by_category.values())
+            print(f"  [INFO] Writing detailed findings for {count} controls "
+                  f"scoring below 4...")
+
+        filled = 0
+        completed = 0
+        for cat_id, narratives in iterate_sync(self._aiter_limited(
+                jobs, max_workers or config.GAP_ASSESSMENT_WORKERS)):
+            filled += self._apply_narratives(by_category[cat_id], narratives)
+            completed += 1
+            if on_progress:
+                on_progress({"category_id": cat_id, "completed": completed,
+                             "total": len(jobs)})
+        return filled
+
+    def _narrative_jobs(self, control_ids: list = None) -> tuple:
+        """
+        Pending results to explain, grouped by category, and one
+        (category_id, coroutine_function, args) job per category.
+        """
+        wanted = set(control_ids or [])
+        by_category = {}
         for r in self.results:
-            mat = r.get("maturity", "Not Assessed")
-            pri = r.get("priority", "N/A")
-            maturity_counts[mat] = maturity_counts.get(mat, 0) + 1
-            priority_counts[pri] = priority_counts.get(pri, 0) + 1
+            if not r.get("narrative_pending"):
+                continue
+            if wanted:
+                if r.get("control_id") not in wanted:
+                    continue
+            elif not 0 < (r.get("score") or 0) < 4:
+                continue
+            by_category.setdefault(r["category_id"], []).append(r)
+
+        jobs = [(cat_id, self._anarrate_category,
+                 (items, self._answers.get(cat_id, "")))
+                for cat_id, items in by_category.items()]
+        return by_category, jobs
+
+    def _apply_narratives(self, items: list, narratives: list) -> int:
+        """Merge a category's narratives into its results and checkpoint."""
+        by_id = {n.get("control_id"): n for n in narratives}
+        filled = 0
+        for item in items:
+            narrative = by_id.get(item["control_id"])
+            if narrative is None:
+                continue
+            for field in self._NARRATIVE_FIELDS:
+                item[field] = narrative[field]
+            item.pop("narrative_pending", None)
+            filled += 1
+        cat_id = items[0]["category_id"]
+        self._checkpoint_results(cat_id, [
+            r for r in self.results if r.get("category_id") == cat_id])
+        return filled
+
+    def _evaluate_category(self, category_data: dict,
+                           current_state: str) -> list:
+        """
+        Send a control category to Claude for evaluation.
+
+        Parameters:
+        -----------
+        category_data : dict
+            The category info including its controls.
 
-        system_prompt = """You are a senior GRC consultant writing an executive summary 
+        current_state : str
+            The user's description of their current state for this area.
+
+        Returns:
+        --------
+        list : Assessment results for each control in the category.
+        """
+        return run_sync(self._aevaluate_category(category_data, current_state))
+
+    def _group_by_category(self):
+        """category_id -> category record with its controls (framework order)."""
+        return self.framework.categories
+
+    def _plan_categories(self, states: dict, labels: dict = None) -> list:
+        """
+        Pair each category that has an answer with its controls.
+
+        Keys may be category IDs or function IDs; a function-level answer
+        applies to each of that function's categories that has no answer
+        of its own.
+
+        Returns [(category_data, current_state), ...] in framework order,
+        followed by IDs that aren't in the framework file (as ad-hoc
+        categories) in the order given. current_state is None for
+        categories the assessor skipped; empty answers are left out.
+        """
+        categories = self._group_by_category()
+        labels = labels or {}
+        states = dict(states)
+        unknown = []
+        for key in list(states):
+            if key in categories:
+                continue
+            members = self.framework.children(key)
+            if not members:
+                unknown.append(key)
+                continue
+            answer = states.pop(key)
+            for cat_id in members:
+                states.setdefault(cat_id, answer)
+
+        ordered = [k for k in categories if k in states] + unknown
+
+        planned = []
+        for cat_id in ordered:
+            current_state = (states[cat_id] or "").strip()
+            if not current_state:
+                continue
+            cat_data = categories.get(cat_id) or self._adhoc_category(
+                cat_id, labels.get(cat_id, cat_id))
+            if (current_state.lower() == "skip"
+                    or is_not_applicable(current_state)):
+                # "N/A": the area does not apply, so it is not scored
+                planned.append((cat_data, None))
+                continue
+            if current_state.lower() == "none":
+                current_state = ("Nothing exists. No tools, no processes, "
+                                 "no policies, no controls in this area.")
+            planned.append((cat_data, current_state))
+        return planned
+
+    @staticmethod
+    async def _aiter_limited(jobs: list, workers: int):
+        """
+        Run (key, coroutine_function, args) jobs at most `workers` at a
+        time and yield (key, result) as each one finishes.
+        """
+        gate = asyncio.Semaphore(workers)
+
+        async def _one(key, func, args):
+            async with gate:
+                return key, await func(*args)
+
+        tasks = [asyncio.ensure_future(_one(*job)) for job in jobs]
+        try:
+            for finished in asyncio.as_completed(tasks):
+                yield await finished
+        finally:
+            # Stop outstanding calls if the consumer goes away early
+            for task in tasks:
+                task.cancel()
+
+    def run_assessment(self, states: dict, labels: dict = None,
+                       max_workers: int = None, on_progress=None,
+                       detail: str = None) -> list:
+        """
+        Evaluate every answered category concurrently.
+
+        Parameters:
+        -----------
+        states : dict
+            category_id -> current-state description. "none" means nothing
+            exists, "skip" (or "N/A") records the category as Not Assessed,
+            and empty answers are left out.
+
+        labels : dict, optional
+            category_id -> display name, used for IDs that are not in the
+            framework file (they are assessed as one general control).
+
+        max_workers : int, optional
+            Categories evaluated at once (default:
+            config.GAP_ASSESSMENT_WORKERS).
+
+        on_progress : callable, optional
+            Called in the calling thread as each category finishes with a
+            dict: category_id, category, completed, total, failed, results.
+
+        detail : str, optional
+            "gaps" (default, config.GAP_DETAIL): rate every control in a
+            compact first pass, then write the narrative for controls
+            scoring below 4. "scores": ratings only; call narrate() later.
+            "full": one request per category with the full narrative.
+
+        Returns:
+        --------
+        list : Assessment results in category order, whatever order the
+               calls finished in.
+        """
+        detail = detail or config.GAP_DETAIL
+        planned, per_category, pending = self._assessment_jobs(
+            states, labels, compact=detail != "full")
+
+        workers = max_workers or config.GAP_ASSESSMENT_WORKERS
+        completed = 0
+        for index, results in iterate_sync(
+                self._aiter_limited(pending, workers)):
+            self._record_category(planned, per_category, index, results)
+            completed += 1
+            cat_data = planned[index][0]
+            if on_progress:
+                on_progress({
+                    "category_id": cat_data["category_id"],
+                    "category": cat_data["category"],
+                    "completed": completed,
+                    "total": len(pending),
+                    "failed": self._is_failed(results),
+                    "results": results,
+                })
+
+        self.results = [r for results in per_category for r in results]
+        if detail == "gaps":
+            self.narrate(max_workers=max_workers)
+        return self.results
+
+    def _assessment_jobs(self, states: dict, labels: dict = None,
+                         compact: bool = False) -> tuple:
+        """
+        Plan an assessment: checkpoint the answers, fill in skipped and
+        already-completed categories, and list what is left to evaluate.
+
+        Returns:
+        --------
+        tuple : (planned, per_category, pending) — planned from
+                _plan_categories, per_category a list of result lists
+                (None where still pending) and pending the
+                (index, coroutine_function, args) jobs for _aiter_limited.
+        """
+        planned = self._plan_categories(states, labels)
+        per_category = [None] * len(planned)
+        pending = []
+        for index, (cat_data, current_state) in enumerate(planned):
+            cat_id = cat_data["category_id"]
+            self._checkpoint_answer(cat_data, current_state or "skip")
+            if current_state is not None:
+                self._carry_forward(cat_data, current_state)
+            if cat_id in self._completed:
+                per_category[index] = self._completed[cat_id]
+            elif current_state is None:
+                per_category[index] = self._skipped_category_results(cat_data)
+            else:
+                pending.append((index, self._aevaluate_category,
+                                (cat_data, current_state, compact)))
+        return planned, per_category, pending
+
+    def _record_category(self, planned: list, per_category: list,
+                         index: int, results: list):
+        """Store and checkpoint one finished category of _assessment_jobs."""
+        per_category[index] = results
+        self._checkpoint_results(planned[index][0]["category_id"], results)
+
+    def _pack_categories(self, planned: list, max_tokens: int) -> list:
+        """
+        Group (category_data, current_state) pairs into request-sized packs.
+
+        A category whose controls would not fit in one response is split
+        into several parts first. Parts are then added to a pack until the
+        next one would push the expected output past `max_tokens` or the
+        prompt past config.GAP_BULK_INPUT_TOKENS. A current state shared
+        by several parts of a pack is only counted (and sent) once.
+        """
+        max_controls = max(1, max_tokens // config.GAP_BULK_TOKENS_PER_CONTROL)
+
+        parts = []
+        for cat_data, current_state in planned:
+            controls = cat_data["controls"]
+            for i in range(0, len(controls), max_controls):
+                part = dict(cat_data, controls=controls[i:i + max_controls])
+                parts.append((part, current_state))
+
+        def _prompt_tokens(part: dict) -> int:
+            return sum(estimate_tokens(c["description"]) + 8
+                       for c in part["controls"])
+
+        packs = []
+        pack, pack_controls, pack_tokens, pack_states = [], 0, 0, set()
+        for part, current_state in parts:
+            cost = _prompt_tokens(part)
+            if current_state not in pack_states:
+                cost += estimate_tokens(current_state)
+            if pack and (
+                    pack_controls + len(part["controls"]) > max_controls
+                    or pack_tokens + cost > config.GAP_BULK_INPUT_TOKENS):
+                packs.append(pack)
+                pack, pack_controls, pack_tokens, pack_states = [], 0, 0, set()
+                cost = _prompt_tokens(part) + estimate_tokens(current_state)
+            pack.append((part, current_state))
+            pack_controls += len(part["controls"])
+            pack_tokens += cost
+            pack_states.add(current_state)
+        if pack:
+            packs.append(pack)
+        return packs
+
+    def _packed_user_prompt(self, pack: list) -> str:
+        """User prompt covering several categories in one request."""
+        state_labels = {}
+        for _, current_state in pack:
+            state_labels.setdefault(current_state,
+                                    f"STATE {len(state_labels) + 1}")
+
+        states_text = "\n\n".join(
+            f"[{label}]\n{current_state}"
+            for current_state, label in state_labels.items()
+        )
+        areas_text = "\n\n".join(
+            f"AREA: {part['category_id']} — {part['category']} "
+            f"(current state: {state_labels[current_state]})\n"
+            + "\n".join(f"- {c['control_id']}: {c['description']}"
+                        for c in part["controls"])
+            for part, current_state in pack
+        )
+
+        return f"""Assess the controls in each of these areas.
+
+ORGANIZATION'S CURRENT STATE:
+{states_text}
+
+CONTROLS BY AREA:
+{areas_text}
+
+Return your assessment as a JSON array with one object per control, for
+every control listed above."""
+
+    async def _aevaluate_pack(self, pack: list, max_tokens: int) -> list:
+        """
+        Evaluate one pack and split the answer back into its categories.
+
+        Returns a list of per-part result lists, in pack order.
+        """
+        if len(pack) == 1:
+            part, current_state = pack[0]
+            return [await self._aevaluate_category(part, current_state,
+                                                   max_tokens=max_tokens)]
+
+        try:
+            items = await self._arequest_items(
+                self._category_system_prompt(),
+                self._packed_user_prompt(pack),
+                GAP_RESULTS, max_tokens=max_tokens,
+            )
+        except Exception as e:
+            ids = ", ".join(part["category_id"] for part, _ in pack)
+            print(f"  [ERROR] Failed to assess {ids}: {e}")
+            return [self._failed_category_results(part, current_state, e)
+                    for part, current_state in pack]
+
+        # Each part picks its own controls out of the shared answer and
+        # repairs only what is missing from it
+        return list(await asyncio.gather(*[
+            self._assemble_category(part, current_state, items,
+                                    max_tokens=max_tokens)
+            for part, current_state in pack
+        ]))
+
+    def route_bulk_text(self, text: str, labels: dict = None) -> dict:
+        """
+        Split one long description into per-category slices locally (see
+        utils/text_router.py), for run_bulk_assessment().
+
+        Parameters:
+        -----------
+        text : str
+            The client's whole description.
+
+        labels : dict, optional
+            ID -> description of each domain, used as the routing
+            profiles when there is no framework file.
+
+        Returns:
+        --------
+        dict : category_id (or label ID) -> the paragraphs relevant to it
+               plus the general ones.
+        """
+        categories = self._group_by_category()
+        profiles = (category_profiles(categories) if categories
+                    else dict(labels or {}))
+        if not profiles:
+            return {}
+
+        router = TextRouter(profiles)
+        slices = router.route(text)
+        stats = router.last_stats
+        sent = sum(len(v) for v in slices.values())
+        print(f"  [INFO] Routed {stats['paragraphs']} paragraphs to "
+              f"{len(slices)} categories ({stats['general']} general, "
+              f"{stats['avg_per_category']:.1f} specific per category); "
+              f"{sent:,} characters instead of {len(text) * len(slices):,}.")
+        return {
+            cat_id: piece or ("The organization's description does not "
+                              "mention this area.")
+            for cat_id, piece in slices.items()
+        }
+
+    def run_bulk_assessment(self, state_map: dict, labels: dict = None,
+                            max_workers: int = None) -> list:
+        """
+        Evaluate many categories with as few, large requests as possible.
+
+        Small categories are packed into one request (up to
+        config.GAP_BULK_MAX_TOKENS of expected output), categories too
+        large for one response are split, and the packs run concurrently.
+        Best when many categories share one description, as in the web
+        app's bulk text mode.
+
+        Parameters:
+        -----------
+        state_map : dict
+            category_id or function_id -> current-state description
+            (same conventions as run_assessment).
+
+        labels : dict, optional
+            Display names for IDs that are not in the framework file.
+
+        max_workers : int, optional
+            Packs evaluated at once (default: config.GAP_ASSESSMENT_WORKERS).
+
+        Returns:
+        --------
+        list : Assessment results in category and control order.
+        """
+        planned = self._plan_categories(state_map, labels)
+        for cat_data, current_state in planned:
+            self._checkpoint_answer(cat_data, current_state or "skip")
+            if current_state is None:
+                continue
+            if not self._carry_forward(cat_data, current_state):
+                local = self._local_results(cat_data, current_state)
+                if local is not None:
+                    self._completed[cat_data["category_id"]] = local
+                    self._checkpoint_results(cat_data["category_id"], local)
+        max_tokens = config.GAP_BULK_MAX_TOKENS
+        packs = self._pack_categories(
+            [(c, s) for c, s in planned
+             if s is not None and c["category_id"] not in self._completed],
+            max_tokens)
+        print(f"  [INFO] Bulk assessment: {len(planned)} categories in "
+              f"{len(packs)} requests.")
+
+        # Parts of a split category finish in any order: key each by the
+        # position of its first control and reassemble in framework order
+        parts_by_category = {}
+        positions = {c["category_id"]: {ctrl["control_id"]: i for i, ctrl
+                                        in enumerate(c["controls"])}
+                     for c, _ in planned}
+
+        def _ordered(cat_id: str) -> list:
+            parts = parts_by_category.get(cat_id, {})
+            return [r for offset in sorted(parts) for r in parts[offset]]
+
+        async def _run_pack(pack):
+            pack_results = await self._aevaluate_pack(pack, max_tokens)
+            finished = []
+            for (part, _), part_results in zip(pack, pack_results):
+                cat_id = part["category_id"]
+                offset = positions[cat_id][part["controls"][0]["control_id"]]
+                parts_by_category.setdefault(cat_id, {})[offset] = part_results
+                finished.append(cat_id)
+            # A split category is checkpointed once all its parts are in
+            for cat_id in dict.fromkeys(finished):
+                done = sum(len(r) for r in parts_by_category[cat_id].values())
+                if done == len(positions[cat_id]):
+                    self._checkpoint_results(cat_id, _ordered(cat_id))
+
+        run_sync(gather_limited(
+            [_run_pack(pack) for pack in packs],
+            limit=max_workers or config.GAP_ASSESSMENT_WORKERS,
+        ))
+
+        results = []
+        for cat_data, current_state in planned:
+            cat_id = cat_data["category_id"]
+            if cat_id in self._completed:
+                results.extend(self._completed[cat_id])
+            elif current_state is None:
+                results.extend(self._skipped_category_results(cat_data))
+            else:
+                results.extend(_ordered(cat_id))
+
+        self.results = results
+        return results
+
+    def run_batch_assessment(self, states: dict, labels: dict = None,
+                             backend=None) -> list:
+        """
+        Evaluate many categories as one offline Message Batches job.
+
+        Cheaper than interactive calls, but results arrive only when the
+        whole batch has been processed (minutes to hours). Good for
+        overnight or portfolio runs.
+
+        Parameters:
+        -----------
+        states : dict
+            category_id or function_id -> current-state description
+            (same conventions as run_assessment: "none", "skip", "N/A").
+
+        labels : dict, optional
+            Display names for IDs that are not in the framework file.
+
+        backend : optional
+            Batch backend (see utils.batch_client); defaults to
+            config.BATCH_BACKEND.
+
+        Returns:
+        --------
+        list : Assessment results, in framework order.
+        """
+        from utils.batch_client import BatchJob
+
+        job = BatchJob(backend)
+        system_prompt = self._category_system_prompt()
+
+        # (cat_data, current_state, batch handle, finished results)
+        queued = []
+        for cat_data, current_state in self._plan_categories(states, labels):
+            cat_id = cat_data["category_id"]
+            self._checkpoint_answer(cat_data, current_state or "skip")
+            if current_state is not None:
+                self._carry_forward(cat_data, current_state)
+            if cat_id in self._completed:
+                queued.append((cat_data, current_state, None,
+                               self._completed[cat_id]))
+                continue
+            if current_state is None:
+                queued.append((cat_data, None, None,
+                               self._skipped_category_results(cat_data)))
+                continue
+            local = self._local_results(cat_data, current_state)
+            if local is not None:
+                self._completed[cat_id] = local
+                self._checkpoint_results(cat_id, local)
+                queued.append((cat_data, current_state, None, local))
+                continue
+            handle = job.add_structured(
+                system_prompt,
+                self._category_user_prompt(cat_data, current_state),
+                label=cat_id, schema=GAP_RESULTS,
+            )
+            queued.append((cat_data, current_state, handle, None))
+
+        job.run()
+
+        results = []
+        for cat_data, current_state, handle, finished in queued:
+            if finished is not None:
+                results.extend(finished)
+                continue
+            try:
+                items = handle.result()
+            except Exception as e:
+                cause = e.__cause__
+                if isinstance(cause, SchemaValidationError):
+                    items = self._valid_items(cause)
+                elif isinstance(cause, ValueError):
+                    items = []
+                else:
+                    print(f"  [ERROR] Failed to assess "
+                          f"{cat_data['category_id']}: {e}")
+                    failed = self._failed_category_results(
+                        cat_data, current_state, e)
+                    self._checkpoint_results(cat_data["category_id"], failed)
+                    results.extend(failed)
+                    continue
+            # Missing or invalid controls are re-requested live, on their own
+            assembled = run_sync(self._assemble_category(
+                cat_data, current_state, items))
+            self._checkpoint_results(cat_data["category_id"], assembled)
+            results.extend(assembled)
+
+        self.results = results
+        return results
+
+    # ────────────────────────────────────────────
+    # Reports (executive summary, remediation roadmap)
+    # ────────────────────────────────────────────
+    _SUMMARY_SYSTEM_PROMPT = """You are a senior GRC consultant writing an executive summary 
 for a board-level gap assessment report. Write professionally and concisely.
 
 Structure your summary as:
@@ -354,28 +1520,242 @@ Structure your summary as:
 
 Use professional GRC language appropriate for executive leadership."""
 
-        user_prompt = f"""Generate an executive summary for this gap assessment:
+    _ROADMAP_SYSTEM_PROMPT = """You are a GRC consultant creating a remediation roadmap.
 
-ASSESSMENT DETAILS:
+Organize all recommendations into clear phases:
+- Phase 1 — IMMEDIATE (0-30 days): Critical findings and quick wins
+- Phase 2 — SHORT-TERM (30-90 days): High priority items
+- Phase 3 — MEDIUM-TERM (90-180 days): Medium priority improvements  
+- Phase 4 — LONG-TERM (180-365 days): Optimization and maturity improvements
+
+For each item in the roadmap, include:
+- Control ID
+- Gap Summary
+- Specific Action Required
+- Suggested Owner (role, not person)
+- Estimated Level of Effort (hours/days)
+- Dependencies (if any)
+- Success Criteria
+
+End with a budget estimation section and resource requirements summary."""
+
+    _SUMMARY_MAP_PROMPT = """You are a senior GRC consultant. Summarize the gap assessment
+findings for ONE domain of the framework; your notes will be combined with
+the other domains into a board-level executive summary.
+
+Cover, in at most 300 words:
+- Overall maturity of this domain
+- Key strengths (with control IDs)
+- The most critical gaps (with control IDs and priority)
+- The 2-3 most important recommendations
+
+Use only the findings given. Be specific and concise."""
+
+    _ROADMAP_MAP_PROMPT = """You are a GRC consultant drafting ONE domain's part of a
+remediation roadmap; it will be merged with the other domains.
+
+Place each finding in a phase:
+- Phase 1 — IMMEDIATE (0-30 days): Critical findings and quick wins
+- Phase 2 — SHORT-TERM (30-90 days): High priority items
+- Phase 3 — MEDIUM-TERM (90-180 days): Medium priority improvements
+- Phase 4 — LONG-TERM (180-365 days): Optimization and maturity improvements
+
+For each item give: Control ID(s), specific action, suggested owner (role),
+estimated effort, dependencies. Group closely related controls into one
+item. Be concise: bullet points, no introduction."""
+
+    def _statistics(self) -> dict:
+        """Assessment statistics, computed locally."""
+        assessed = [r for r in self.results
+                    if r.get("score") and r.get("score") > 0]
+        maturity_counts = {}
+        priority_counts = {}
+        by_function = {}
+        for r in self.results:
+            mat = r.get("maturity", "Not Assessed")
+            pri = r.get("priority", "N/A")
+            maturity_counts[mat] = maturity_counts.get(mat, 0) + 1
+            priority_counts[pri] = priority_counts.get(pri, 0) + 1
+            scores = by_function.setdefault(r.get("function", "Unknown"), [])
+            if r.get("score") and r["score"] > 0:
+                scores.append(r["score"])
+
+        return {
+            "total": len(self.results),
+            "assessed": len(assessed),
+            "avg_score": (sum(r["score"] for r in assessed) / len(assessed)
+                          if assessed else 0),
+            "maturity_counts": maturity_counts,
+            "priority_counts": priority_counts,
+            "function_scores": {
+                fn: (round(sum(s) / len(s), 1) if s else None, len(s))
+                for fn, s in by_function.items()
+            },
+        }
+
+    def _statistics_block(self, stats: dict) -> str:
+        functions = "\n".join(
+            f"  - {fn}: {avg if avg is not None else 'n/a'} / 5.0 "
+            f"({count} controls scored)"
+            for fn, (avg, count) in stats["function_scores"].items()
+        )
+        return f"""STATISTICS:
+- Total Controls Assessed: {stats['total']}
+- Average Maturity Score: {stats['avg_score']:.1f} / 5.0
+- Maturity Distribution: {json.dumps(stats['maturity_counts'], indent=2)}
+- Priority Distribution: {json.dumps(stats['priority_counts'], indent=2)}
+- Average Score by Function:
+{functions}"""
+
+    def _details_block(self) -> str:
+        return f"""ASSESSMENT DETAILS:
 - Framework: {self.framework_name}
 - Company: {self.company['name']}
 - Industry: {self.company['industry']}
 - Company Size: {self.company['size']}
-- Assessment Date: {self.timestamp}
+- Assessment Date: {self.timestamp}"""
+
+    @staticmethod
+    def _digest_line(r: dict, with_actions: bool = False) -> str:
+        """One compact line per control for the map prompts."""
+        def _clip(text, limit=200):
+            text = " ".join(str(text or "").split())
+            return text if len(text) <= limit else text[:limit - 1] + "…"
+
+        line = (f"{r.get('control_id', 'N/A')} | {r.get('maturity', 'N/A')} "
+                f"{r.get('score', '?')}/5 | {r.get('priority', 'N/A')} | "
+                f"{r.get('estimated_effort', 'N/A')} | gap: {_clip(r.get('gap'))}")
+        if with_actions:
+            line += f" | action: {_clip(r.get('recommendations'))}"
+        return line
+
+    def _digest_chunks(self, results: list, with_actions: bool = False) -> list:
+        """
+        Group digest lines by function, splitting a function into several
+        chunks when it exceeds config.GAP_REPORT_CHUNK_TOKENS.
+
+        Returns [(label, lines), ...] in framework order.
+        """
+        by_function = {}
+        for r in results:
+            by_function.setdefault(r.get("function", "Unknown"), []).append(
+                self._digest_line(r, with_actions))
+
+        chunks = []
+        for function, lines in by_function.items():
+            parts, current, size = [], [], 0
+            for line in lines:
+                cost = estimate_tokens(line)
+                if current and size + cost > config.GAP_REPORT_CHUNK_TOKENS:
+                    parts.append(current)
+                    current, size = [], 0
+                current.append(line)
+                size += cost
+            parts.append(current)
+            for i, part in enumerate(parts, 1):
+                label = (function if len(parts) == 1
+                         else f"{function} (part {i}/{len(parts)})")
+                chunks.append((label, part))
+        return chunks
+
+    async def _amap_reduce(self, chunks: list, map_prompt: str,
+                           header: str) -> list:
+        """
+        Summarize each (label, lines) chunk concurrently, then keep merging
+        the notes in groups until they fit in one prompt.
+
+        Returns the notes as a list of "### label" sections.
+        """
+        async def _map(label, body):
+            text = await achat(map_prompt, f"{header}\n\nDOMAIN: {label}\n\n"
+                                           f"{body}", temperature=0.3,
+                               max_tokens=config.GAP_REPORT_MAP_MAX_TOKENS)
+            return f"### {label}\n{text.strip()}"
+
+        notes = await gather_limited(
+            [_map(label, "FINDINGS (control | maturity | priority | effort "
+                         "| details):\n" + "\n".join(lines))
+             for label, lines in chunks],
+            limit=config.GAP_ASSESSMENT_WORKERS,
+        )
 
-STATISTICS:
-- Total Controls Assessed: {total}
-- Average Maturity Score: {avg_score:.1f} / 5.0
-- Maturity Distribution: {json.dumps(maturity_counts, indent=2)}
-- Priority Distribution: {json.dumps(priority_counts, indent=2)}
+        # Bound the reduce prompt: merge neighbouring notes until they fit
+        while (len(notes) > 1 and estimate_tokens("\n\n".join(notes))
+               > config.GAP_REPORT_DIRECT_TOKENS):
+            groups, current, size = [], [], 0
+            for note in notes:
+                cost = estimate_tokens(note)
+                if current and size + cost > config.GAP_REPORT_CHUNK_TOKENS:
+                    groups.append(current)
+                    current, size = [], 0
+                current.append(note)
+                size += cost
+            groups.append(current)
+            if len(groups) == len(notes):
+                # Each note alone fills a chunk; pair them up instead
+                groups = [notes[i:i + 2] for i in range(0, len(notes), 2)]
+            notes = await gather_limited(
+                [_map(" + ".join(n.split("\n", 1)[0][4:] for n in group),
+                      "NOTES TO COMBINE:\n" + "\n\n".join(group))
+                 for group in groups],
+                limit=config.GAP_ASSESSMENT_WORKERS,
+            )
+        return notes
+
+    def _use_hierarchical(self, payload: list, hierarchical) -> bool:
+        if hierarchical is not None:
+            return hierarchical
+        return (estimate_tokens(json.dumps(payload, indent=2))
+                > config.GAP_REPORT_DIRECT_TOKENS)
+
+    def generate_executive_summary(self, hierarchical: bool = None) -> str:
+        """
+        Generate an executive summary of the entire assessment.
+
+        Small assessments are summarized in one request from the full
+        findings. Larger ones (or hierarchical=True) are summarized per
+        function concurrently from compact digests, then reduced to the
+        final summary, so no request grows with the number of controls.
+        """
+        stats = self._statistics()
+
+        if not self._use_hierarchical(self.results, hierarchical):
+            user_prompt = f"""Generate an executive summary for this gap assessment:
+
+{self._details_block()}
+
+{self._statistics_block(stats)}
 
 DETAILED FINDINGS:
 {json.dumps(self.results, indent=2)}"""
+            return chat(self._SUMMARY_SYSTEM_PROMPT, user_prompt,
+                        temperature=0.4, max_tokens=4000)
+
+        notes = run_sync(self._amap_reduce(
+            self._digest_chunks(self.results), self._SUMMARY_MAP_PROMPT,
+            f"Framework: {self.framework_name}\n"
+            f"Company: {self.company['name']} ({self.company['industry']})"))
 
-        return chat(system_prompt, user_prompt, temperature=0.4, max_tokens=4000)
+        user_prompt = f"""Generate an executive summary for this gap assessment.
+The per-domain notes below were written from every control's findings; the
+statistics are exact.
 
-    def get_remediation_roadmap(self) -> str:
-        """Generate a prioritized remediation roadmap."""
+{self._details_block()}
+
+{self._statistics_block(stats)}
+
+DOMAIN NOTES:
+{chr(10).join(notes)}"""
+        return chat(self._SUMMARY_SYSTEM_PROMPT, user_prompt,
+                    temperature=0.4, max_tokens=4000)
+
+    def get_remediation_roadmap(self, hierarchical: bool = None) -> str:
+        """
+        Generate a prioritized remediation roadmap.
+
+        Like generate_executive_summary(), large assessments are drafted
+        per function concurrently and then merged into one roadmap.
+        """
 
         # Only include items that need work
         gaps = [r for r in self.results
@@ -384,36 +1764,41 @@ DETAILED FINDINGS:
         if not gaps:
             return "All controls are Largely or Fully Implemented. No remediation needed."
 
-        system_prompt = """You are a GRC consultant creating a remediation roadmap.
+        if not self._use_hierarchical(gaps, hierarchical):
+            user_prompt = f"""Create a remediation roadmap for {self.company['name']}.
 
-Organize all recommendations into clear phases:
-- Phase 1 — IMMEDIATE (0-30 days): Critical findings and quick wins
-- Phase 2 — SHORT-TERM (30-90 days): High priority items
-- Phase 3 — MEDIUM-TERM (90-180 days): Medium priority improvements  
-- Phase 4 — LONG-TERM (180-365 days): Optimization and maturity improvements
+Framework: {self.framework_name}
+Industry: {self.company['industry']}
 
-For each item in the roadmap, include:
-- Control ID
-- Gap Summary
-- Specific Action Required
-- Suggested Owner (role, not person)
-- Estimated Level of Effort (hours/days)
-- Dependencies (if any)
-- Success Criteria
+Findings requiring remediation (scored below 4/5):
+{json.dumps(gaps, indent=2)}
 
-End with a budget estimation section and resource requirements summary."""
+Create a comprehensive, actionable roadmap."""
+            return chat(self._ROADMAP_SYSTEM_PROMPT, user_prompt,
+                        temperature=0.3, max_tokens=4000)
+
+        drafts = run_sync(self._amap_reduce(
+            self._digest_chunks(gaps, with_actions=True),
+            self._ROADMAP_MAP_PROMPT,
+            f"Framework: {self.framework_name}\n"
+            f"Company: {self.company['name']} ({self.company['industry']}, "
+            f"{self.company['size']})"))
 
         user_prompt = f"""Create a remediation roadmap for {self.company['name']}.
 
 Framework: {self.framework_name}
 Industry: {self.company['industry']}
 
-Findings requiring remediation (scored below 4/5):
-{json.dumps(gaps, indent=2)}
+{self._statistics_block(self._statistics())}
 
-Create a comprehensive, actionable roadmap."""
+{len(gaps)} controls scored below 4/5. Per-domain roadmap drafts:
+{chr(10).join(drafts)}
 
-        return chat(system_prompt, user_prompt, temperature=0.3, max_tokens=4000)
+Merge the drafts into one comprehensive, actionable roadmap. Consolidate
+related items across domains, keep control IDs, and keep the phases
+consistent."""
+        return chat(self._ROADMAP_SYSTEM_PROMPT, user_prompt,
+                    temperature=0.3, max_tokens=4000)
 
     def save_results(self, output_dir: str = None) -> str:
         """
@@ -426,11 +1811,9 @@ Create a comprehensive, actionable roadmap."""
         output_dir = output_dir or config.GAP_ASSESSMENT_DIR
         os.makedirs(output_dir, exist_ok=True)
 
-        safe_company = self.company["name"].replace(" ", "_").replace("/", "_")
-        safe_framework = self.framework_name.replace(" ", "_").replace(":", "")
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
 
-        filename = f"gap_assessment_{safe_company}_{safe_framework}_{timestamp}.json"
+        filename = f"gap_assessment_{self._file_stem()}_{timestamp}.json"
         filepath = os.path.join(output_dir, filename)
 
         output = {
@@ -440,6 +1823,9 @@ Create a comprehensive, actionable roadmap."""
                 "timestamp": self.timestamp,
                 "total_controls": len(self.results),
                 "assessed_controls": len([r for r in self.results if r.get("score")]),
+                # Lets reassess() tell which categories changed next time
+                "framework_version": self.framework.version,
+                "categories": self._fingerprints,
             },
             "results": self.results,
         }
@@ -447,5 +1833,6 @@ Create a comprehensive, actionable roadmap."""
         with open(filepath, "w", encoding="utf-8") as f:
             json.dump(output, f, indent=2)
 
+        self._mark_checkpoint_complete(filepath)
         print(f"\n  [SAVED] Results → {filepath}")
         return filepath
\ No newline at end of file
@@ -0,0 +1,182 @@
+"""
+engines/gap_rules.py
+
+Local, rule-based gap evaluation for answers that need no judgement.
+
+When the assessor says a category has nothing in place ("none", "no
+policies or tools", ...) or cannot say anything about it ("unknown",
+"tbd"), every control in it is "Not Implemented" (score 1 — no evidence
+of the control existing). Asking Claude to confirm that costs a full
+request, so these answers are evaluated here instead, instantly.
+
+HOW IT WORKS:
+1. classify_answer() normalizes the answer and checks whether it only
+   says that nothing exists, or that the state is unknown. Every clause
+   must be a pure negation ("none", "no formal policy", "not yet
+   implemented"); any positive statement ("we have tools in place, no
+   formal policy", "not all controls are in place") goes to Claude
+2. evaluate_locally() turns such a category into complete result records:
+   the gap and recommendation come from the control description, the
+   priority and effort from keyword heuristics on it
+3. Anything else returns None and goes to Claude as usual
+
+"N/A" means the area does not apply, not that nothing exists:
+is_not_applicable() lets GapAssessment treat it like "skip".
+"""
+
+import re
+
+# What a "nothing exists" answer may say is missing...
+_THING = (r"(formal |documented |defined |written )?"
+          r"(polic(y|ies)|tools?|controls?|process(es)?|procedures?|"
+          r"programs?|solutions?|measures?|anything)")
+_THINGS = rf"{_THING}(( or| and| nor) (no )?{_THING})*"
+# ...and how it may qualify that
+_WHERE = (r"( (in place|exists?|implemented|yet|at all|currently|"
+          r"in this area|for this area|here))*")
+
+# Each clause of the answer must match one of these in full
+_NOTHING_CLAUSES = [re.compile(p) for p in (
+    rf"(none|nothing|nil|nope|zero|no){_WHERE}",
+    rf"(there (is|are) )?(no|not any) {_THINGS}{_WHERE}",
+    rf"(we )?(do not|dont|does not|doesnt|have not|havent) have "
+    rf"(any )?{_THINGS}{_WHERE}",
+    r"(it is |its |this is )?not( yet)?( been)? (implemented|in place|"
+    r"started|done|established|defined|documented)( yet| at all)*",
+    r"not yet",
+)]
+_CLAUSE_BREAK = re.compile(r"[,;.!]+")
+
+_NOT_APPLICABLE_ANSWERS = {
+    "na", "n a", "not applicable", "does not apply", "doesnt apply",
+    "not relevant",
+}
+
+_UNKNOWN_ANSWERS = {
+    "unknown", "dont know", "do not know", "not sure", "unsure", "tbd",
+    "idk", "no idea", "not known", "to be determined",
+}
+
+# Longer answers almost always describe something worth Claude's judgement
+_MAX_TRIVIAL_WORDS = 20
+
+_CRITICAL_TERMS = re.compile(
+    r"\b(access|authenticat\w*|credential\w*|privileg\w*|identit\w*|"
+    r"vulnerabilit\w*|patch\w*|malware|malicious|encrypt\w*|cryptograph\w*|"
+    r"backups?|incidents?|breach\w*|logs?|logging|monitor\w*)\b", re.I)
+
+_HIGH_TERMS = re.compile(
+    r"\b(risks?|polic(y|ies)|roles?|responsibilit\w*|assets?|inventor\w*|"
+    r"suppliers?|vendors?|third[- ]part\w*|training|awareness|recover\w*|"
+    r"continuity|resilien\w*)\b", re.I)
+
+_DOCUMENTATION_TERMS = re.compile(
+    r"\b(polic(y|ies)|documented|established|communicated|defined|"
+    r"roles?|responsibilit\w*|understood|agreed|approved)\b", re.I)
+
+
+def _normalize(text: str) -> str:
+    text = text.lower().replace("n/a", "na").replace("'", "").replace("’", "")
+    return " ".join(re.sub(r"[^a-z0-9 ]+", " ", text).split())
+
+
+def classify_answer(current_state: str) -> str:
+    """
+    Classify an answer that needs no judgement.
+
+    Returns:
+    --------
+    str : "nothing" if every clause of the answer only says nothing is
+          in place, "unknown" if it only says the state is unknown,
+          otherwise None.
+    """
+    if (current_state or "").strip() in ("?", "??", "???"):
+        return "unknown"
+    normalized = _normalize(current_state or "")
+    if not normalized:
+        return None
+    if normalized in _UNKNOWN_ANSWERS:
+        return "unknown"
+
+    if len(normalized.split()) > _MAX_TRIVIAL_WORDS:
+        return None
+    clauses = [_normalize(c) for c in _CLAUSE_BREAK.split(current_state)]
+    clauses = [c for c in clauses if c]
+    if all(any(p.fullmatch(c) for p in _NOTHING_CLAUSES) for c in clauses):
+        return "nothing"
+    return None
+
+
+def is_not_applicable(current_state: str) -> bool:
+    """True if the answer says the area does not apply ("N/A")."""
+    return _normalize(current_state or "") in _NOT_APPLICABLE_ANSWERS
+
+
+def priority_for(description: str) -> str:
+    """Priority of closing a gap on this control, from its description."""
+    if _CRITICAL_TERMS.search(description):
+        return "Critical"
+    if _HIGH_TERMS.search(description):
+        return "High"
+    return "Medium"
+
+
+def effort_for(description: str) -> str:
+    """Documentation and governance controls are quicker to stand up."""
+    if _DOCUMENTATION_TERMS.search(description):
+        return "Short-term"
+    return "Medium-term"
+
+
+def evaluate_locally(category_data: dict, current_state: str) -> list:
+    """
+    Evaluate a category without Claude if its answer is trivial.
+
+    Parameters:
+    -----------
+    category_data : dict
+        The category info including its controls (as used by
+        GapAssessment._evaluate_category).
+
+    current_state : str
+        The assessor's answer for the category.
+
+    Returns:
+    --------
+    list : Complete result records for each control, or None if the answer
+           needs Claude's judgement.
+    """
+    kind = classify_answer(current_state)
+    if kind is None:
+        return None
+
+    if kind == "nothing":
+        observed = ("No tools, processes, policies or controls reported "
+                    "for this area.")
+    else:
+        observed = ("The assessor could not confirm any tools, processes "
+                    "or policies for this area; treated as no evidence.")
+
+    results = []
+    for ctrl in category_data["controls"]:
+        description = ctrl["description"].strip().rstrip(".")
+        results.append({
+            "control_id": ctrl["control_id"],
+            "control_description": ctrl["description"],
+            "function": category_data["function"],
+            "function_id": category_data["function_id"],
+            "category": category_data["category"],
+            "category_id": category_data["category_id"],
+            "maturity": "Not Implemented",
+            "score": 1,
+            "current_state_assessment": observed,
+            "gap": f"Control not in place: {description}.",
+            "recommendations": (
+                f"Design, document and implement this control "
+                f"({description}). Assign an owner and keep evidence that "
+                f"it operates."),
+            "priority": priority_for(description),
+            "estimated_effort": effort_for(description),
+            "assessed_by": "rules",
+        })
+    return results
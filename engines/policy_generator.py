@@ -79,30 +79,10 @@ class PolicyGenerator:
     def __init__(self, company_info: dict):
         self.company = company_info
 
-    def generate_policy(self, policy_type: str, framework: str = None,
+    def _policy_prompts(self, policy_type: str, framework: str = None,
                         additional_context: str = "",
-                        custom_requirements: str = "") -> str:
-        """
-        Generate a complete, professional policy document.
-
-        Parameters:
-        -----------
-        policy_type : str
-            Name of the policy (e.g., "Access Control Policy")
-
-        framework : str, optional
-            Framework to align with (e.g., "SOC 2 Type II")
-
-        additional_context : str, optional
-            Extra info (e.g., "We use AWS and Okta")
-
-        custom_requirements : str, optional
-            Specific things to include
-
-        Returns:
-        --------
-        str : The complete policy document in markdown format.
-        """
+                        custom_requirements: str = "") -> tuple:
+        """Build (system_prompt, user_prompt) for a policy document."""
         system_prompt = f"""You are a senior GRC consultant and policy writer with 15+ years 
 of experience creating information security policies for enterprise organizations.
 
@@ -178,12 +158,99 @@ WRITING GUIDELINES:
         parts.append("\nMake it comprehensive, specific, and ready for executive review.")
 
         user_prompt = "\n".join(parts)
+        return system_prompt, user_prompt
 
-        return chat(system_prompt, user_prompt, temperature=0.3, max_tokens=4096)
+    def generate_policy(self, policy_type: str, framework: str = None,
+                        additional_context: str = "",
+                        custom_requirements: str = "",
+                        on_token=None) -> str:
+        """
+        Generate a complete, professional policy document.
+
+        Parameters:
+        -----------
+        policy_type : str
+            Name of the policy (e.g., "Access Control Policy")
+
+        framework : str, optional
+            Framework to align with (e.g., "SOC 2 Type II")
+
+        additional_context : str, optional
+            Extra info (e.g., "We use AWS and Okta")
+
+        custom_requirements : str, optional
+            Specific things to include
+
+        on_token : callable, optional
+            Called with each chunk of text as the policy streams in.
+
+        Returns:
+        --------
+        str : The complete policy document in markdown format.
+        """
+        system_prompt, user_prompt = self._policy_prompts(
+            policy_type, framework, additional_context, custom_requirements)
+
+        return chat(system_prompt, user_prompt, temperature=0.3, max_tokens=4096,
+                    on_token=on_token)
+
+    def generate_policy_suite(self, policy_types: list, framework: str = None,
+                              use_batch: bool = False, backend=None) -> dict:
+        """
+        Generate several policies in one go.
+
+        Parameters:
+        -----------
+        policy_types : list
+            Policy names (e.g., from POLICY_CATALOG)
+
+        framework : str, optional
+            Framework to align every policy with
+
+        use_batch : bool
+            Submit all policies as one offline Message Batches job instead
+            of generating them one at a time (cheaper; not interactive).
+
+        backend : optional
+            Batch backend (see utils.batch_client)
+
+        Returns:
+        --------
+        dict : policy name -> markdown content (or "ERROR: ..." on failure)
+        """
+        if not use_batch:
+            generated = {}
+            for pol_name in policy_types:
+                try:
+                    generated[pol_name] = self.generate_policy(
+                        pol_name, framework=framework)
+                except Exception as e:
+                    generated[pol_name] = f"ERROR: {e}"
+            return generated
+
+        from utils.batch_client import BatchJob
+
+        job = BatchJob(backend)
+        handles = {}
+        for pol_name in policy_types:
+            system_prompt, user_prompt = self._policy_prompts(pol_name, framework)
+            handles[pol_name] = job.add_chat(system_prompt, user_prompt,
+                                             temperature=0.3, max_tokens=4096,
+                                             label=pol_name)
+        job.run()
+
+        generated = {}
+        for pol_name, handle in handles.items():
+            try:
+                generated[pol_name] = handle.result()
+            except Exception as e:
+                generated[pol_name] = f"ERROR: {e}"
+        return generated
 
     def generate_procedure(self, procedure_name: str,
                            related_policy: str = "",
-                           additional_context: str = "") -> str:
+                           additional_context: str = "",
+                           on_token=None) -> str:
         """
         Generate a detailed, step-by-step procedure document.
 
@@ -197,6 +264,9 @@ WRITING GUIDELINES:
 
         additional_context : str, optional
             Extra info about tools, team structure, etc.
+
+        on_token : callable, optional
+            Called with each chunk of text as the procedure streams in.
         """
         system_prompt = f"""You are a senior GRC consultant creating an operational procedure document
 for {self.company['name']} ({self.company['industry']}, {self.company['size']}).
@@ -257,7 +327,8 @@ Make it detailed enough that a new employee on their first day could follow it."
 
         user_prompt = "\n".join(parts)
 
-        return chat(system_prompt, user_prompt, temperature=0.3, max_tokens=4096)
+        return chat(system_prompt, user_prompt, temperature=0.3, max_tokens=4096,
+                    on_token=on_token)
 
     def identify_required_policies(self, framework: str,
                                    existing_policies: list = None) -> str:
@@ -0,0 +1,318 @@
+"""
+engines/portfolio.py
+
+Headless gap assessments for a whole portfolio of companies.
+
+Consultancies and groups run the same framework for dozens of clients or
+subsidiaries. Instead of one interactive session per company, the
+portfolio runner reads every company's profile and answers from one file
+and evaluates them all together, with nobody at the keyboard.
+
+HOW IT WORKS:
+1. load_portfolio() reads a JSONL or CSV file of company profiles with
+   their per-category current states
+2. Every company × category evaluation goes into ONE worker pool
+   (config.GAP_ASSESSMENT_WORKERS) on top of the process-wide rate budget,
+   so throughput is set by the API limits, not by the number of companies
+3. The narrative pass for controls scoring below 4 is pooled the same way
+4. Each company gets its own JSON results (usable with
+   GapAssessment.reassess) and Excel workbook; the portfolio gets a
+   roll-up workbook (export_portfolio_rollup_xlsx)
+
+INPUT FORMATS:
+- JSONL, one company per line:
+    {"name": "Acme", "industry": "...", "size": "...", "description": "...",
+     "framework": "NIST CSF 2.0",
+     "states": {"GV.OC": "...", "PR.AA": "none", "DE": "Splunk SIEM ..."}}
+  ("framework" is optional; the profile may also be nested as "company")
+- CSV, wide: columns name, industry, size, description, framework, then
+  one column per category (or function) ID holding its current state
+- CSV, long: columns name, industry, size, description, framework,
+  category_id, current_state — one row per company × category
+
+State values follow the interactive assessment: "none", "skip", or a
+description. Empty cells are left out.
+
+Each company's files are named after the company and framework, so two
+entries whose names map to the same file name (e.g. "Acme Inc" and
+"Acme/Inc") may not share a framework; in the long CSV format each
+company answers a category at most once.
+"""
+
+import csv
+import json
+import os
+from datetime import datetime
+
+from utils.ai_client import iterate_sync
+from utils.document_exporter import (
+    export_gap_assessment_xlsx,
+    export_portfolio_rollup_xlsx,
+)
+from engines.gap_assessment import GapAssessment
+import config
+
+_PROFILE_FIELDS = ("name", "industry", "size", "description")
+_LONG_FIELDS = ("category_id", "current_state")
+
+
+def _entry(record: dict, source: str) -> dict:
+    """Normalize one company record to {"company", "framework", "states"}."""
+    profile = record.get("company") or record
+    company = {field: str(profile.get(field) or "").strip()
+               for field in _PROFILE_FIELDS}
+    if not company["name"]:
+        raise ValueError(f"{source}: company has no name")
+    states = record.get("states") or {}
+    if not isinstance(states, dict):
+        raise ValueError(f"{source}: 'states' must be an object of "
+                         f"category_id -> current state")
+    return {
+        "company": company,
+        "framework": (record.get("framework") or "").strip() or None,
+        "states": {str(k).strip(): str(v) for k, v in states.items()
+                   if v is not None and str(v).strip()},
+        "source": source,
+    }
+
+
+def load_portfolio(path: str) -> list:
+    """
+    Read company profiles and answers from a .jsonl or .csv file.
+
+    Returns:
+    --------
+    list : One dict per company, in file order, with keys
+           company (name/industry/size/description), framework (or None),
+           states (category_id -> current state) and source ("file:line").
+    """
+    if path.lower().endswith((".jsonl", ".ndjson")):
+        entries = []
+        with open(path, "r", encoding="utf-8") as f:
+            for line_no, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError as e:
+                    raise ValueError(f"{path}:{line_no}: invalid JSON: {e}")
+                entries.append(_entry(record, f"{path}:{line_no}"))
+        return entries
+
+    if not path.lower().endswith(".csv"):
+        raise ValueError(f"Unsupported portfolio file (use .jsonl or .csv): "
+                         f"{path}")
+
+    with open(path, "r", encoding="utf-8-sig", newline="") as f:
+        reader = csv.DictReader(f)
+        fields = [name.strip() for name in reader.fieldnames or []]
+        reader.fieldnames = fields
+        rows = list(reader)
+
+    if all(name in fields for name in _LONG_FIELDS):
+        # One row per company × category: group rows by company and
+        # framework
+        records = {}
+        for row_no, row in enumerate(rows, 2):
+            name = (row.get("name") or "").strip()
+            framework = (row.get("framework") or "").strip()
+            record = records.setdefault((name.lower(), framework),
+                                        dict(row, states={}, _row=row_no,
+                                             _rows={}))
+            category_id = (row.get("category_id") or "").strip()
+            if not category_id:
+                continue
+            if category_id in record["_rows"]:
+                raise ValueError(
+                    f"{path}:{row_no}: {category_id} for {name} "
+                    f"({framework or 'the default framework'}) is already "
+                    f"answered at {path}:{record['_rows'][category_id]}")
+            record["_rows"][category_id] = row_no
+            record["states"][category_id] = row.get("current_state") or ""
+        return [_entry(record, f"{path}:{record['_row']}")
+                for record in records.values()]
+
+    reserved = set(_PROFILE_FIELDS) | {"framework"}
+    return [
+        _entry(dict(row, states={k: v for k, v in row.items()
+                                 if k and k not in reserved}),
+               f"{path}:{row_no}")
+        for row_no, row in enumerate(rows, 2)
+    ]
+
+
+class PortfolioAssessment:
+    """
+    Gap assessments for many companies through one shared worker pool.
+
+    Usage:
+        portfolio = PortfolioAssessment(load_portfolio("clients.jsonl"),
+                                        "NIST CSF 2.0")
+        portfolio.run()
+        paths = portfolio.save()
+    """
+
+    def __init__(self, entries: list, framework_name: str = None,
+                 max_workers: int = None, detail: str = None):
+        """
+        Parameters:
+        -----------
+        entries : list
+            Companies as returned by load_portfolio().
+
+        framework_name : str, optional
+            Framework for companies whose entry does not name one.
+
+        max_workers : int, optional
+            Evaluations in flight at once across the whole portfolio
+            (default: config.GAP_ASSESSMENT_WORKERS).
+
+        detail : str, optional
+            "gaps", "scores" or "full" (see GapAssessment.run_assessment).
+        """
+        missing = [e["company"]["name"] for e in entries
+                   if not (e["framework"] or framework_name)]
+        if missing:
+            raise ValueError(f"No framework given for: {', '.join(missing)}")
+        assessments = [
+            GapAssessment(e["company"], e["framework"] or framework_name)
+            for e in entries
+        ]
+        # Output files are named by company and framework, so two entries
+        # with the same file stem would overwrite each other's results
+        seen = {}
+        for entry, assessment in zip(entries, assessments):
+            stem = assessment._file_stem().lower()
+            if stem in seen:
+                first = seen[stem]
+                raise ValueError(
+                    f"{entry.get('source') or entry['company']['name']}: "
+                    f"{entry['company']['name']} ({assessment.framework_name})"
+                    f" has the same output file name as "
+                    f"{first['company']['name']} at "
+                    f"{first.get('source') or 'an earlier entry'}; give each "
+                    f"company a unique name")
+            seen[stem] = entry
+
+        self.entries = entries
+        self.max_workers = max_workers or config.GAP_ASSESSMENT_WORKERS
+        self.detail = detail or config.GAP_DETAIL
+        self.assessments = assessments
+        self.timestamp = datetime.now().isoformat()
+
+    def run(self, on_progress=None) -> list:
+        """
+        Evaluate every company × category in one pool.
+
+        Parameters:
+        -----------
+        on_progress : callable, optional
+            Called in the calling thread as each evaluation finishes with
+            a dict: company, category_id, completed, total, failed.
+
+        Returns:
+        --------
+        list : The GapAssessment of each company, in input order, with
+               its results filled in.
+        """
+        compact = self.detail != "full"
+        plans = []
+        jobs = []
+        for ci, (entry, assessment) in enumerate(zip(self.entries,
+                                                     self.assessments)):
+            planned, per_category, pending = assessment._assessment_jobs(
+                entry["states"], compact=compact)
+            plans.append((planned, per_category))
+            jobs.extend(((ci, index), func, args)
+                        for index, func, args in pending)
+            if not planned:
+                print(f"  [WARN] {entry['company']['name']}: no answered "
+                      f"categories")
+
+        print(f"\n  [INFO] Portfolio: {len(self.assessments)} companies, "
+              f"{len(jobs)} category evaluations, "
+              f"{self.max_workers} workers")
+        completed = 0
+        for (ci, index), results in iterate_sync(
+                GapAssessment._aiter_limited(jobs, self.max_workers)):
+            planned, per_category = plans[ci]
+            self.assessments[ci]._record_category(planned, per_category,
+                                                  index, results)
+            completed += 1
+            self._progress(on_progress, ci, planned[index][0]["category_id"],
+                           completed, len(jobs),
+                           GapAssessment._is_failed(results))
+
+        for assessment, (_, per_category) in zip(self.assessments, plans):
+            assessment.results = [r for results in per_category
+                                  for r in results]
+
+        if self.detail == "gaps":
+            self._narrate()
+        return self.assessments
+
+    def _narrate(self):
+        """Narrative pass for every company's low scores, in one pool."""
+        pending = {}
+        jobs = []
+        for ci, assessment in enumerate(self.assessments):
+            by_category, narrative_jobs = assessment._narrative_jobs()
+            pending[ci] = by_category
+            jobs.extend(((ci, cat_id), func, args)
+                        for cat_id, func, args in narrative_jobs)
+        if not jobs:
+            return
+
+        print(f"  [INFO] Portfolio: writing findings for {len(jobs)} "
+              f"categories scoring below 4...")
+        for (ci, cat_id), narratives in iterate_sync(
+                GapAssessment._aiter_limited(jobs, self.max_workers)):
+            self.assessments[ci]._apply_narratives(pending[ci][cat_id],
+                                                   narratives)
+
+    def _progress(self, on_progress, ci: int, cat_id: str, completed: int,
+                  total: int, failed: bool):
+        name = self.entries[ci]["company"]["name"]
+        if on_progress:
+            on_progress({"company": name, "category_id": cat_id,
+                         "completed": completed, "total": total,
+                         "failed": failed})
+            return
+        status = "FAILED" if failed else "done"
+        print(f"  [{completed}/{total}] {name} — {cat_id} {status}")
+
+    def save(self, output_dir: str = None) -> dict:
+        """
+        Save each company's JSON and Excel results and the roll-up
+        workbook into a new timestamped folder.
+
+        Returns:
+        --------
+        dict : {"directory": ..., "companies": [{"company", "json",
+               "xlsx"}, ...], "rollup": path}
+        """
+        stamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        directory = os.path.join(output_dir or config.PORTFOLIO_DIR,
+                                 f"portfolio_{stamp}")
+        os.makedirs(directory, exist_ok=True)
+
+        saved = []
+        rollup_rows = []
+        for assessment in self.assessments:
+            json_path = assessment.save_results(directory)
+            xlsx_path = os.path.splitext(json_path)[0] + ".xlsx"
+            metadata = {
+                "company": assessment.company,
+                "framework": assessment.framework_name,
+                "timestamp": assessment.timestamp,
+            }
+            export_gap_assessment_xlsx(assessment.results, metadata,
+                                       xlsx_path)
+            saved.append({"company": assessment.company["name"],
+                          "json": json_path, "xlsx": xlsx_path})
+            rollup_rows.append(dict(metadata, results=assessment.results))
+
+        rollup_path = os.path.join(directory, f"portfolio_rollup_{stamp}.xlsx")
+        export_portfolio_rollup_xlsx(rollup_rows, rollup_path)
+        return {"directory": directory, "companies": saved,
+                "rollup": rollup_path}
@@ -8,6 +8,7 @@ Converts gaps into formally documented risks with ratings and treatment plans.
 import json
 from datetime import datetime
 from utils.ai_client import structured_output, chat
+from utils.schemas import RISK_ENTRIES
 import config
 
 
@@ -90,19 +91,7 @@ Group related findings. Generate comprehensive risk entries."""
         try:
             print("  🤖 Generating risk register from findings...")
             risks = structured_output(system_prompt, user_prompt,
-                                      max_tokens=4096)
-
-            # Handle various response formats
-            if isinstance(risks, dict):
-                for key in ["risks", "risk_register", "entries", "data"]:
-                    if key in risks:
-                        risks = risks[key]
-                        break
-                else:
-                    risks = [risks]
-
-            if not isinstance(risks, list):
-                risks = [risks]
+                                      max_tokens=4096, schema=RISK_ENTRIES)
 
             self.risks = risks
             print(f"  [OK] Generated {len(risks)} risk entries.")
@@ -112,8 +101,12 @@ Group related findings. Generate comprehensive risk entries."""
             print(f"  [ERROR] Risk register generation failed: {e}")
             return []
 
-    def generate_risk_treatment_plans(self) -> str:
-        """Generate detailed treatment plans for high/critical risks."""
+    def generate_risk_treatment_plans(self, on_token=None) -> str:
+        """
+        Generate detailed treatment plans for high/critical risks.
+
+        Pass on_token to receive the plan text incrementally as it streams.
+        """
 
         high_risks = [r for r in self.risks
                       if r.get("inherent_risk_level") in ["Critical", "High"]]
@@ -140,4 +133,5 @@ Be specific and actionable. Include estimated costs where possible."""
 
 {json.dumps(high_risks, indent=2)}"""
 
-        return chat(system_prompt, user_prompt, temperature=0.3, max_tokens=4000)
\ No newline at end of file
+        return chat(system_prompt, user_prompt, temperature=0.3, max_tokens=4000,
+                    on_token=on_token)
\ No newline at end of file
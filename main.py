@@ -14,8 +14,13 @@ Provides interactive CLI for:
 5. Risk Register Generation
 6. Evidence Tracking
 7. Audit Readiness Assessment
+8. Portfolio Gap Assessments (many companies, headless)
+
+Headless portfolio run:
+    python main.py --portfolio companies.jsonl --framework "NIST CSF 2.0"
 """
 
+import argparse
 import os
 import sys
 import json
@@ -34,11 +39,13 @@ from engines.control_mapper import ControlMapper
 from engines.document_reviewer import DocumentReviewer
 from engines.evidence_tracker import EvidenceTracker
 from engines.audit_readiness import AuditReadinessAssessor
+from engines.portfolio import PortfolioAssessment, load_portfolio
 from utils.document_exporter import (
     export_gap_assessment_xlsx,
     export_risk_register_xlsx,
     export_evidence_tracker_xlsx,
 )
+from utils.telemetry import run_summary, format_summary
 
 
 # ══════════════════════════════════════════════════════
@@ -85,6 +92,38 @@ def select_framework() -> str:
     return "NIST CSF 2.0"
 
 
+def select_recent_file(directory: str, prefix: str, suffix: str,
+                       heading: str, prompt: str, skip=None) -> str:
+    """
+    Offer the 5 newest matching files in `directory` (leaving out those
+    for which `skip(path)` is true). Returns a path or None.
+    """
+    if not os.path.isdir(directory):
+        return None
+    paths = sorted(
+        (os.path.join(directory, f) for f in os.listdir(directory)
+         if f.startswith(prefix) and f.endswith(suffix)),
+        key=os.path.getmtime, reverse=True,
+    )
+    if skip is not None:
+        paths = [p for p in paths if not skip(p)]
+    paths = paths[:5]
+    if not paths:
+        return None
+
+    print(f"\n  {heading}")
+    for i, path in enumerate(paths, 1):
+        print(f"    {i}. {os.path.basename(path)}")
+    choice = input(f"\n  {prompt} (number), or press Enter to start new: ").strip()
+    try:
+        idx = int(choice) - 1
+        if 0 <= idx < len(paths):
+            return paths[idx]
+    except ValueError:
+        pass
+    return None
+
+
 def confirm(prompt: str) -> bool:
     """Simple y/n confirmation."""
     return input(f"\n  {prompt} (y/n): ").strip().lower() in ["y", "yes"]
@@ -95,6 +134,22 @@ def timestamp() -> str:
     return datetime.now().strftime("%Y%m%d_%H%M%S")
 
 
+def print_llm_summary():
+    """Print where this run's LLM time and money went."""
+    summary = run_summary()
+    if not summary["totals"]["calls"]:
+        return
+    print(f"\n{'─'*60}")
+    print("  📈 LLM USAGE THIS RUN")
+    print(format_summary(summary))
+    print(f"{'─'*60}")
+
+
+def print_stream(text: str):
+    """on_token callback: echo streamed text as it arrives."""
+    print(text, end="", flush=True)
+
+
 # ══════════════════════════════════════════════════════
 # 1. GAP ASSESSMENT
 # ══════════════════════════════════════════════════════
@@ -105,16 +160,39 @@ def run_gap_assessment():
     print("  🔍 GAP ASSESSMENT ENGINE")
     print("=" * 60)
 
-    company = get_company_info()
-    framework = select_framework()
+    checkpoint = select_recent_file(
+        config.GAP_CHECKPOINT_DIR, "gap_checkpoint_", ".jsonl",
+        "Saved assessment checkpoints:", "Resume one",
+        skip=GapAssessment.is_checkpoint_complete)
+    prior = None
+    if not checkpoint:
+        prior = select_recent_file(
+            config.GAP_ASSESSMENT_DIR, "gap_assessment_", ".json",
+            "Previous assessments:", "Update one with revised answers")
+
+    if checkpoint:
+        # Keeps finished categories; asks only for unanswered ones
+        assessment = GapAssessment.resume(checkpoint, interactive=True)
+        company = assessment.company
+        framework = assessment.framework_name
+        results = assessment.results
+    elif prior:
+        # Only categories whose answer or controls changed are re-evaluated
+        assessment = GapAssessment.reassess(prior, interactive=True)
+        company = assessment.company
+        framework = assessment.framework_name
+        results = assessment.results
+    else:
+        company = get_company_info()
+        framework = select_framework()
 
-    print(f"\n  Starting gap assessment for {company['name']} "
-          f"against {framework}...")
-    print("  For each control area, describe your current state.")
-    print("  Type 'skip' to skip a domain, 'none' if nothing exists.\n")
+        print(f"\n  Starting gap assessment for {company['name']} "
+              f"against {framework}...")
+        print("  For each control area, describe your current state.")
+        print("  Type 'skip' to skip a domain, 'none' if nothing exists.\n")
 
-    assessment = GapAssessment(company, framework)
-    results = assessment.run_interactive_assessment()
+        assessment = GapAssessment(company, framework)
+        results = assessment.run_interactive_assessment()
 
     if not results:
         print("\n  ⚠️  No results generated.")
@@ -193,7 +271,10 @@ def run_gap_assessment():
             # Treatment plans
             if confirm("Generate Risk Treatment Plans?"):
                 print("\n  ⏳ Generating Treatment Plans...")
-                treatments = risk_engine.generate_risk_treatment_plans()
+                print(f"\n{'─'*60}")
+                treatments = risk_engine.generate_risk_treatment_plans(
+                    on_token=print_stream)
+                print(f"\n{'─'*60}")
                 treatment_path = os.path.join(
                     config.REPORT_DIR,
                     f"risk_treatment_plans_{timestamp()}.md"
@@ -258,18 +339,14 @@ def run_policy_generator():
             context = input("  Additional context (optional): ").strip()
 
             print(f"\n  ⏳ Generating {policy_name}...")
+            print(f"\n{'─'*60}")
             content = generator.generate_policy(
                 policy_name,
                 framework=framework or None,
                 additional_context=context or "",
+                on_token=print_stream,
             )
-
-            # Preview
             print(f"\n{'─'*60}")
-            print(content[:3000])
-            if len(content) > 3000:
-                print("\n  ...[truncated — see full file]")
-            print(f"{'─'*60}")
 
             # Save
             path = generator.save_document(content, "policy", policy_name)
@@ -285,17 +362,14 @@ def run_policy_generator():
             context = input("  Additional context (optional): ").strip()
 
             print(f"\n  ⏳ Generating: {proc_name}...")
+            print(f"\n{'─'*60}")
             content = generator.generate_procedure(
                 proc_name,
                 related_policy=related_policy,
                 additional_context=context,
+                on_token=print_stream,
             )
-
             print(f"\n{'─'*60}")
-            print(content[:3000])
-            if len(content) > 3000:
-                print("\n  ...[truncated]")
-            print(f"{'─'*60}")
 
             path = generator.save_document(content, "procedure", proc_name)
 
@@ -344,6 +418,23 @@ def run_policy_generator():
             if not confirm(f"Proceed with generating {len(relevant)} policies?"):
                 continue
 
+            if confirm("Submit as an offline batch? (cheaper, but results "
+                       "can take up to 24 hours)"):
+                print("\n  ⏳ Submitting policy suite as a Message Batch...")
+                generated = generator.generate_policy_suite(
+                    relevant, framework=framework, use_batch=True
+                )
+                for i, (pol_name, content) in enumerate(generated.items(), 1):
+                    if content.startswith("ERROR"):
+                        print(f"  [{i}/{len(relevant)}] ❌ Failed: {pol_name} — {content}")
+                        continue
+                    generator.save_document(content, "policy", pol_name)
+                    print(f"  [{i}/{len(relevant)}] ✅ Done: {pol_name}")
+
+                print(f"\n  ✅ Policy suite generation complete!")
+                print(f"  📁 Saved to: {config.POLICY_DIR}/")
+                continue
+
             for i, pol_name in enumerate(relevant, 1):
                 print(f"\n  [{i}/{len(relevant)}] ⏳ Generating: {pol_name}...")
                 try:
@@ -471,15 +562,16 @@ def run_document_review():
         print(f"  📏 Document length: {len(doc_text):,} characters")
 
         print(f"\n  ⏳ Reviewing against {framework}...")
-        review = reviewer.review_policy_against_framework(
-            doc_text, doc_name, framework
-        )
+        try:
+            review = reviewer.review_policy_against_framework(
+                doc_text, doc_name, framework
+            )
+        except Exception as e:
+            print(f"  ❌ Review failed: {e}")
+            return
 
         # Display & save
-        if isinstance(review, dict):
-            output = json.dumps(review, indent=2)
-        else:
-            output = str(review)
+        output = json.dumps(review, indent=2)
 
         print(f"\n{'─'*60}")
         print(output[:3000])
@@ -676,11 +768,10 @@ def run_audit_readiness():
                        if existing_pols else None)
 
         print(f"\n  ⏳ Assessing audit readiness...")
-        result = assessor.assess_readiness(policy_list=policy_list)
-
         print(f"\n{'─'*60}")
-        print(result)
-        print(f"{'─'*60}")
+        result = assessor.assess_readiness(policy_list=policy_list,
+                                           on_token=print_stream)
+        print(f"\n{'─'*60}")
 
         save_path = os.path.join(
             config.REPORT_DIR,
@@ -725,23 +816,79 @@ def quick_policy():
         return
 
     print(f"\n  ⏳ Generating {policy_name}...")
-    content = gen.generate_policy(policy_name)
-
     print(f"\n{'─'*60}")
-    print(content[:3000])
-    if len(content) > 3000:
-        print("\n  ...[truncated — see full file]")
-    print(f"{'─'*60}")
+    content = gen.generate_policy(policy_name, on_token=print_stream)
+    print(f"\n{'─'*60}")
 
     gen.save_document(content, "policy", policy_name)
 
 
+# ══════════════════════════════════════════════════════
+# 8. PORTFOLIO GAP ASSESSMENT (headless)
+# ══════════════════════════════════════════════════════
+
+def run_portfolio_assessment(path: str = None, framework: str = None,
+                             workers: int = None):
+    """
+    Gap assessments for every company in a JSONL/CSV file, all categories
+    of all companies through one worker pool (see engines/portfolio.py).
+    """
+    print("\n" + "=" * 60)
+    print("  🏢 PORTFOLIO GAP ASSESSMENT")
+    print("=" * 60)
+
+    if path is None:
+        path = input("\n  Portfolio file (.jsonl or .csv): ").strip()
+    try:
+        entries = load_portfolio(path)
+    except (OSError, ValueError) as e:
+        print(f"  ⚠️  Could not read portfolio: {e}")
+        return None
+    if not entries:
+        print("  ⚠️  No companies in the portfolio file.")
+        return None
+
+    if framework is None and any(not e["framework"] for e in entries):
+        framework = select_framework()
+    print(f"\n  {len(entries)} companies loaded from {path}")
+
+    try:
+        portfolio = PortfolioAssessment(entries, framework,
+                                        max_workers=workers)
+    except ValueError as e:
+        print(f"  ⚠️  Invalid portfolio: {e}")
+        return None
+    portfolio.run()
+    saved = portfolio.save()
+
+    print(f"\n  ✅ Portfolio complete: {len(saved['companies'])} companies")
+    print(f"  📊 Roll-up: {saved['rollup']}")
+    print(f"  📁 All outputs saved to: {saved['directory']}/")
+    return saved
+
+
 # ══════════════════════════════════════════════════════
 # MAIN MENU
 # ══════════════════════════════════════════════════════
 
+def parse_args(argv: list = None):
+    """Command-line flags; with none, the interactive menu runs."""
+    parser = argparse.ArgumentParser(description="GRC Automation Toolkit")
+    parser.add_argument("--portfolio", metavar="FILE",
+                        help="run headless gap assessments for every company "
+                             "in a JSONL/CSV file, then exit")
+    parser.add_argument("--framework",
+                        help="framework for portfolio companies that don't "
+                             "name one (e.g. \"NIST CSF 2.0\")")
+    parser.add_argument("--workers", type=int,
+                        help="evaluations in flight at once across the "
+                             "portfolio (default: GRC_GAP_WORKERS)")
+    return parser.parse_args(argv)
+
+
 def main():
     """Main application entry point."""
+    args = parse_args()
     # Check API key
     if (config.ANTHROPIC_API_KEY == "your-anthropic-api-key-here"
             and not os.getenv("ANTHROPIC_API_KEY")):
@@ -750,6 +897,12 @@ def main():
         print("    export ANTHROPIC_API_KEY='your-key-here'")
         print("  Or edit config.py directly.\n")
 
+    if args.portfolio:
+        saved = run_portfolio_assessment(args.portfolio, args.framework,
+                                         args.workers)
+        print_llm_summary()
+        sys.exit(0 if saved else 1)
+
     print("""
     ╔══════════════════════════════════════════════════╗
     ║         🛡️  GRC AUTOMATION TOOLKIT v1.0          ║
@@ -770,8 +923,9 @@ def main():
         print("  5. 📁 Evidence Tracker")
         print("  6. ✅ Audit Readiness")
         print("  7. ⚡ Quick Policy (Single Command)")
-        print("  8. 🌐 Launch Web UI")
-        print("  9. 🚪 Exit")
+        print("  8. 🏢 Portfolio Gap Assessment (from file)")
+        print("  9. 🌐 Launch Web UI")
+        print("  10. 🚪 Exit")
 
         choice = input("\n  Select option: ").strip()
 
@@ -790,6 +944,8 @@ def main():
         elif choice == "7":
             quick_policy()
         elif choice == "8":
+            run_portfolio_assessment()
+        elif choice == "9":
             print("\n  🌐 Launching Streamlit Web UI...")
             print("  Run this command in your terminal:")
             print("    streamlit run web_app.py\n")
@@ -798,7 +954,8 @@ def main():
             except Exception:
                 print("  ⚠️  Could not auto-launch. "
                       "Run 'streamlit run web_app.py' manually.")
-        elif choice == "9":
+        elif choice == "10":
+            print_llm_summary()
             print("\n  👋 Goodbye! Stay compliant!\n")
             sys.exit(0)
         else:
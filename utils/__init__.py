@@ -1,5 +1,29 @@
-from utils.ai_client import chat, structured_output, chat_with_context
-from utils.framework_loader import load_framework, get_all_controls
+from utils.ai_client import (
+    chat,
+    structured_output,
+    chat_with_context,
+    chat_stream,
+    achat,
+    astream_chat,
+    astructured_output,
+    achat_with_context,
+    gather_limited,
+    run_sync,
+    cache_stats,
+    cacheable_system,
+    last_call_usage,
+    prompt_cache_stats,
+)
+from utils.batch_client import BatchJob, LocalBatchBackend
+from utils.schemas import SchemaValidationError
+from utils.telemetry import run_summary, reset_run, format_summary
+from utils.framework_loader import (
+    load_framework,
+    get_all_controls,
+    get_registry,
+    FrameworkRegistry,
+)
+from utils.control_search import search_controls
 from utils.document_exporter import (
     export_gap_assessment_xlsx,
     export_risk_register_xlsx,
@@ -6,90 +6,346 @@ Location: grc_toolkit/utils/ai_client.py
 All LLM calls go through this module.
 Switching from OpenAI to Anthropic only requires changing THIS file.
 
+Backends:
+- The provider call itself is delegated to a backend from
+  utils/llm_backends.py (Anthropic by default, an OpenAI-compatible
+  endpoint, or an offline fake), chosen with config.LLM_BACKEND.
+  Everything else here — cache, rate limiting, retries, concurrency —
+  is shared by all backends.
+
 Anthropic API differences from OpenAI:
 - Uses "system" as a separate parameter (not in messages array)
 - Messages array only contains "user" and "assistant" roles
 - Response structure: response.content[0].text
 - No "max_tokens" default — MUST be specified
+
+Concurrency model:
+- The real work happens in the async functions (achat, astructured_output, ...)
+  built on the backend's async API.
+- Every request passes through a concurrency gate sized by
+  config.MAX_CONCURRENT_REQUESTS, so fan-out with gather_limited() never
+  exceeds the configured number of in-flight calls.
+- The sync functions (chat, structured_output, ...) are thin wrappers that
+  run the async version on a shared background event loop, so existing
+  engines keep working unchanged and share the same gate.
+
+Response cache:
+- Identical requests (model, system prompt, messages, temperature,
+  max_tokens) are answered from a persistent on-disk cache
+  (utils/response_cache.py). Pass use_cache=False to bypass it for a call.
+
+Rate limiting:
+- All callers share one request/token budget (utils/rate_limiter.py).
+  Rate limits, overload and connection errors are retried with jittered
+  exponential backoff, up to config.LLM_MAX_RETRIES attempts.
+
+Prompt caching:
+- Long system prompts that repeat across calls can be marked with
+  cache_control so Anthropic reuses the processed prefix. Pass
+  cache_system=True, or build blocks yourself with
+  cacheable_system(stable_prefix, dynamic_suffix). Only prefixes (tools +
+  system) of at least cache_min_tokens() are cached; a shorter marked
+  prefix gets a one-time [WARN]. The engines' current prompts (gap
+  rubric, policy templates, evidence lists) are all around 400-600
+  tokens, so they are sent without a breakpoint.
+- Token usage for the most recent call (including cache read/write
+  tokens) is available from last_call_usage(); running totals from
+  prompt_cache_stats().
+
+Structured output:
+- structured_output(..., schema=...) sends the JSON Schema (utils/schemas.py)
+  as a forced tool call and validates the returned input locally, raising
+  SchemaValidationError on a mismatch. Without a schema the older
+  "respond with JSON only" instructions are used.
+
+Telemetry:
+- Every call (including cache hits and failures) is recorded with its
+  latency, tokens, cost, retries and calling engine method; see
+  utils/telemetry.py. run_summary() gives the per-run breakdown.
+
+Streaming:
+- chat(..., on_token=callback) streams the response and calls the callback
+  with each text delta; chat_stream() / astream_chat() expose the deltas as
+  a (async) iterator. Long documents start rendering after the first token
+  instead of after the whole response.
 """
 
-import anthropic
+import asyncio
+import contextvars
 import json
+import queue
+import threading
 import time
+import weakref
 import config
+from utils.rate_limiter import (
+    get_rate_limiter,
+    estimate_tokens,
+    backoff_delay,
+    retry_after_seconds,
+)
+from utils.response_cache import ResponseCache, make_cache_key
+from utils.json_extract import extract_json
+from utils.schemas import validate
+from utils.telemetry import get_telemetry, caller_label, estimate_cost
+from utils.llm_backends import (
+    get_backend,
+    response_text,
+    LLMResponse,
+    RateLimitedError,
+    TransientBackendError,
+)
+
+# asyncio semaphores are bound to the event loop they were created on, so
+# we keep one per running loop.
+_loop_state = weakref.WeakKeyDictionary()
+
+# Background loop used by the sync wrappers
+_background_loop = None
+_background_lock = threading.Lock()
+
+# Persistent response cache (created lazily on first use)
+_response_cache = None
+_cache_lock = threading.Lock()
+
+# Token usage of the most recent call in the current thread/task
+_last_usage = contextvars.ContextVar("ai_client_last_usage", default=None)
+
+# Engine method on whose behalf calls are made (for telemetry). Set by the
+# sync wrappers in the caller's thread and inherited by the coroutines.
+_call_site = contextvars.ContextVar("ai_client_call_site", default=None)
+
+# Running token totals for prompt caching
+_usage_totals = {
+    "calls": 0,
+    "input_tokens": 0,
+    "cache_creation_input_tokens": 0,
+    "cache_read_input_tokens": 0,
+    "output_tokens": 0,
+}
+_usage_lock = threading.Lock()
 
-# Initialize Anthropic client
-client = anthropic.Anthropic(api_key=config.ANTHROPIC_API_KEY)
+CACHE_CONTROL = {"type": "ephemeral"}
 
+# Shortest prefix (tools + system up to the breakpoint) Anthropic caches
+CACHE_MIN_TOKENS = 1024
+CACHE_MIN_TOKENS_HAIKU = 2048
+_short_prefix_warned = set()
 
-def chat(system_prompt: str, user_prompt: str, temperature: float = 0.3,
-         model: str = None, max_tokens: int = None) -> str:
+# Tool Claude is forced to call when structured_output() is given a schema
+OUTPUT_TOOL_NAME = "record_output"
+
+
+def _get_loop_state() -> dict:
+    """Return the concurrency gate for the running loop."""
+    loop = asyncio.get_running_loop()
+    state = _loop_state.get(loop)
+    if state is None:
+        state = {
+            "semaphore": asyncio.Semaphore(config.MAX_CONCURRENT_REQUESTS),
+        }
+        _loop_state[loop] = state
+    return state
+
+
+def get_response_cache():
+    """Return the shared ResponseCache, or None when caching is disabled."""
+    global _response_cache
+    if not config.LLM_CACHE_ENABLED:
+        return None
+    with _cache_lock:
+        if _response_cache is None:
+            _response_cache = ResponseCache(
+                config.LLM_CACHE_PATH,
+                max_bytes=config.LLM_CACHE_MAX_BYTES,
+                ttl_seconds=config.LLM_CACHE_TTL_SECONDS,
+            )
+    return _response_cache
+
+
+def cache_stats() -> dict:
+    """Hit/miss counters and size of the response cache."""
+    cache = get_response_cache()
+    if cache is None:
+        return {"enabled": False}
+    stats = cache.stats()
+    stats["enabled"] = True
+    return stats
+
+
+def _get_background_loop() -> asyncio.AbstractEventLoop:
+    """Start (once) and return the event loop that serves the sync API."""
+    global _background_loop
+    with _background_lock:
+        if _background_loop is None:
+            loop = asyncio.new_event_loop()
+            thread = threading.Thread(target=loop.run_forever,
+                                      name="ai-client-loop", daemon=True)
+            thread.start()
+            _background_loop = loop
+    return _background_loop
+
+
+def run_sync(coro):
     """
-    Send a single-turn chat completion request to Claude.
-    
-    Args:
-        system_prompt: System instructions (Claude's role/behavior)
-        user_prompt: The user's question/request
-        temperature: 0.0-1.0 (lower = more consistent, good for GRC)
-        model: Override default model
-        max_tokens: Override default max tokens
-    
-    Returns:
-        str: Claude's response text
+    Run a coroutine on the shared background loop and wait for its result.
+
+    Safe to call from any thread (including Streamlit's script thread and
+    code that already has its own event loop running), except from inside
+    the background loop itself.
     """
+    loop = _get_background_loop()
     try:
-        response = client.messages.create(
-            model=model or config.MODEL,
-            max_tokens=max_tokens or config.MAX_TOKENS,
-            system=system_prompt,
-            messages=[
-                {"role": "user", "content": user_prompt}
-            ],
-            temperature=temperature,
-        )
-        return response.content[0].text
-    except anthropic.RateLimitError:
-        print("[WARN] Rate limited. Waiting 30 seconds...")
-        time.sleep(30)
-        return chat(system_prompt, user_prompt, temperature, model, max_tokens)
-    except anthropic.APIError as e:
-        print(f"[ERROR] Anthropic API error: {e}")
-        raise
-    except Exception as e:
-        print(f"[ERROR] AI call failed: {e}")
-        raise
+        running = asyncio.get_running_loop()
+    except RuntimeError:
+        running = None
+    if running is loop:
+        coro.close()
+        raise RuntimeError("run_sync() cannot be called from the ai_client "
+                           "event loop — await the async function instead.")
 
+    call_site = _call_site.get() or caller_label(2)
 
-def chat_with_context(system_prompt: str, messages: list,
-                      temperature: float = 0.3,
-                      max_tokens: int = None) -> str:
+    async def _with_usage():
+        _call_site.set(call_site)
+        result = await coro
+        return result, _last_usage.get()
+
+    result, usage = asyncio.run_coroutine_threadsafe(_with_usage(), loop).result()
+    # Make last_call_usage() work for the calling thread too
+    _last_usage.set(usage)
+    return result
+
+
+def cacheable_system(stable_prefix: str, dynamic_suffix: str = "") -> list:
     """
-    Multi-turn conversation — useful for iterative refinement.
-    
-    Args:
-        system_prompt: System instructions
-        messages: List of {"role": "user"/"assistant", "content": "..."}
-                  NOTE: Anthropic requires alternating user/assistant messages
-                  and the first message must be from "user"
-        temperature: 0.0-1.0
-    
+    Build a system prompt whose stable prefix is marked for prompt caching.
+
+    Anything that changes between calls belongs in `dynamic_suffix` (or in
+    the user prompt); the prefix must be byte-identical across calls to be
+    reused. Note that Anthropic only caches prefixes above a minimum length
+    (1024 tokens for Sonnet/Opus, 2048 for Haiku); shorter prefixes are
+    sent normally and simply report zero cache tokens (build_request warns
+    once per prefix when that happens).
+    """
+    blocks = [{"type": "text", "text": stable_prefix,
+               "cache_control": CACHE_CONTROL}]
+    if dynamic_suffix:
+        blocks.append({"type": "text", "text": dynamic_suffix})
+    return blocks
+
+
+def _system_param(system_prompt, cache_system: bool = False):
+    """Normalize a str/list system prompt into the API parameter."""
+    if isinstance(system_prompt, list):
+        return system_prompt
+    if cache_system:
+        return cacheable_system(system_prompt)
+    return system_prompt
+
+
+def cache_min_tokens(model: str = None) -> int:
+    """Minimum cacheable prefix length for a model."""
+    model = model or config.MODEL
+    return CACHE_MIN_TOKENS_HAIKU if "haiku" in model else CACHE_MIN_TOKENS
+
+
+def _warn_short_cache_prefix(params: dict):
+    """
+    Warn once per prefix when a cache breakpoint sits on a prefix too short
+    to be cached, so the opt-in doesn't silently do nothing.
+    """
+    system = params["system"]
+    if not isinstance(system, list):
+        return
+    marked = [i for i, b in enumerate(system) if "cache_control" in b]
+    if not marked:
+        return
+    prefix = "".join(b["text"] for b in system[:marked[-1] + 1])
+    tokens = estimate_tokens(prefix)
+    if params.get("tools"):
+        tokens += estimate_tokens(json.dumps(params["tools"]))
+    minimum = cache_min_tokens(params["model"])
+    key = (params["model"], prefix[:200])
+    if tokens >= minimum or key in _short_prefix_warned:
+        return
+    _short_prefix_warned.add(key)
+    first_line = prefix.strip().splitlines()[0][:60] if prefix.strip() else ""
+    print(f"  [WARN] Prompt caching requested on a ~{tokens}-token prefix "
+          f"(\"{first_line}...\"); {params['model']} only caches prefixes "
+          f"of {minimum}+ tokens, so it will not be cached.")
+
+
+def _append_system(system_prompt, text: str):
+    """
+    Append constant text to a str or block-list system prompt.
+
+    If the prompt currently ends in a cache breakpoint, the breakpoint is
+    moved to the appended block so the constant text is cached as well.
+    """
+    if not isinstance(system_prompt, list):
+        return system_prompt + text
+    blocks = [dict(b) for b in system_prompt]
+    new_block = {"type": "text", "text": text.lstrip("\n")}
+    if blocks and "cache_control" in blocks[-1]:
+        new_block["cache_control"] = blocks[-1].pop("cache_control")
+    blocks.append(new_block)
+    return blocks
+
+
+def _record_usage(usage: dict):
+    """Remember usage for last_call_usage() and add it to the totals."""
+    _last_usage.set(usage)
+    with _usage_lock:
+        _usage_totals["calls"] += 1
+        for key in ("input_tokens", "cache_creation_input_tokens",
+                    "cache_read_input_tokens", "output_tokens"):
+            _usage_totals[key] += usage.get(key, 0)
+
+
+def last_call_usage() -> dict:
+    """
+    Token usage for the most recent call made from this thread/task.
+
+    Keys: input_tokens, cache_creation_input_tokens,
+    cache_read_input_tokens, output_tokens, response_cache_hit.
+    """
+    return _last_usage.get()
+
+
+def prompt_cache_stats() -> dict:
+    """Running token totals, including prompt-cache reads and writes."""
+    with _usage_lock:
+        totals = dict(_usage_totals)
+    cacheable = (totals["cache_read_input_tokens"]
+                 + totals["cache_creation_input_tokens"])
+    totals["cache_read_ratio"] = (
+        round(totals["cache_read_input_tokens"] / cacheable, 3)
+        if cacheable else 0.0)
+    return totals
+
+
+def _prepare_messages(system_prompt, messages: list) -> tuple:
+    """
+    Convert a generic message list into Anthropic's format.
+
     Returns:
-        str: Claude's response text
+        tuple: (system_prompt, validated_messages)
     """
-    # Validate message format for Anthropic
     validated_messages = []
     for msg in messages:
         role = msg.get("role", "user")
         # Anthropic only accepts "user" and "assistant" in messages
         if role == "system":
             # Append system content to the system_prompt instead
-            system_prompt += f"\n\n{msg['content']}"
+            system_prompt = _append_system(system_prompt,
+                                           f"\n\n{msg['content']}")
             continue
         validated_messages.append({
             "role": role,
             "content": msg["content"]
         })
-    
+
     # Ensure first message is from user (Anthropic requirement)
     if validated_messages and validated_messages[0]["role"] != "user":
         validated_messages.insert(0, {
@@ -97,41 +353,526 @@ def chat_with_context(system_prompt: str, messages: list,
             "content": "Please continue."
         })
 
+    return system_prompt, validated_messages
+
+
+def _output_tool(schema: dict) -> dict:
+    """Wrap a JSON Schema as the tool definition used for structured output."""
+    # Tool inputs must be objects, so arrays travel as {"items": [...]}
+    if schema.get("type") != "object":
+        schema = {"type": "object", "properties": {"items": schema},
+                  "required": ["items"]}
+    return {
+        "name": OUTPUT_TOOL_NAME,
+        "description": "Record the result of the requested analysis.",
+        "input_schema": schema,
+    }
+
+
+def build_request(system_prompt, messages: list, temperature: float = 0.3,
+                  model: str = None, max_tokens: int = None,
+                  cache_system: bool = False, structured: bool = False,
+                  schema: dict = None) -> dict:
+    """
+    Build Messages API parameters exactly as chat()/structured_output() send
+    them. Used by the batch backend so batched requests are byte-identical
+    to interactive ones (and share the same response-cache keys).
+
+    Args:
+        system_prompt: str or list of system blocks
+        messages: Anthropic-format message list
+        structured: Add the JSON-only instructions used by structured_output()
+        schema: JSON Schema for the result; forces a tool call instead of
+                relying on the JSON-only instructions
+    """
+    system = _system_param(system_prompt, cache_system)
+    if structured and schema is None:
+        system = _json_system_prompt(system)
+    params = {
+        "model": model or config.MODEL,
+        "max_tokens": max_tokens or config.MAX_TOKENS,
+        "system": system,
+        "messages": messages,
+        "temperature": temperature,
+    }
+    if schema is not None:
+        params["tools"] = [_output_tool(schema)]
+        params["tool_choice"] = {"type": "tool", "name": OUTPUT_TOOL_NAME}
+    if config.LLM_BACKEND == "anthropic":
+        _warn_short_cache_prefix(params)
+    return params
+
+
+def request_cache_key(params: dict) -> str:
+    """Response-cache key for a request on the configured backend."""
+    if config.LLM_BACKEND == "anthropic":
+        return make_cache_key(**params)
+    # Keep other backends' answers (especially the fake's) apart
+    return make_cache_key(**params, backend=config.LLM_BACKEND)
+
+
+def parse_structured(text: str, schema: dict = None):
+    """
+    Parse a structured_output() response and, if a schema was used,
+    validate it (raises SchemaValidationError on mismatch).
+    """
+    data = parse_json_response(text)
+    if schema is None:
+        return data
+    if (schema.get("type") != "object" and isinstance(data, dict)
+            and "items" in data):
+        data = data["items"]
+    return validate(data, schema)
+
+
+_CACHE_HIT_USAGE = {
+    "input_tokens": 0,
+    "cache_creation_input_tokens": 0,
+    "cache_read_input_tokens": 0,
+    "output_tokens": 0,
+    "response_cache_hit": True,
+}
+
+
+def _estimate_input(params: dict) -> int:
+    return estimate_tokens(
+        json.dumps(params["system"]) + json.dumps(params["messages"]))
+
+
+def _account_response(response: LLMResponse, estimated_input: int) -> dict:
+    """Record token usage of a finished response and settle the rate budget."""
+    usage = response.usage()
+    usage["response_cache_hit"] = False
+    _record_usage(usage)
+
+    limiter = get_rate_limiter()
+    limiter.observe_headers(response.headers)
+    # Cache reads don't count against the input-token rate limit
+    limiter.record_usage(estimated_input,
+                         usage["input_tokens"]
+                         + usage["cache_creation_input_tokens"],
+                         usage["output_tokens"])
+    return usage
+
+
+async def _retry_wait(e: Exception, attempt: int):
+    """
+    Shared retry policy for retryable API errors: re-raise once retries are
+    exhausted, otherwise back off (pausing everyone on a 429).
+    """
+    limiter = get_rate_limiter()
+    headers = e.headers
+    limiter.observe_headers(headers)
+    if attempt >= config.LLM_MAX_RETRIES:
+        print(f"[ERROR] Giving up after {attempt + 1} attempts: {e}")
+        raise e
+    retry_after = retry_after_seconds(headers)
+    wait = backoff_delay(attempt, retry_after)
+    if isinstance(e, RateLimitedError):
+        # Everyone shares the same budget, so everyone backs off
+        limiter.pause(retry_after if retry_after is not None else wait)
+        print(f"[WARN] Rate limited. Retrying in {wait:.1f}s "
+              f"(attempt {attempt + 1}/{config.LLM_MAX_RETRIES})...")
+    else:
+        print(f"[WARN] {e}. Retrying in {wait:.1f}s "
+              f"(attempt {attempt + 1}/{config.LLM_MAX_RETRIES})...")
+    await asyncio.sleep(wait)
+
+
+def _emit_telemetry(params: dict, kind: str, started: float, sent: float,
+                    first_token: float, retries: int,
+                    response: LLMResponse = None, cache_hit: bool = False,
+                    error: Exception = None):
+    """Send one call's record to the telemetry sinks."""
+    finished = time.monotonic()
+    usage = response.usage() if response is not None else {}
+    get_telemetry().record({
+        "caller": _call_site.get() or caller_label(2),
+        "backend": config.LLM_BACKEND,
+        "model": params["model"],
+        "kind": kind,
+        "wall_seconds": round(finished - started, 4),
+        "wait_seconds": round((sent or finished) - started, 4),
+        "ttft_seconds": (round(first_token - started, 4)
+                         if first_token is not None else None),
+        "input_tokens": usage.get("input_tokens", 0),
+        "output_tokens": usage.get("output_tokens", 0),
+        "cache_read_input_tokens": usage.get("cache_read_input_tokens", 0),
+        "cache_creation_input_tokens":
+            usage.get("cache_creation_input_tokens", 0),
+        "cost_usd": round(estimate_cost(params["model"], usage), 6),
+        "stop_reason": response.stop_reason if response is not None else None,
+        "retries": retries,
+        "response_cache_hit": cache_hit,
+        "error": f"{type(error).__name__}: {error}" if error else None,
+    })
+
+
+async def asend(params: dict, use_cache: bool = True) -> str:
+    """
+    Send prebuilt request parameters (see build_request) through the
+    response cache, rate limiter and concurrency gate.
+
+    Returns:
+        str: Claude's response text
+    """
+    kind = "structured" if params.get("tools") else "chat"
+    started = time.monotonic()
+    cache = get_response_cache() if use_cache else None
+    if cache is not None:
+        cache_key = request_cache_key(params)
+        cached = cache.get(cache_key)
+        if cached is not None:
+            _last_usage.set(dict(_CACHE_HIT_USAGE))
+            _emit_telemetry(params, kind, started, None, None, 0,
+                            cache_hit=True)
+            return cached
+
+    backend = get_backend()
+    state = _get_loop_state()
+    limiter = get_rate_limiter()
+    estimated_input = _estimate_input(params)
+    sent = None
+
+    for attempt in range(config.LLM_MAX_RETRIES + 1):
+        try:
+            async with state["semaphore"]:
+                # Queue on the shared budget; everyone waits only as long
+                # as their own reservation needs
+                delay = limiter.reserve(estimated_input)
+                if delay > 0:
+                    await asyncio.sleep(delay)
+
+                sent = time.monotonic()
+                response = await backend.acreate(params)
+
+            _account_response(response, estimated_input)
+            # The whole answer arrives at once, so first token = completion
+            _emit_telemetry(params, kind, started, sent, time.monotonic(),
+                            attempt, response=response)
+            if cache is not None:
+                cache.put(cache_key, response.text)
+            return response.text
+        except TransientBackendError as e:
+            try:
+                await _retry_wait(e, attempt)
+            except TransientBackendError:
+                _emit_telemetry(params, kind, started, sent, None, attempt,
+                                error=e)
+                raise
+        except Exception as e:
+            print(f"[ERROR] AI call failed: {e}")
+            _emit_telemetry(params, kind, started, sent, None, attempt,
+                            error=e)
+            raise
+
+
+async def astream(params: dict, use_cache: bool = True):
+    """
+    Streaming version of asend(): an async generator of text deltas.
+
+    Goes through the same response cache, rate limiter and concurrency
+    gate. A cached response is yielded as a single chunk. Failures before
+    the first delta are retried like asend(); once text has been yielded
+    an error is raised to the consumer instead, since the partial output
+    can't be taken back.
+    """
+    started = time.monotonic()
+    cache = get_response_cache() if use_cache else None
+    if cache is not None:
+        cache_key = request_cache_key(params)
+        cached = cache.get(cache_key)
+        if cached is not None:
+            _last_usage.set(dict(_CACHE_HIT_USAGE))
+            _emit_telemetry(params, "stream", started, None, None, 0,
+                            cache_hit=True)
+            yield cached
+            return
+
+    backend = get_backend()
+    state = _get_loop_state()
+    limiter = get_rate_limiter()
+    estimated_input = _estimate_input(params)
+    sent = None
+
+    for attempt in range(config.LLM_MAX_RETRIES + 1):
+        parts = []
+        first_token = None
+        try:
+            async with state["semaphore"]:
+                delay = limiter.reserve(estimated_input)
+                if delay > 0:
+                    await asyncio.sleep(delay)
+
+                sent = time.monotonic()
+                response = None
+                async for item in backend.astream(params):
+                    if isinstance(item, LLMResponse):
+                        response = item
+                    else:
+                        if first_token is None:
+                            first_token = time.monotonic()
+                        parts.append(item)
+                        yield item
+
+            if response is not None:
+                _account_response(response, estimated_input)
+            _emit_telemetry(params, "stream", started, sent, first_token,
+                            attempt, response=response)
+            if cache is not None:
+                cache.put(cache_key, "".join(parts))
+            return
+        except TransientBackendError as e:
+            if parts:
+                print(f"[ERROR] Stream interrupted after partial output: {e}")
+                _emit_telemetry(params, "stream", started, sent, first_token,
+                                attempt, error=e)
+                raise
+            try:
+                await _retry_wait(e, attempt)
+            except TransientBackendError:
+                _emit_telemetry(params, "stream", started, sent, None,
+                                attempt, error=e)
+                raise
+        except Exception as e:
+            print(f"[ERROR] AI call failed: {e}")
+            _emit_telemetry(params, "stream", started, sent, first_token,
+                            attempt, error=e)
+            raise
+
+
+async def achat(system_prompt, user_prompt: str, temperature: float = 0.3,
+                model: str = None, max_tokens: int = None,
+                use_cache: bool = True, cache_system: bool = False) -> str:
+    """
+    Async version of chat(). Send a single-turn request to Claude.
+
+    Args:
+        system_prompt: System instructions (Claude's role/behavior) — a
+                       string, or blocks from cacheable_system()
+        user_prompt: The user's question/request
+        temperature: 0.0-1.0 (lower = more consistent, good for GRC)
+        model: Override default model
+        max_tokens: Override default max tokens
+        use_cache: Set False to bypass the response cache for this call
+        cache_system: Mark the whole system prompt for prompt caching
+
+    Returns:
+        str: Claude's response text
+    """
+    params = build_request(system_prompt,
+                           [{"role": "user", "content": user_prompt}],
+                           temperature, model=model, max_tokens=max_tokens,
+                           cache_system=cache_system)
+    return await asend(params, use_cache=use_cache)
+
+
+def astream_chat(system_prompt, user_prompt: str, temperature: float = 0.3,
+                 model: str = None, max_tokens: int = None,
+                 use_cache: bool = True, cache_system: bool = False):
+    """
+    Streaming version of achat(). Returns an async iterator of text deltas.
+
+    Usage:
+        async for text in astream_chat(system, prompt):
+            print(text, end="", flush=True)
+    """
+    params = build_request(system_prompt,
+                           [{"role": "user", "content": user_prompt}],
+                           temperature, model=model, max_tokens=max_tokens,
+                           cache_system=cache_system)
+    return astream(params, use_cache=use_cache)
+
+
+async def achat_with_context(system_prompt, messages: list,
+                             temperature: float = 0.3,
+                             max_tokens: int = None,
+                             use_cache: bool = True,
+                             cache_system: bool = False) -> str:
+    """Async version of chat_with_context()."""
+    system_prompt = _system_param(system_prompt, cache_system)
+    system_prompt, validated_messages = _prepare_messages(system_prompt, messages)
+    params = build_request(system_prompt, validated_messages, temperature,
+                           max_tokens=max_tokens)
+    return await asend(params, use_cache=use_cache)
+
+
+async def astructured_output(system_prompt, user_prompt: str,
+                             temperature: float = 0.2,
+                             max_tokens: int = None,
+                             use_cache: bool = True,
+                             cache_system: bool = False,
+                             schema: dict = None):
+    """Async version of structured_output()."""
+    params = build_request(system_prompt,
+                           [{"role": "user", "content": user_prompt}],
+                           temperature, max_tokens=max_tokens,
+                           cache_system=cache_system, structured=True,
+                           schema=schema)
+    result = await asend(params, use_cache=use_cache)
     try:
-        response = client.messages.create(
-            model=config.MODEL,
-            max_tokens=max_tokens or config.MAX_TOKENS,
-            system=system_prompt,
-            messages=validated_messages,
-            temperature=temperature,
-        )
-        return response.content[0].text
-    except anthropic.RateLimitError:
-        print("[WARN] Rate limited. Waiting 30 seconds...")
-        time.sleep(30)
-        return chat_with_context(system_prompt, messages, temperature, max_tokens)
-    except Exception as e:
-        print(f"[ERROR] AI call failed: {e}")
+        return parse_structured(result, schema)
+    except ValueError:
+        # Don't replay an unusable answer from the cache next time
+        cache = get_response_cache() if use_cache else None
+        if cache is not None:
+            cache.delete(request_cache_key(params))
         raise
 
 
-def structured_output(system_prompt: str, user_prompt: str,
-                      temperature: float = 0.2,
-                      max_tokens: int = None) -> dict:
+async def gather_limited(aws, limit: int = None,
+                         return_exceptions: bool = False) -> list:
     """
-    Request JSON-structured output from Claude.
-    Used for gap assessments, risk registers, evidence lists, etc.
-    
+    Await many coroutines concurrently, at most `limit` at a time.
+
+    Every API call is additionally bounded by config.MAX_CONCURRENT_REQUESTS,
+    so `limit` only needs to be set when a caller wants to use fewer slots.
+
+    Args:
+        aws: Iterable of coroutines/awaitables (e.g. achat(...) calls)
+        limit: Max awaitables running at once (default: no extra limit)
+        return_exceptions: Same meaning as in asyncio.gather
+
+    Returns:
+        list: Results in the same order as `aws`
+    """
+    aws = list(aws)
+    if not limit:
+        return await asyncio.gather(*aws, return_exceptions=return_exceptions)
+
+    gate = asyncio.Semaphore(limit)
+
+    async def _run(aw):
+        async with gate:
+            return await aw
+
+    return await asyncio.gather(*[_run(aw) for aw in aws],
+                                return_exceptions=return_exceptions)
+
+
+def iterate_sync(agen):
+    """
+    Consume an async generator on the shared background loop and yield its
+    items in the calling thread as they arrive.
+
+    Closing the returned generator early (break, exception) cancels the
+    underlying async generator.
+    """
+    loop = _get_background_loop()
+    items = queue.Queue()
+    done = object()
+    call_site = _call_site.get() or caller_label(2)
+
+    async def _pump():
+        _call_site.set(call_site)
+        try:
+            async for item in agen:
+                items.put((True, item))
+        except BaseException as e:
+            items.put((False, e))
+            raise
+        finally:
+            items.put((True, done))
+        return _last_usage.get()
+
+    future = asyncio.run_coroutine_threadsafe(_pump(), loop)
+    try:
+        while True:
+            ok, item = items.get()
+            if not ok:
+                raise item
+            if item is done:
+                break
+            yield item
+        _last_usage.set(future.result())
+    finally:
+        if not future.done():
+            future.cancel()
+
+
+def chat_stream(system_prompt, user_prompt: str, temperature: float = 0.3,
+                model: str = None, max_tokens: int = None,
+                use_cache: bool = True, cache_system: bool = False):
+    """
+    Send a single-turn request and yield the response text as it streams.
+
+    Same arguments as chat(). Usage:
+        for text in chat_stream(system, prompt):
+            print(text, end="", flush=True)
+    """
+    return iterate_sync(astream_chat(system_prompt, user_prompt, temperature,
+                                     model=model, max_tokens=max_tokens,
+                                     use_cache=use_cache,
+                                     cache_system=cache_system))
+
+
+def chat(system_prompt, user_prompt: str, temperature: float = 0.3,
+         model: str = None, max_tokens: int = None,
+         use_cache: bool = True, cache_system: bool = False,
+         on_token=None) -> str:
+    """
+    Send a single-turn chat completion request to Claude.
+
+    Args:
+        system_prompt: System instructions (Claude's role/behavior) — a
+                       string, or blocks from cacheable_system()
+        user_prompt: The user's question/request
+        temperature: 0.0-1.0 (lower = more consistent, good for GRC)
+        model: Override default model
+        max_tokens: Override default max tokens
+        use_cache: Set False to bypass the response cache for this call
+        cache_system: Mark the whole system prompt for prompt caching
+        on_token: Optional callback; when given the response is streamed
+                  and on_token(text) is called with each delta
+
+    Returns:
+        str: Claude's response text
+    """
+    if on_token is not None:
+        parts = []
+        for text in chat_stream(system_prompt, user_prompt, temperature,
+                                model=model, max_tokens=max_tokens,
+                                use_cache=use_cache,
+                                cache_system=cache_system):
+            parts.append(text)
+            on_token(text)
+        return "".join(parts)
+
+    return run_sync(achat(system_prompt, user_prompt, temperature,
+                          model=model, max_tokens=max_tokens,
+                          use_cache=use_cache, cache_system=cache_system))
+
+
+def chat_with_context(system_prompt, messages: list,
+                      temperature: float = 0.3,
+                      max_tokens: int = None,
+                      use_cache: bool = True,
+                      cache_system: bool = False) -> str:
+    """
+    Multi-turn conversation — useful for iterative refinement.
+
     Args:
         system_prompt: System instructions
-        user_prompt: Request that should produce JSON output
-        temperature: Lower = more deterministic (good for structured data)
-    
+        messages: List of {"role": "user"/"assistant", "content": "..."}
+                  NOTE: Anthropic requires alternating user/assistant messages
+                  and the first message must be from "user"
+        temperature: 0.0-1.0
+        use_cache: Set False to bypass the response cache for this call
+        cache_system: Mark the whole system prompt for prompt caching
+
     Returns:
-        dict: Parsed JSON response
+        str: Claude's response text
     """
-    enhanced_system = (
-        system_prompt + 
+    return run_sync(achat_with_context(system_prompt, messages, temperature,
+                                       max_tokens=max_tokens,
+                                       use_cache=use_cache,
+                                       cache_system=cache_system))
+
+
+def _json_system_prompt(system_prompt):
+    """Append the strict JSON-only instructions to a system prompt."""
+    return _append_system(
+        system_prompt,
         "\n\nCRITICAL: You MUST respond with valid JSON only. "
         "Do NOT include any text before or after the JSON. "
         "Do NOT wrap the JSON in markdown code blocks. "
@@ -139,46 +880,45 @@ def structured_output(system_prompt: str, user_prompt: str,
         "Start your response with { or [ and end with } or ]."
     )
 
-    result = chat(enhanced_system, user_prompt, temperature,
-                  max_tokens=max_tokens or config.MAX_TOKENS)
-
-    # Clean up common issues
-    result = result.strip()
-    
-    # Remove markdown code blocks if Claude adds them anyway
-    if result.startswith("```json"):
-        result = result[7:]
-    if result.startswith("```"):
-        result = result[3:]
-    if result.endswith("```"):
-        result = result[:-3]
-    result = result.strip()
-
-    # Sometimes Claude adds a preamble like "Here is the JSON:"
-    # Try to find the actual JSON
-    if not result.startswith("{") and not result.startswith("["):
-        # Find the first { or [
-        json_start_brace = result.find("{")
-        json_start_bracket = result.find("[")
-        
-        starts = [s for s in [json_start_brace, json_start_bracket] if s >= 0]
-        if starts:
-            result = result[min(starts):]
-        else:
-            raise ValueError(f"No JSON found in response: {result[:200]}")
-
-    # Trim any trailing text after the JSON
-    # Find matching closing bracket
-    try:
-        return json.loads(result)
-    except json.JSONDecodeError:
-        # Try to find valid JSON by trimming from the end
-        for end_pos in range(len(result), 0, -1):
-            try:
-                return json.loads(result[:end_pos])
-            except json.JSONDecodeError:
-                continue
-        raise ValueError(f"Could not parse JSON from response: {result[:500]}")
+
+def parse_json_response(result: str):
+    """
+    Extract and parse the JSON payload from a Claude response.
+
+    Tolerates markdown fences, preamble/trailing text and responses cut off
+    by max_tokens (see utils/json_extract.py). Runs in linear time.
+    """
+    return extract_json(result)
+
+
+def structured_output(system_prompt, user_prompt: str,
+                      temperature: float = 0.2,
+                      max_tokens: int = None,
+                      use_cache: bool = True,
+                      cache_system: bool = False,
+                      schema: dict = None):
+    """
+    Request JSON-structured output from Claude.
+    Used for gap assessments, risk registers, evidence lists, etc.
+
+    Args:
+        system_prompt: System instructions
+        user_prompt: Request that should produce JSON output
+        temperature: Lower = more deterministic (good for structured data)
+        use_cache: Set False to bypass the response cache for this call
+        cache_system: Mark the whole system prompt for prompt caching
+        schema: JSON Schema from utils/schemas.py. The result is returned
+                in exactly that shape (a list for array schemas) or
+                SchemaValidationError is raised.
+
+    Returns:
+        dict or list: Parsed JSON response
+    """
+    return run_sync(astructured_output(system_prompt, user_prompt,
+                                       temperature, max_tokens=max_tokens,
+                                       use_cache=use_cache,
+                                       cache_system=cache_system,
+                                       schema=schema))
 
 
 def simple_ask(question: str, context: str = "") -> str:
@@ -195,4 +935,4 @@ def simple_ask(question: str, context: str = "") -> str:
     if context:
         prompt = f"Context: {context}\n\nQuestion: {question}"
 
-    return chat(system, prompt, temperature=0.3)
\ No newline at end of file
+    return chat(system, prompt, temperature=0.3)
@@ -0,0 +1,283 @@
+"""
+utils/batch_client.py
+
+Message Batches execution for offline bulk runs.
+
+Instead of sending hundreds of chat()/structured_output() calls one by
+one, queue them on a BatchJob and submit them as a single Message Batches
+request. Anthropic processes batches asynchronously (usually within an
+hour, at most 24h) at a lower price than interactive calls.
+
+HOW IT WORKS:
+1. add_chat()/add_structured() build the request with the same parameters
+   an interactive call would use, and return a handle
+2. run() answers what it can from the response cache, submits the rest,
+   polls until the batch has ended, and stores each result on its handle
+3. handle.result() returns the text (or parsed JSON) for that request
+
+Backends:
+- AnthropicBatchBackend: the real Message Batches API
+- LocalBatchBackend: file-based stand-in for testing. Requests and results
+  are written as JSONL under config.BATCH_LOCAL_DIR, and requests are
+  answered through the normal interactive path.
+
+Usage:
+    job = BatchJob()
+    handles = [job.add_structured(system, prompt) for prompt in prompts]
+    job.run()
+    results = [h.result() for h in handles]
+"""
+
+import json
+import os
+import time
+import uuid
+
+import anthropic
+import config
+from utils.ai_client import (
+    build_request,
+    asend,
+    run_sync,
+    gather_limited,
+    response_text,
+    parse_structured,
+    get_response_cache,
+    request_cache_key,
+)
+
+
+class BatchRequestError(Exception):
+    """A single request in a batch did not succeed."""
+
+
+class AnthropicBatchBackend:
+    """Submits batches to the Anthropic Message Batches API."""
+
+    def __init__(self):
+        self.client = anthropic.Anthropic(api_key=config.ANTHROPIC_API_KEY)
+
+    def submit(self, requests: list) -> str:
+        batch = self.client.messages.batches.create(requests=requests)
+        return batch.id
+
+    def status(self, batch_id: str) -> str:
+        return self.client.messages.batches.retrieve(batch_id).processing_status
+
+    def results(self, batch_id: str):
+        """Yield (custom_id, succeeded, text_or_error) for every request."""
+        for entry in self.client.messages.batches.results(batch_id):
+            if entry.result.type == "succeeded":
+                yield entry.custom_id, True, response_text(entry.result.message)
+            elif entry.result.type == "errored":
+                yield entry.custom_id, False, str(entry.result.error)
+            else:
+                yield entry.custom_id, False, f"Request {entry.result.type}"
+
+
+class LocalBatchBackend:
+    """
+    File-based stand-in for the Message Batches API.
+
+    submit() writes <batch_id>.requests.jsonl, answers every request through
+    the regular interactive client, and writes <batch_id>.results.jsonl in
+    the same shape the real API returns.
+    """
+
+    def __init__(self, directory: str = None):
+        self.directory = directory or config.BATCH_LOCAL_DIR
+        os.makedirs(self.directory, exist_ok=True)
+
+    def _path(self, batch_id: str, kind: str) -> str:
+        return os.path.join(self.directory, f"{batch_id}.{kind}.jsonl")
+
+    def submit(self, requests: list) -> str:
+        batch_id = f"localbatch_{uuid.uuid4().hex[:16]}"
+        with open(self._path(batch_id, "requests"), "w", encoding="utf-8") as f:
+            for req in requests:
+                f.write(json.dumps(req) + "\n")
+
+        outcomes = run_sync(gather_limited(
+            [asend(req["params"], use_cache=False) for req in requests],
+            return_exceptions=True,
+        ))
+
+        with open(self._path(batch_id, "results"), "w", encoding="utf-8") as f:
+            for req, outcome in zip(requests, outcomes):
+                if isinstance(outcome, Exception):
+                    result = {"type": "errored",
+                              "error": {"message": str(outcome)}}
+                else:
+                    result = {"type": "succeeded",
+                              "message": {"content": [
+                                  {"type": "text", "text": outcome}]}}
+                f.write(json.dumps({"custom_id": req["custom_id"],
+                                    "result": result}) + "\n")
+        return batch_id
+
+    def status(self, batch_id: str) -> str:
+        if os.path.exists(self._path(batch_id, "results")):
+            return "ended"
+        return "in_progress"
+
+    def results(self, batch_id: str):
+        with open(self._path(batch_id, "results"), "r", encoding="utf-8") as f:
+            for line in f:
+                entry = json.loads(line)
+                result = entry["result"]
+                if result["type"] == "succeeded":
+                    yield (entry["custom_id"], True,
+                           result["message"]["content"][0]["text"])
+                else:
+                    yield (entry["custom_id"], False,
+                           result.get("error", {}).get("message",
+                                                       result["type"]))
+
+
+def get_batch_backend(name: str = None):
+    """Return a batch backend by name ("anthropic" or "local")."""
+    name = name or config.BATCH_BACKEND
+    if name == "local":
+        return LocalBatchBackend()
+    if name == "anthropic":
+        return AnthropicBatchBackend()
+    raise ValueError(f"Unknown batch backend: {name}")
+
+
+class BatchHandle:
+    """Placeholder for one request's result, filled in by BatchJob.run()."""
+
+    def __init__(self, custom_id: str, params: dict, structured: bool,
+                 label: str = None, schema: dict = None):
+        self.custom_id = custom_id
+        self.params = params
+        self.structured = structured
+        self.schema = schema
+        self.label = label or custom_id
+        self._done = False
+        self._value = None
+        self._error = None
+
+    def _set_text(self, text: str):
+        try:
+            self._value = (parse_structured(text, self.schema)
+                           if self.structured else text)
+        except ValueError as e:
+            self._error = BatchRequestError(f"{self.label}: {e}")
+            # Keep the parse/schema error so callers can salvage partial data
+            self._error.__cause__ = e
+        self._done = True
+
+    def _set_error(self, message: str):
+        self._error = BatchRequestError(f"{self.label}: {message}")
+        self._done = True
+
+    def result(self):
+        """Return the text/parsed JSON, or raise BatchRequestError."""
+        if not self._done:
+            raise RuntimeError(f"{self.label}: batch has not been run yet")
+        if self._error:
+            raise self._error
+        return self._value
+
+
+class BatchJob:
+    """
+    Collects requests and executes them as one Message Batches submission.
+    """
+
+    def __init__(self, backend=None):
+        self.backend = backend or get_batch_backend()
+        self.handles = []
+        self.batch_id = None
+
+    def _add(self, params: dict, structured: bool, label: str,
+             schema: dict = None) -> BatchHandle:
+        # Batch custom_ids must match ^[a-zA-Z0-9_-]{1,64}$
+        handle = BatchHandle(f"req-{len(self.handles):05d}", params,
+                             structured, label, schema)
+        self.handles.append(handle)
+        return handle
+
+    def add_chat(self, system_prompt, user_prompt: str,
+                 temperature: float = 0.3, max_tokens: int = None,
+                 cache_system: bool = False, label: str = None) -> BatchHandle:
+        """Queue a chat() request. handle.result() returns the text."""
+        params = build_request(system_prompt,
+                               [{"role": "user", "content": user_prompt}],
+                               temperature, max_tokens=max_tokens,
+                               cache_system=cache_system)
+        return self._add(params, False, label)
+
+    def add_structured(self, system_prompt, user_prompt: str,
+                       temperature: float = 0.2, max_tokens: int = None,
+                       cache_system: bool = False,
+                       label: str = None,
+                       schema: dict = None) -> BatchHandle:
+        """Queue a structured_output() request. handle.result() returns JSON."""
+        params = build_request(system_prompt,
+                               [{"role": "user", "content": user_prompt}],
+                               temperature, max_tokens=max_tokens,
+                               cache_system=cache_system, structured=True,
+                               schema=schema)
+        return self._add(params, True, label, schema)
+
+    def run(self, poll_interval: float = None, timeout: float = None,
+            use_cache: bool = True) -> list:
+        """
+        Submit all queued requests and wait for the batch to finish.
+
+        Returns:
+            list: One entry per request in the order added — the result,
+                  or a BatchRequestError for requests that failed.
+        """
+        poll_interval = poll_interval or config.BATCH_POLL_SECONDS
+        timeout = timeout or config.BATCH_TIMEOUT_SECONDS
+
+        cache = get_response_cache() if use_cache else None
+        pending = []
+        for handle in self.handles:
+            if handle._done:
+                continue
+            cached = cache.get(request_cache_key(handle.params)) if cache else None
+            if cached is not None:
+                handle._set_text(cached)
+            else:
+                pending.append(handle)
+
+        if pending:
+            print(f"  [BATCH] Submitting {len(pending)} requests "
+                  f"({len(self.handles) - len(pending)} answered from cache)...")
+            self.batch_id = self.backend.submit([
+                {"custom_id": h.custom_id, "params": h.params} for h in pending
+            ])
+            print(f"  [BATCH] Batch ID: {self.batch_id}")
+
+            started = time.monotonic()
+            while self.backend.status(self.batch_id) != "ended":
+                if time.monotonic() - started > timeout:
+                    raise TimeoutError(f"Batch {self.batch_id} did not finish "
+                                       f"within {timeout:.0f}s")
+                time.sleep(poll_interval)
+
+            by_id = {h.custom_id: h for h in pending}
+            for custom_id, ok, payload in self.backend.results(self.batch_id):
+                handle = by_id.get(custom_id)
+                if handle is None:
+                    continue
+                if ok:
+                    handle._set_text(payload)
+                    if cache is not None and not handle._error:
+                        cache.put(request_cache_key(handle.params), payload)
+                else:
+                    handle._set_error(payload)
+
+            for handle in pending:
+                if not handle._done:
+                    handle._set_error("No result returned for this request")
+
+            failed = sum(1 for h in pending if h._error)
+            print(f"  [BATCH] Complete: {len(pending) - failed} succeeded, "
+                  f"{failed} failed.")
+
+        return [h._error or h._value for h in self.handles]
@@ -0,0 +1,191 @@
+"""
+utils/control_search.py
+
+Keyword search over the controls of every loaded framework, ranked with
+BM25, locally and without any API call.
+
+Users look for controls by keyword ("MFA", "backup", "vendor") across
+frameworks, and engines can use the same search to find the controls
+relevant to a document or a risk.
+
+HOW IT WORKS:
+1. Each control is one document: its ID, description, category name and
+   function name (Framework.search_texts, precomputed in the framework
+   bundle when there is one), tokenized like the text router (stopwords
+   dropped, light stemming)
+2. ControlIndex keeps an inverted index term -> [(document, term count)]
+   plus document lengths, so a query only touches the postings of its
+   own terms
+3. Queries are expanded with the router's tool lexicon ("MFA" →
+   multifactor authentication, "Okta" → identity access) and scored with
+   BM25 (k1=1.2, b=0.75); a query that is a control ID, or an ID prefix
+   like "PR.AA", ranks those controls first
+4. The index is built once for the FrameworkRegistry's current Framework
+   objects and rebuilt only when the registry re-parses a file
+"""
+
+import math
+import re
+import threading
+
+from utils.framework_loader import get_registry
+from utils.text_router import tokenize
+
+_ID_BOUNDARY = re.compile(r"[-.(\s]")
+
+
+class ControlIndex:
+    """
+    BM25 inverted index over framework controls.
+
+    Usage:
+        index = ControlIndex([get_framework("NIST CSF 2.0"),
+                              get_framework("HIPAA")])
+        hits = index.search("multi-factor authentication", k=5)
+    """
+
+    def __init__(self, frameworks: list, k1: float = 1.2, b: float = 0.75):
+        """
+        Parameters:
+        -----------
+        frameworks : list
+            Indexed Framework objects (see utils/framework_loader).
+
+        k1, b : float
+            BM25 term-frequency saturation and length normalization.
+        """
+        self.k1 = k1
+        self.b = b
+        self.frameworks = {f.name: f for f in frameworks}
+        self.docs = []        # (framework name, control_id)
+        self.lengths = []
+        self.postings = {}    # term -> [(doc, count), ...]
+
+        for framework in frameworks:
+            for control_id, text in framework.search_texts().items():
+                doc = len(self.docs)
+                self.docs.append((framework.name, control_id))
+                tokens = tokenize(text)
+                self.lengths.append(len(tokens))
+                counts = {}
+                for term in tokens:
+                    counts[term] = counts.get(term, 0) + 1
+                for term, count in counts.items():
+                    self.postings.setdefault(term, []).append((doc, count))
+
+        n_docs = len(self.docs)
+        self.avg_length = sum(self.lengths) / n_docs if n_docs else 0.0
+        self.idf = {
+            term: math.log(1 + (n_docs - len(docs) + 0.5) / (len(docs) + 0.5))
+            for term, docs in self.postings.items()
+        }
+
+    def __len__(self) -> int:
+        return len(self.docs)
+
+    def scores(self, query: str, frameworks=None) -> dict:
+        """BM25 score of every matching document (doc -> score)."""
+        allowed = set(frameworks) if frameworks else None
+        scores = {}
+        for term in set(tokenize(query, expand=True)):
+            idf = self.idf.get(term)
+            if idf is None:
+                continue
+            for doc, count in self.postings[term]:
+                if allowed is not None and self.docs[doc][0] not in allowed:
+                    continue
+                norm = self.k1 * (1 - self.b + self.b * self.lengths[doc]
+                                  / self.avg_length)
+                scores[doc] = (scores.get(doc, 0.0)
+                               + idf * count * (self.k1 + 1) / (count + norm))
+
+        wanted = query.strip().upper()
+        if wanted:
+            best = max(scores.values(), default=0.0)
+            for doc, (name, control_id) in enumerate(self.docs):
+                if allowed is not None and name not in allowed:
+                    continue
+                upper = control_id.upper()
+                if upper == wanted or (upper.startswith(wanted)
+                                       and _ID_BOUNDARY.match(upper[len(wanted):])):
+                    # Exact ID first, then the controls under an ID prefix
+                    scores[doc] = best + (2.0 if upper == wanted else 1.0)
+        return scores
+
+    def search(self, query: str, frameworks=None, k: int = 10) -> list:
+        """
+        Top-k controls for a keyword query.
+
+        Parameters:
+        -----------
+        query : str
+            Keywords, a control ID or an ID prefix.
+
+        frameworks : list, optional
+            Framework names to search (default: every indexed framework).
+
+        k : int
+            Maximum number of results.
+
+        Returns:
+        --------
+        list : Dicts with framework, score and the control's fields
+               (function, function_id, category, category_id, control_id,
+               description), best first.
+        """
+        scores = self.scores(query, frameworks)
+        ranked = sorted(scores, key=lambda doc: (-scores[doc], doc))[:k]
+        results = []
+        for doc in ranked:
+            name, control_id = self.docs[doc]
+            control = self.frameworks[name].control(control_id)
+            results.append(dict(control.to_dict(), framework=name,
+                                score=round(scores[doc], 3)))
+        return results
+
+
+_index = None
+_index_key = None
+_index_lock = threading.Lock()
+
+
+def get_index() -> ControlIndex:
+    """
+    ControlIndex over every framework with control data, built once for
+    the registry's current Framework objects.
+    """
+    global _index, _index_key
+    registry = get_registry()
+    frameworks = [registry.framework(name) for name in registry.available()]
+    frameworks = [f for f in frameworks if f.source != "ai_only"]
+    key = tuple(frameworks)   # Frameworks compare by identity
+    with _index_lock:
+        if _index is None or _index_key != key:
+            _index = ControlIndex(frameworks)
+            _index_key = key
+        return _index
+
+
+def search_controls(query: str, frameworks=None, k: int = 10) -> list:
+    """
+    Search controls by keyword across frameworks (BM25; see ControlIndex).
+
+    Parameters:
+    -----------
+    query : str
+        e.g. "MFA", "backup", "vendor risk", "PR.AA-01"
+
+    frameworks : str or list, optional
+        Friendly framework name(s) to search (default: all loaded).
+
+    k : int
+        Maximum number of results.
+
+    Returns:
+    --------
+    list : Best-first dicts with framework, control_id, description,
+           category, category_id, function, function_id and score.
+    """
+    if isinstance(frameworks, str):
+        frameworks = [frameworks]
+    return get_index().search(query, frameworks, k)
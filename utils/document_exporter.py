@@ -10,6 +10,7 @@ Export functions for all toolkit outputs:
 4. export_gap_assessment_docx()   — Gap assessment → Word document
 5. export_policy_docx()           — Policy/procedure → Word document
 6. export_risk_register_docx()    — Risk register → Word document
+7. export_portfolio_rollup_xlsx() — Many gap assessments → roll-up workbook
 
 Dependencies:
     pip install python-docx openpyxl
@@ -1135,4 +1136,172 @@ def export_risk_register_docx(risks: list, company_name: str,
 
     doc.save(output_path)
     print(f"[SAVED] Risk Register Word: {output_path}")
-    return output_path
\ No newline at end of file
+    return output_path
+
+
+# ══════════════════════════════════════════════════════
+# 7. EXPORT PORTFOLIO ROLL-UP → EXCEL
+# ══════════════════════════════════════════════════════
+
+def _score_fill(avg: float) -> str:
+    """Same thresholds as the Scores by Domain sheet."""
+    return "E74C3C" if avg < 2 else "F39C12" if avg < 3.5 else "27AE60"
+
+
+def export_portfolio_rollup_xlsx(assessments: list, output_path: str):
+    """
+    Export a portfolio of gap assessments to one roll-up workbook.
+
+    assessments: [{"company": {...}, "framework": str, "results": [...]}]
+
+    Sheets:
+        1. Portfolio Summary  — one row per company: scores and gap counts
+        2. Scores by Category — average score per category × company
+        3. Common Gaps        — controls scoring below 4 at most companies
+    """
+    if not HAS_XLSX:
+        print("[ERROR] openpyxl not installed. Run: pip install openpyxl")
+        return
+    _ensure_dir(output_path)
+
+    wb = Workbook()
+    ordered_mat = ["Fully Implemented", "Largely Implemented",
+                   "Partially Implemented", "Minimally Implemented",
+                   "Not Implemented", "Not Assessed"]
+
+    # ── Sheet 1: Portfolio Summary ──
+    ws1 = wb.active
+    ws1.title = "Portfolio Summary"
+    ws1.sheet_properties.tabColor = "1F4E79"
+
+    ws1["A1"] = "Portfolio Gap Assessment Roll-up"
+    ws1["A1"].font = Font(size=20, bold=True, color="1F4E79")
+    ws1.merge_cells("A1:F1")
+    ws1["A2"] = (f"{len(assessments)} companies — generated "
+                 f"{datetime.now().strftime('%Y-%m-%d %H:%M')}")
+
+    headers = (["Company", "Industry", "Size", "Framework", "Controls",
+                "Average Score"] + ordered_mat
+               + ["Critical Gaps", "High Gaps"])
+    _xl_header_row(ws1, 4, headers, HEADER_FILL_BLUE)
+
+    for ridx, a in enumerate(assessments, 5):
+        company = a.get("company", {})
+        results = a.get("results", [])
+        scores = [r["score"] for r in results if r.get("score")]
+        avg = round(sum(scores) / len(scores), 2) if scores else 0
+        gaps = [r for r in results if r.get("score") and r["score"] < 4]
+
+        _xl_data_cell(ws1, ridx, 1, company.get("name", ""), bold=True)
+        _xl_data_cell(ws1, ridx, 2, company.get("industry", ""))
+        _xl_data_cell(ws1, ridx, 3, company.get("size", ""))
+        _xl_data_cell(ws1, ridx, 4, a.get("framework", ""))
+        _xl_data_cell(ws1, ridx, 5, len(results))
+        _xl_data_cell(ws1, ridx, 6, avg,
+                      fill_color=_score_fill(avg) if scores else None,
+                      font_color="FFFFFF" if scores and avg < 2 else None)
+        for offset, mat in enumerate(ordered_mat):
+            _xl_data_cell(ws1, ridx, 7 + offset,
+                          sum(1 for r in results
+                              if r.get("maturity", "Not Assessed") == mat))
+        col = 7 + len(ordered_mat)
+        _xl_data_cell(ws1, ridx, col,
+                      sum(1 for r in gaps if r.get("priority") == "Critical"))
+        _xl_data_cell(ws1, ridx, col + 1,
+                      sum(1 for r in gaps if r.get("priority") == "High"))
+
+    _xl_set_widths(ws1, {"A": 28, "B": 20, "C": 16, "D": 18, "E": 10,
+                         "F": 14})
+    for offset in range(len(ordered_mat) + 2):
+        ws1.column_dimensions[get_column_letter(7 + offset)].width = 14
+    ws1.freeze_panes = "B5"
+
+    # ── Sheet 2: Scores by Category ──
+    ws2 = wb.create_sheet("Scores by Category")
+    ws2.sheet_properties.tabColor = "1E8449"
+
+    names = [a.get("company", {}).get("name", "") for a in assessments]
+    _xl_header_row(ws2, 1, ["Framework", "Function", "Category"] + names
+                   + ["Portfolio Average"], HEADER_FILL_GREEN)
+
+    # (framework, function, category) -> per-company score lists
+    by_category = {}
+    for ci, a in enumerate(assessments):
+        for r in a.get("results", []):
+            key = (a.get("framework", ""), r.get("function", "Unknown"),
+                   r.get("category", "Unknown"))
+            cells = by_category.setdefault(key, [[] for _ in assessments])
+            if r.get("score"):
+                cells[ci].append(r["score"])
+
+    for ridx, (key, cells) in enumerate(by_category.items(), 2):
+        for col, value in enumerate(key, 1):
+            _xl_data_cell(ws2, ridx, col, value)
+        all_scores = []
+        for ci, scores in enumerate(cells):
+            if not scores:
+                _xl_data_cell(ws2, ridx, 4 + ci, "")
+                continue
+            avg = round(sum(scores) / len(scores), 1)
+            all_scores.extend(scores)
+            _xl_data_cell(ws2, ridx, 4 + ci, avg, fill_color=_score_fill(avg),
+                          font_color="FFFFFF" if avg < 2 else None)
+        overall = (round(sum(all_scores) / len(all_scores), 1)
+                   if all_scores else "")
+        _xl_data_cell(ws2, ridx, 4 + len(cells), overall, bold=True)
+
+    _xl_set_widths(ws2, {"A": 18, "B": 20, "C": 35})
+    for ci in range(len(assessments) + 1):
+        ws2.column_dimensions[get_column_letter(4 + ci)].width = 16
+    ws2.freeze_panes = "D2"
+
+    # ── Sheet 3: Common Gaps ──
+    ws3 = wb.create_sheet("Common Gaps")
+    ws3.sheet_properties.tabColor = "C0392B"
+
+    _xl_header_row(ws3, 1, ["Framework", "Control ID", "Category",
+                            "Description", "Companies with Gap",
+                            "Companies Assessed", "Average Score",
+                            "Companies"], HEADER_FILL_RED)
+
+    controls = {}
+    for a in assessments:
+        name = a.get("company", {}).get("name", "")
+        for r in a.get("results", []):
+            if not r.get("score"):
+                continue
+            key = (a.get("framework", ""), r.get("control_id", ""))
+            entry = controls.setdefault(key, {
+                "category": r.get("category", ""),
+                "description": r.get("control_description", ""),
+                "scores": [], "gap_companies": [],
+            })
+            entry["scores"].append(r["score"])
+            if r["score"] < 4:
+                entry["gap_companies"].append(name)
+
+    common = sorted(
+        [(key, c) for key, c in controls.items() if c["gap_companies"]],
+        key=lambda kc: (-len(kc[1]["gap_companies"]),
+                        sum(kc[1]["scores"]) / len(kc[1]["scores"])))
+    for ridx, ((framework, control_id), c) in enumerate(common, 2):
+        avg = round(sum(c["scores"]) / len(c["scores"]), 1)
+        _xl_data_cell(ws3, ridx, 1, framework)
+        _xl_data_cell(ws3, ridx, 2, control_id, bold=True)
+        _xl_data_cell(ws3, ridx, 3, c["category"])
+        _xl_data_cell(ws3, ridx, 4, c["description"])
+        _xl_data_cell(ws3, ridx, 5, len(c["gap_companies"]))
+        _xl_data_cell(ws3, ridx, 6, len(c["scores"]))
+        _xl_data_cell(ws3, ridx, 7, avg, fill_color=_score_fill(avg),
+                      font_color="FFFFFF" if avg < 2 else None)
+        _xl_data_cell(ws3, ridx, 8, ", ".join(c["gap_companies"]))
+
+    _xl_set_widths(ws3, {"A": 18, "B": 14, "C": 26, "D": 48, "E": 12,
+                         "F": 12, "G": 10, "H": 48})
+    ws3.auto_filter.ref = f"A1:H{len(common) + 1}"
+    ws3.freeze_panes = "C2"
+
+    # ── Save ──
+    wb.save(output_path)
+    print(f"[SAVED] Portfolio Roll-up Excel: {output_path}")
+    return output_path
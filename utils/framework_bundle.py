@@ -0,0 +1,284 @@
+"""
+utils/framework_bundle.py
+
+Prebuilt framework bundle: every framework file validated, indexed and
+normalized once at build time and stored in one SQLite file that the
+loader opens at startup.
+
+HOW IT WORKS:
+1. validate_framework() checks a parsed framework file against
+   utils/schemas.FRAMEWORK_FILE, plus duplicate and empty IDs
+2. build_bundle() (run by `python build_frameworks.py`) writes, per
+   framework: the header, the source file's hash/mtime/size, one JSON
+   payload per function, a node -> function index and the normalized
+   text of every control (for search)
+3. FrameworkBundle opens the file read-only and memory-mapped. The
+   FrameworkRegistry uses it for every framework whose file is unchanged
+   since the build, so startup parses no JSON and validates nothing; a
+   function's payload is only read when the Framework first needs it
+4. Bundles carry BUNDLE_FORMAT; one written by another format version is
+   ignored and the loader falls back to the JSON files
+"""
+
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+from datetime import datetime
+
+from utils.schemas import FRAMEWORK_FILE, schema_errors
+
+# Bump when the table layout or payload shape changes
+BUNDLE_FORMAT = 1
+
+_WORD = re.compile(r"[a-z0-9]+")
+
+
+def normalize_text(text: str) -> str:
+    """Lowercase words only, single-spaced: the form the search index uses."""
+    return " ".join(_WORD.findall((text or "").lower()))
+
+
+def validate_framework(data) -> list:
+    """
+    Check a parsed framework file.
+
+    Returns:
+    --------
+    list : Human-readable errors ("$.functions[2].categories[0]: missing
+           required field 'id'"); empty if the file is valid.
+    """
+    errors = schema_errors(data, FRAMEWORK_FILE)
+    if errors:
+        return errors
+
+    # Controls are indexed apart from functions and categories, so a
+    # single-control category may share its ID with that control (SOC 2
+    # "CC1.1"); within each level IDs must be unique
+    seen = ({}, {})
+    for fi, function in enumerate(data["functions"]):
+        nodes = [(0, f"$.functions[{fi}]", function["id"])]
+        for ci, category in enumerate(function["categories"]):
+            nodes.append((0, f"$.functions[{fi}].categories[{ci}]",
+                          category["id"]))
+            for si, sub in enumerate(category["subcategories"]):
+                path = f"$.functions[{fi}].categories[{ci}].subcategories[{si}]"
+                nodes.append((1, path, sub["id"]))
+                if not sub["description"].strip():
+                    errors.append(f"{path}: empty description")
+        for level, path, node_id in nodes:
+            if not node_id.strip():
+                errors.append(f"{path}: empty id")
+            elif node_id in seen[level]:
+                errors.append(f"{path}: duplicate id {node_id!r} "
+                              f"(first at {seen[level][node_id]})")
+            else:
+                seen[level][node_id] = path
+    return errors
+
+
+def file_signature(path: str) -> dict:
+    """SHA-256, mtime and size of a framework file."""
+    with open(path, "rb") as f:
+        raw = f.read()
+    stat = os.stat(path)
+    return {"sha256": hashlib.sha256(raw).hexdigest(),
+            "mtime_ns": stat.st_mtime_ns, "size": stat.st_size}
+
+
+# ────────────────────────────────────────────
+# Build
+# ────────────────────────────────────────────
+_TABLES = (
+    "CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)",
+    "CREATE TABLE frameworks ("
+    " name TEXT PRIMARY KEY, file TEXT NOT NULL, sha256 TEXT NOT NULL,"
+    " mtime_ns INTEGER NOT NULL, size INTEGER NOT NULL,"
+    " header TEXT NOT NULL)",
+    "CREATE TABLE functions ("
+    " framework TEXT NOT NULL, function_id TEXT NOT NULL,"
+    " position INTEGER NOT NULL, payload TEXT NOT NULL,"
+    " PRIMARY KEY (framework, function_id))",
+    "CREATE TABLE nodes ("
+    " framework TEXT NOT NULL, node_id TEXT NOT NULL,"
+    " function_id TEXT NOT NULL,"
+    " PRIMARY KEY (framework, node_id))",
+    "CREATE TABLE control_text ("
+    " framework TEXT NOT NULL, control_id TEXT NOT NULL,"
+    " position INTEGER NOT NULL, text TEXT NOT NULL,"
+    " PRIMARY KEY (framework, control_id))",
+)
+
+
+def build_bundle(sources: dict, output_path: str) -> dict:
+    """
+    Validate framework files and write them into one bundle.
+
+    Parameters:
+    -----------
+    sources : dict
+        Framework name -> path of its JSON file.
+
+    output_path : str or None
+        Bundle to (re)write. It is replaced atomically, and only if every
+        file is valid. None only validates.
+
+    Returns:
+    --------
+    dict : name -> list of errors for each invalid file; if there are
+           none, just "_counts": name -> number of controls.
+    """
+    problems = {}
+    loaded = {}
+    for name, path in sources.items():
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            problems[name] = [f"{path}: {e}"]
+            continue
+        errors = validate_framework(data)
+        if errors:
+            problems[name] = errors
+            continue
+        loaded[name] = (path, data)
+    if problems:
+        return problems
+    if output_path is None:
+        return {"_counts": {name: sum(len(c["subcategories"])
+                                      for f in data["functions"]
+                                      for c in f["categories"])
+                            for name, (_, data) in loaded.items()}}
+
+    directory = os.path.dirname(output_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp = output_path + ".tmp"
+    if os.path.exists(tmp):
+        os.remove(tmp)
+
+    counts = {}
+    conn = sqlite3.connect(tmp)
+    try:
+        for statement in _TABLES:
+            conn.execute(statement)
+        conn.executemany("INSERT INTO meta VALUES (?, ?)", [
+            ("format", str(BUNDLE_FORMAT)),
+            ("built", datetime.now().isoformat()),
+        ])
+        for name, (path, data) in loaded.items():
+            signature = file_signature(path)
+            header = {k: v for k, v in data.items() if k != "functions"}
+            header["functions"] = [{"id": f["id"], "name": f["name"]}
+                                   for f in data["functions"]]
+            conn.execute(
+                "INSERT INTO frameworks VALUES (?, ?, ?, ?, ?, ?)",
+                (name, os.path.basename(path), signature["sha256"],
+                 signature["mtime_ns"], signature["size"],
+                 json.dumps(header)))
+
+            position = 0
+            for index, function in enumerate(data["functions"]):
+                conn.execute(
+                    "INSERT INTO functions VALUES (?, ?, ?, ?)",
+                    (name, function["id"], index,
+                     json.dumps(function, separators=(",", ":"))))
+                nodes = [(name, function["id"], function["id"])]
+                for category in function["categories"]:
+                    nodes.append((name, category["id"], function["id"]))
+                    for sub in category["subcategories"]:
+                        nodes.append((name, sub["id"], function["id"]))
+                        conn.execute(
+                            "INSERT INTO control_text VALUES (?, ?, ?, ?)",
+                            (name, sub["id"], position, normalize_text(
+                                f"{sub['id']} {sub['description']} "
+                                f"{category['name']} {function['name']}")))
+                        position += 1
+                conn.executemany("INSERT OR IGNORE INTO nodes VALUES (?, ?, ?)",
+                                 nodes)
+            counts[name] = position
+        conn.commit()
+    finally:
+        conn.close()
+    os.replace(tmp, output_path)
+    return {"_counts": counts}
+
+
+# ────────────────────────────────────────────
+# Read
+# ────────────────────────────────────────────
+class FrameworkBundle:
+    """
+    Read-only access to a bundle written by build_bundle().
+
+    Usage:
+        bundle = FrameworkBundle.open(".cache/frameworks.sqlite3")
+        entry = bundle.entry("NIST CSF 2.0")     # header + source signature
+        function = bundle.function("NIST CSF 2.0", "PR")
+    """
+
+    def __init__(self, conn):
+        self._conn = conn
+        self._lock = threading.Lock()
+        rows = conn.execute(
+            "SELECT name, file, sha256, mtime_ns, size, header "
+            "FROM frameworks").fetchall()
+        self.entries = {
+            name: {"file": file, "sha256": sha256,
+                   "stat": (mtime_ns, size), "header": json.loads(header)}
+            for name, file, sha256, mtime_ns, size, header in rows
+        }
+
+    @classmethod
+    def open(cls, path: str):
+        """Open a bundle, or return None if it is missing or incompatible."""
+        if not path or not os.path.exists(path):
+            return None
+        try:
+            conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True,
+                                   check_same_thread=False)
+            conn.execute("PRAGMA mmap_size=268435456")
+            row = conn.execute(
+                "SELECT value FROM meta WHERE key = 'format'").fetchone()
+        except sqlite3.Error as e:
+            print(f"[WARN] Ignoring unreadable framework bundle {path}: {e}")
+            return None
+        if row is None or row[0] != str(BUNDLE_FORMAT):
+            print(f"[WARN] Ignoring framework bundle {path} (format "
+                  f"{row[0] if row else '?'}, expected {BUNDLE_FORMAT}); "
+                  f"rebuild it with: python build_frameworks.py")
+            conn.close()
+            return None
+        return cls(conn)
+
+    def entry(self, name: str) -> dict:
+        """Header and source signature of a framework, or None."""
+        return self.entries.get(name)
+
+    def function(self, name: str, function_id: str) -> dict:
+        """One function's full payload (categories and controls)."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT payload FROM functions "
+                "WHERE framework = ? AND function_id = ?",
+                (name, function_id)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def locate(self, name: str, node_id: str) -> str:
+        """Function ID containing a category or control ID, or None."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT function_id FROM nodes "
+                "WHERE framework = ? AND node_id = ?",
+                (name, node_id)).fetchone()
+        return row[0] if row else None
+
+    def control_texts(self, name: str) -> dict:
+        """control_id -> normalized search text, in framework order."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT control_id, text FROM control_text "
+                "WHERE framework = ? ORDER BY position", (name,)).fetchall()
+        return dict(rows)
@@ -4,15 +4,566 @@ utils/framework_loader.py
 Loads framework control data from JSON files.
 If a framework file doesn't exist yet, it tells you
 and falls back to AI-generated knowledge.
+
+Frameworks are parsed once per process by the FrameworkRegistry and handed
+out as read-only views, so repeated assessments (and Streamlit reruns) pay
+no framework I/O. A file is only read again when its mtime or size
+changes, and only re-parsed when its content hash changes too.
+
+Each parse also builds an indexed Framework (get_framework), so engines
+and the UI look controls, categories and functions up by ID instead of
+regrouping the flattened control list on every run.
+
+When `python build_frameworks.py` has written a bundle
+(config.FRAMEWORK_BUNDLE_PATH, see utils/framework_bundle.py), frameworks
+whose file is unchanged since the build come from the bundle instead: no
+JSON is parsed and nothing is validated at startup. Files that are not
+bundled (or changed since) are validated when parsed; an invalid file is
+reported and the framework falls back to AI knowledge instead of failing
+deep inside an assessment.
 """
 
+import hashlib
 import json
 import os
+import sys
+import threading
+from types import MappingProxyType
+
+from utils.framework_bundle import (
+    FrameworkBundle,
+    normalize_text,
+    validate_framework,
+)
+import config
+
+FRAMEWORK_DIR = "frameworks"
+
+# Map friendly names to actual filenames
+FRAMEWORK_FILES = {
+    "NIST CSF 2.0": "nist_csf.json",
+    "ISO 27001:2022": "iso27001.json",
+    "SOC 2 Type II": "soc2.json",
+    "HIPAA": "hipaa.json",
+    "PCI DSS 4.0": "pci_dss.json",
+    "CMMC 2.0": "cmmc.json",
+    "NIST 800-53 Rev 5": "nist_800_53.json",
+    "CIS Controls v8": "cis_v8.json",
+    "GDPR": "gdpr.json",
+}
+
+
+def freeze(value):
+    """Read-only view of parsed JSON: dicts become mappingproxies, lists tuples."""
+    if isinstance(value, dict):
+        return MappingProxyType({k: freeze(v) for k, v in value.items()})
+    if isinstance(value, list):
+        return tuple(freeze(v) for v in value)
+    return value
+
+
+def thaw(value):
+    """Mutable (and JSON-serializable) copy of a frozen view."""
+    if isinstance(value, MappingProxyType):
+        return {k: thaw(v) for k, v in value.items()}
+    if isinstance(value, tuple):
+        return [thaw(v) for v in value]
+    return value
+
+
+class _Record:
+    """
+    Base for compact, read-only framework records.
+
+    Fields live in __slots__ (no per-instance dict) but the records still
+    read like the dicts they replace: record["control_id"], .get(),
+    .keys(), .items(), dict(record), and dict(record, controls=...).
+    """
+
+    __slots__ = ()
+    _fields = ()
+
+    def __init__(self, *values):
+        set_field = object.__setattr__
+        for name, value in zip(self.__slots__, values):
+            set_field(self, name, value)
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{type(self).__name__} is read-only")
+
+    def __getitem__(self, key):
+        if key in self._fields:
+            return getattr(self, key)
+        raise KeyError(key)
+
+    def get(self, key, default=None):
+        return getattr(self, key) if key in self._fields else default
+
+    def keys(self) -> tuple:
+        return self._fields
+
+    def values(self) -> list:
+        return [getattr(self, f) for f in self._fields]
+
+    def items(self) -> list:
+        return [(f, getattr(self, f)) for f in self._fields]
+
+    def __contains__(self, key) -> bool:
+        return key in self._fields
+
+    def __iter__(self):
+        return iter(self._fields)
+
+    def __len__(self) -> int:
+        return len(self._fields)
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, (_Record, dict, MappingProxyType)):
+            return dict(self.items()) == dict(other.items())
+        return NotImplemented
+
+    __hash__ = object.__hash__
+
+    def to_dict(self) -> dict:
+        """Plain (JSON-serializable) dict copy."""
+        return {f: getattr(self, f) for f in self._fields}
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self.to_dict()!r})"
+
+
+class Category(_Record):
+    """A category: function/category names and IDs plus its controls."""
+
+    __slots__ = ("function", "function_id", "category", "category_id",
+                 "controls")
+    _fields = __slots__
+
+
+class Control(_Record):
+    """
+    One control. Only its ID and description are stored; the function and
+    category fields are read through the shared Category record.
+    """
+
+    __slots__ = ("control_id", "description", "parent")
+    _fields = ("function", "function_id", "category", "category_id",
+               "control_id", "description")
+
+    @property
+    def function(self) -> str:
+        return self.parent.function
+
+    @property
+    def function_id(self) -> str:
+        return self.parent.function_id
+
+    @property
+    def category(self) -> str:
+        return self.parent.category
+
+    @property
+    def category_id(self) -> str:
+        return self.parent.category_id
+
+
+class Function(_Record):
+    """A function (top level): its ID, name and category IDs in order."""
+
+    __slots__ = ("id", "name", "category_ids")
+    _fields = __slots__
+
+
+class Framework:
+    """
+    Indexed, read-only view of one framework, built once per parse.
+
+    Lookups (all O(1)):
+        control(control_id)      -> Control record
+        category(category_id)    -> Category record (with its controls)
+        function(function_id)    -> Function record (id, name, category_ids)
+        categories_of(function_id) -> that function's Category records
+        parent(id) / children(id)  -> IDs one level up / down
+
+    Records are slotted and read like dicts with the same keys as
+    get_all_controls() items (see _Record). A function's categories and
+    controls are only built the first time something inside it is looked
+    up, so a large catalog (NIST 800-53) costs little until it is used;
+    function_ids never builds anything, while controls, categories,
+    functions and data build everything.
+
+    A bundle-backed Framework gets only the file's header (function IDs
+    and names) plus `loader` (function_id -> full function) and `locator`
+    (category/control ID -> function_id), so a function's payload is not
+    even read until it is built; `texts` returns the bundle's precomputed
+    search text (see search_texts).
+    """
+
+    def __init__(self, name: str, data, loader=None, locator=None,
+                 texts=None):
+        self.name = name
+        self._raw = data
+        self._data = data if isinstance(data, MappingProxyType) else None
+        self._loader = loader
+        self._locator = locator
+        self._texts = texts
+        self.version = data.get("version")
+        self.source = data.get("source", "file")
+
+        self._functions = {}     # function_id -> Function, once built
+        self._pending = {}       # function_id -> raw function, not built yet
+        self._categories = {}
+        self._controls = {}
+        self._parents = {}
+        self._children = {}
+        self._build_lock = threading.Lock()
+        for function in data.get("functions", ()):
+            function_id = sys.intern(function["id"])
+            self._pending[function_id] = function
+            self._functions[function_id] = None
+        self.function_ids = tuple(self._functions)
+        # Set under _build_lock once the last function is built; unlike an
+        # empty _pending it is not true while that build is still running
+        self._built = not self._pending
+
+    # -- lazy building --------------------------------------------------
+    def _build(self, function_id: str):
+        """
+        Build the records of one function (once). Returns only after the
+        function is built, also when another thread is building it.
+        """
+        with self._build_lock:
+            raw = self._pending.pop(function_id, None)
+            if raw is None:
+                return
+            if self._loader is not None:
+                raw = self._loader(function_id)
+            name = raw["name"]
+            category_ids = []
+            for category in raw.get("categories", ()):
+                category_id = sys.intern(category["id"])
+                members = []
+                record = Category(name, function_id, category["name"],
+                                  category_id, ())
+                for sub in category.get("subcategories", ()):
+                    control = Control(sys.intern(sub["id"]),
+                                      sub["description"], record)
+                    members.append(control)
+                    self._controls[control.control_id] = control
+                    self._parents[control.control_id] = category_id
+                object.__setattr__(record, "controls", tuple(members))
+                self._categories[category_id] = record
+                self._children[category_id] = tuple(c.control_id
+                                                    for c in members)
+                self._parents[category_id] = function_id
+                category_ids.append(category_id)
+            self._functions[function_id] = Function(function_id, name,
+                                                    tuple(category_ids))
+            self._children[function_id] = tuple(category_ids)
+            self._built = not self._pending
+
+    def _build_all(self):
+        if self._built:
+            return
+        for function_id in self.function_ids:
+            self._build(function_id)
+
+    def _find(self, node_id: str, index: dict):
+        """Look `node_id` up in `index`, building functions until found."""
+        found = index.get(node_id)
+        if found is not None or self._built:
+            return found
+        # _build() waits for a build another thread has already started,
+        # so the function is not skipped just because it left _pending
+        if self._locator is not None:
+            function_id = self._locator(node_id)
+            if function_id in self._functions:
+                self._build(function_id)
+            return index.get(node_id)
+        # IDs usually start with their function's ID ("PR.AA-01" in "PR")
+        for function_id in [f for f in self.function_ids
+                            if node_id.startswith(f)]:
+            self._build(function_id)
+        found = index.get(node_id)
+        if found is None:
+            self._build_all()
+            found = index.get(node_id)
+        return found
+
+    # -- whole-framework views ------------------------------------------
+    @property
+    def data(self):
+        """The framework file as a read-only mapping (see freeze)."""
+        if self._data is None:
+            raw = self._raw
+            if self._loader is not None:
+                raw = dict(raw, functions=[self._loader(function_id)
+                                           for function_id in self.function_ids])
+            self._data = freeze(raw)
+        return self._data
+
+    @property
+    def controls(self) -> tuple:
+        """Every Control record, in framework order."""
+        self._build_all()
+        return tuple(control for category in self._categories_in_order()
+                     for control in category.controls)
+
+    @property
+    def functions(self):
+        """function_id -> Function record, in framework order."""
+        self._build_all()
+        return MappingProxyType(dict(self._functions))
+
+    @property
+    def categories(self):
+        """category_id -> Category record, in framework order."""
+        self._build_all()
+        return MappingProxyType({c.category_id: c
+                                 for c in self._categories_in_order()})
+
+    def _categories_in_order(self) -> list:
+        return [self._categories[category_id]
+                for function_id in self.function_ids
+                for category_id in self._children[function_id]]
+
+    # -- lookups --------------------------------------------------------
+    def control(self, control_id: str):
+        """A control's record, or None."""
+        return self._find(control_id, self._controls)
+
+    def category(self, category_id: str):
+        """A category's record (with its controls), or None."""
+        return self._find(category_id, self._categories)
 
+    def function(self, function_id: str):
+        """A function's record, or None."""
+        if function_id not in self._functions:
+            return None
+        self._build(function_id)
+        return self._functions[function_id]
 
-def load_framework(framework_name: str) -> dict:
+    def categories_of(self, function_id: str) -> tuple:
+        """The category records of a function, in framework order."""
+        function = self.function(function_id)
+        if function is None:
+            return ()
+        return tuple(self._categories[c] for c in function.category_ids)
+
+    def parent(self, node_id: str) -> str:
+        """Category of a control, function of a category; else None."""
+        return self._find(node_id, self._parents)
+
+    def children(self, node_id: str) -> tuple:
+        """Categories of a function, controls of a category; else ()."""
+        if node_id in self._functions:
+            self._build(node_id)
+        return self._find(node_id, self._children) or ()
+
+    def search_texts(self) -> dict:
+        """
+        control_id -> normalized "ID description category function" text,
+        in framework order (used by utils/control_search). Read from the
+        bundle when there is one, so indexing builds no records.
+        """
+        if self._texts is not None:
+            return self._texts()
+        return {c.control_id: normalize_text(
+                    f"{c.control_id} {c.description} {c.category} "
+                    f"{c.function}")
+                for c in self.controls}
+
+    def __len__(self) -> int:
+        self._build_all()
+        return len(self._controls)
+
+
+class FrameworkRegistry:
     """
-    Load a framework's controls from a JSON file.
+    Process-wide cache of parsed framework files.
+
+    Usage:
+        registry = get_registry()
+        data = registry.get("NIST CSF 2.0")   # parsed on first use only
+    """
+
+    def __init__(self, directory: str = None, bundle_path: str = None):
+        """
+        Parameters:
+        -----------
+        directory : str, optional
+            Folder of framework JSON files (default: FRAMEWORK_DIR).
+
+        bundle_path : str, optional
+            Prebuilt bundle (default: config.FRAMEWORK_BUNDLE_PATH);
+            "" disables the bundle.
+        """
+        self.directory = directory or FRAMEWORK_DIR
+        self.bundle_path = (config.FRAMEWORK_BUNDLE_PATH if bundle_path is None
+                            else bundle_path)
+        self.bundle = FrameworkBundle.open(self.bundle_path)
+        self._lock = threading.Lock()
+        self._entries = {}     # name -> (stat key, sha256, Framework)
+        self._reported = set()  # names whose fallback was already explained
+        self.parses = 0
+
+    def path_for(self, framework_name: str) -> str:
+        """Path of a framework's JSON file, or None if the name is unknown."""
+        filename = FRAMEWORK_FILES.get(framework_name)
+        return os.path.join(self.directory, filename) if filename else None
+
+    def _ai_only(self, framework_name: str) -> Framework:
+        return Framework(framework_name, {"framework": framework_name,
+                                          "functions": [],
+                                          "source": "ai_only"})
+
+    def _from_bundle(self, framework_name: str) -> Framework:
+        entry = self.bundle.entry(framework_name)
+        return Framework(
+            framework_name, entry["header"],
+            loader=lambda fid: self.bundle.function(framework_name, fid),
+            locator=lambda node_id: self.bundle.locate(framework_name, node_id),
+            texts=lambda: self.bundle.control_texts(framework_name))
+
+    def available(self) -> list:
+        """Names of the frameworks that have control data (file or bundle)."""
+        return [name for name in FRAMEWORK_FILES
+                if os.path.exists(self.path_for(name))
+                or (self.bundle and self.bundle.entry(name))]
+
+    def get(self, framework_name: str):
+        """
+        Return a read-only view of a framework's data.
+
+        Parameters:
+        -----------
+        framework_name : str
+            Friendly name like "NIST CSF 2.0"
+
+        Returns:
+        --------
+        Mapping : Framework data with functions, categories, and controls
+                  (use thaw() for a mutable copy).
+        """
+        return self.framework(framework_name).data
+
+    def framework(self, framework_name: str) -> Framework:
+        """
+        Return the indexed Framework: from the bundle if the file is
+        unchanged since it was built, otherwise parsing (and validating)
+        the file only if it changed.
+        """
+        filepath = self.path_for(framework_name)
+        if filepath is None:
+            if framework_name not in self._reported:
+                self._reported.add(framework_name)
+                print(f"[WARNING] Framework '{framework_name}' not recognized.")
+                print(f"  Available frameworks: {list(FRAMEWORK_FILES.keys())}")
+            return self._ai_only(framework_name)
+
+        bundled = self.bundle.entry(framework_name) if self.bundle else None
+        try:
+            stat = os.stat(filepath)
+        except FileNotFoundError:
+            if bundled is not None:
+                # Deployed with the bundle only
+                stat = None
+            else:
+                with self._lock:
+                    self._entries.pop(framework_name, None)
+                    first = framework_name not in self._reported
+                    self._reported.add(framework_name)
+                if first:
+                    print(f"[INFO] Framework file not found: {filepath}")
+                    print(f"  The assessment will use Claude's built-in knowledge of {framework_name}.")
+                    print(f"  For better results, create {filepath} with the control data.")
+                return self._ai_only(framework_name)
+
+        stat_key = (stat.st_mtime_ns, stat.st_size) if stat else "bundle"
+        with self._lock:
+            cached = self._entries.get(framework_name)
+            if cached is not None and cached[0] == stat_key:
+                return cached[2]
+
+            if bundled is not None and (stat is None
+                                        or bundled["stat"] == stat_key):
+                framework = self._from_bundle(framework_name)
+                self._entries[framework_name] = (stat_key, bundled["sha256"],
+                                                 framework)
+                source = f"bundle {self.bundle_path}"
+            else:
+                with open(filepath, "rb") as f:
+                    raw = f.read()
+                digest = hashlib.sha256(raw).hexdigest()
+                if cached is not None and cached[1] == digest:
+                    # Touched but unchanged: keep the parsed framework
+                    self._entries[framework_name] = (stat_key, digest, cached[2])
+                    return cached[2]
+
+                if bundled is not None and bundled["sha256"] == digest:
+                    framework = self._from_bundle(framework_name)
+                    source = f"bundle {self.bundle_path}"
+                else:
+                    if bundled is not None:
+                        print(f"[WARN] {filepath} changed since the framework "
+                              f"bundle was built; rebuild it with: "
+                              f"python build_frameworks.py")
+                    framework = self._parse(framework_name, filepath, raw)
+                    source = filepath
+                self._entries[framework_name] = (stat_key, digest, framework)
+            self._reported.discard(framework_name)
+
+        if framework.source != "ai_only":
+            print(f"[OK] Loaded framework: {framework_name} from {source}")
+        return framework
+
+    def _parse(self, framework_name: str, filepath: str, raw: bytes) -> Framework:
+        """Parse and validate a framework file; AI-only if it is invalid."""
+        self.parses += 1
+        try:
+            data = json.loads(raw.decode("utf-8"))
+        except ValueError as e:
+            errors = [f"invalid JSON: {e}"]
+        else:
+            errors = validate_framework(data)
+        if not errors:
+            return Framework(framework_name, data)
+
+        print(f"[ERROR] Framework file {filepath} is invalid "
+              f"({len(errors)} problem(s)):")
+        for error in errors[:5]:
+            print(f"  {error}")
+        if len(errors) > 5:
+            print(f"  ... and {len(errors) - 5} more "
+                  f"(python build_frameworks.py --check lists them all)")
+        print(f"  The assessment will use Claude's built-in knowledge of {framework_name}.")
+        return self._ai_only(framework_name)
+
+    def clear(self):
+        """Forget every parsed framework and reopen the bundle."""
+        with self._lock:
+            self._entries.clear()
+            self._reported.clear()
+            self.bundle = FrameworkBundle.open(self.bundle_path)
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_registry() -> FrameworkRegistry:
+    """Return the process-wide FrameworkRegistry."""
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = FrameworkRegistry()
+    return _registry
+
+
+def load_framework(framework_name: str):
+    """
+    Load a framework's controls from its JSON file (parsed once per
+    process; see FrameworkRegistry).
 
     Parameters:
     -----------
@@ -21,40 +572,18 @@ def load_framework(framework_name: str) -> dict:
 
     Returns:
     --------
-    dict : Framework data with functions, categories, and controls.
-    """
-    # Map friendly names to actual filenames
-    framework_files = {
-        "NIST CSF 2.0": "nist_csf.json",
-        "ISO 27001:2022": "iso27001.json",
-        "SOC 2 Type II": "soc2.json",
-        "HIPAA": "hipaa.json",
-        "PCI DSS 4.0": "pci_dss.json",
-        "CMMC 2.0": "cmmc.json",
-        "NIST 800-53 Rev 5": "nist_800_53.json",
-        "CIS Controls v8": "cis_v8.json",
-        "GDPR": "gdpr.json",
-    }
-
-    filename = framework_files.get(framework_name)
-    if not filename:
-        print(f"[WARNING] Framework '{framework_name}' not recognized.")
-        print(f"  Available frameworks: {list(framework_files.keys())}")
-        return {"framework": framework_name, "functions": [], "source": "ai_only"}
-
-    filepath = os.path.join("frameworks", filename)
-
-    if not os.path.exists(filepath):
-        print(f"[INFO] Framework file not found: {filepath}")
-        print(f"  The assessment will use Claude's built-in knowledge of {framework_name}.")
-        print(f"  For better results, create {filepath} with the control data.")
-        return {"framework": framework_name, "functions": [], "source": "ai_only"}
+    Mapping : Read-only framework data with functions, categories, and
+              controls.
+    """
+    return get_registry().get(framework_name)
 
-    with open(filepath, "r", encoding="utf-8") as f:
-        data = json.load(f)
 
-    print(f"[OK] Loaded framework: {framework_name} from {filepath}")
-    return data
+def get_framework(framework_name: str) -> Framework:
+    """
+    Indexed Framework for a friendly name like "NIST CSF 2.0" (built once
+    per parse; see Framework and FrameworkRegistry).
+    """
+    return get_registry().framework(framework_name)
 
 
 def get_all_controls(framework_data: dict) -> list:
@@ -91,4 +620,4 @@ def format_controls_for_prompt(controls: list) -> str:
             current_function = ctrl["function"]
             lines.append(f"\n## {ctrl['function_id']} - {ctrl['function']}")
         lines.append(f"  {ctrl['control_id']}: {ctrl['description']}")
-    return "\n".join(lines)
\ No newline at end of file
+    return "\n".join(lines)
@@ -0,0 +1,143 @@
+"""
+utils/json_extract.py
+
+Pull the JSON payload out of a model response in linear time.
+
+Claude occasionally wraps JSON in markdown fences, adds a sentence before
+or after it, or runs out of max_tokens halfway through a long array.
+
+HOW IT WORKS:
+1. Strip markdown fences and skip any preamble up to the first { or [
+2. Decode the value starting there with json's raw_decode, which stops at
+   the end of the value and ignores trailing text
+3. If that fails, scan the text once, tracking brackets and strings, to
+   remember the last point where an element was complete. A truncated
+   array/object is cut there and closed with the brackets still open,
+   e.g. '[{"a": 1}, {"b": ' becomes '[{"a": 1}]'
+"""
+
+import json
+import re
+
+# Characters that can change the scanner's state; everything else is skipped
+_STRUCTURAL = re.compile(r'["\\{}\[\],]')
+
+_CLOSERS = {"{": "}", "[": "]"}
+
+_decoder = json.JSONDecoder()
+
+
+def _strip_fences(text: str) -> str:
+    text = text.strip()
+    if text.startswith("```json"):
+        text = text[7:]
+    if text.startswith("```"):
+        text = text[3:]
+    if text.endswith("```"):
+        text = text[:-3]
+    return text.strip()
+
+
+def _find_start(text: str) -> int:
+    starts = [s for s in (text.find("{"), text.find("[")) if s >= 0]
+    return min(starts) if starts else -1
+
+
+def scan_json(text: str, start: int = 0) -> tuple:
+    """
+    Single pass over a JSON value beginning at text[start].
+
+    Returns:
+        tuple: (end, cut, open_at_cut)
+            end: index just past the closing bracket of the outermost
+                 value, or None if it never closes (truncated)
+            cut: index just past the last complete element inside the
+                 value, or None if no element completed
+            open_at_cut: brackets still open at `cut`, outermost first
+    """
+    stack = []
+    in_string = False
+    escape_at = -2  # position of the last unconsumed backslash in a string
+    cut = None
+    open_at_cut = ()
+
+    for match in _STRUCTURAL.finditer(text, start):
+        ch = match.group()
+        pos = match.start()
+
+        if in_string:
+            if pos == escape_at + 1:
+                # This character is escaped (\" or \\)
+                escape_at = -2
+            elif ch == "\\":
+                escape_at = pos
+            elif ch == '"':
+                in_string = False
+            continue
+
+        if ch == '"':
+            in_string = True
+        elif ch in "{[":
+            stack.append(ch)
+        elif ch in "}]":
+            if not stack:
+                break
+            stack.pop()
+            if not stack:
+                return pos + 1, cut, open_at_cut
+            # The value that just closed is a complete element of its parent
+            cut = pos + 1
+            open_at_cut = tuple(stack)
+        elif ch == "," and stack:
+            # Everything before a comma is a complete element
+            cut = pos
+            open_at_cut = tuple(stack)
+
+    return None, cut, open_at_cut
+
+
+def close_truncated(text: str, start: int = 0) -> str:
+    """
+    Repair a JSON value that was cut off mid-way (e.g. by max_tokens).
+
+    Returns:
+        str: The value cut at its last complete element with the open
+             brackets closed, or None if nothing can be recovered.
+    """
+    end, cut, open_at_cut = scan_json(text, start)
+    if end is not None or cut is None:
+        return None
+    closing = "".join(_CLOSERS[b] for b in reversed(open_at_cut))
+    return text[start:cut] + closing
+
+
+def extract_json(text: str):
+    """
+    Extract and parse the JSON payload from a model response.
+
+    Raises:
+        ValueError: If no JSON value can be found or recovered.
+    """
+    text = _strip_fences(text)
+    start = _find_start(text)
+    if start < 0:
+        raise ValueError(f"No JSON found in response: {text[:200]}")
+
+    try:
+        value, _ = _decoder.raw_decode(text, start)
+        return value
+    except json.JSONDecodeError:
+        pass
+
+    repaired = close_truncated(text, start)
+    if repaired is not None:
+        try:
+            value = json.loads(repaired)
+        except json.JSONDecodeError:
+            pass
+        else:
+            print(f"[WARN] JSON response was truncated — recovered "
+                  f"{len(repaired)} of {len(text) - start} characters.")
+            return value
+
+    raise ValueError(f"Could not parse JSON from response: {text[start:start + 500]}")
@@ -0,0 +1,550 @@
+"""
+utils/llm_backends.py
+
+Interchangeable LLM backends behind ai_client.
+
+ai_client owns everything that is the same for every provider — response
+cache, rate limiter, retries, concurrency gate. A backend only turns
+Messages-API-style request parameters (see ai_client.build_request) into
+one provider call and normalizes the answer into an LLMResponse.
+
+Backends (selected with config.LLM_BACKEND / GRC_LLM_BACKEND):
+- "anthropic": Claude via the official SDK (default)
+- "openai":    any OpenAI-compatible Chat Completions endpoint
+               (OpenAI, Azure OpenAI, vLLM, Ollama, LiteLLM, ...)
+- "fake":      no network. Deterministic canned responses — schema-valid
+               JSON for structured calls — with configurable latency and
+               injected errors, for load tests and profiling.
+
+Every backend implements the same protocol:
+    create(params) -> LLMResponse              (sync)
+    await acreate(params) -> LLMResponse       (async)
+    async for item in astream(params): ...     (text deltas, then the
+                                                final LLMResponse)
+
+Provider errors worth retrying are raised as RateLimitedError or
+TransientBackendError so ai_client can apply one retry policy to all.
+"""
+
+import asyncio
+import hashlib
+import inspect
+import json
+import random
+import re
+import threading
+import time
+import weakref
+
+import anthropic
+import config
+
+
+class LLMResponse:
+    """A provider response normalized to what ai_client needs."""
+
+    def __init__(self, text: str, input_tokens: int = 0,
+                 output_tokens: int = 0,
+                 cache_creation_input_tokens: int = 0,
+                 cache_read_input_tokens: int = 0,
+                 stop_reason: str = None, headers=None):
+        self.text = text
+        self.input_tokens = input_tokens
+        self.output_tokens = output_tokens
+        self.cache_creation_input_tokens = cache_creation_input_tokens
+        self.cache_read_input_tokens = cache_read_input_tokens
+        self.stop_reason = stop_reason
+        self.headers = headers or {}
+
+    def usage(self) -> dict:
+        return {
+            "input_tokens": self.input_tokens,
+            "cache_creation_input_tokens": self.cache_creation_input_tokens,
+            "cache_read_input_tokens": self.cache_read_input_tokens,
+            "output_tokens": self.output_tokens,
+        }
+
+
+class TransientBackendError(Exception):
+    """Overload, server or connection error — safe to retry."""
+
+    def __init__(self, message: str, headers=None):
+        super().__init__(message)
+        self.headers = headers
+
+
+class RateLimitedError(TransientBackendError):
+    """The provider rejected the request with a rate limit (HTTP 429)."""
+
+
+def response_text(message) -> str:
+    """
+    Extract the payload from an Anthropic Messages response: the text, or
+    the forced tool call's input serialized as JSON.
+    """
+    for block in message.content:
+        if getattr(block, "type", "text") == "tool_use":
+            return json.dumps(block.input)
+    return message.content[0].text
+
+
+def _system_text(system) -> str:
+    """Flatten a str or block-list system prompt to plain text."""
+    if isinstance(system, list):
+        return "\n\n".join(b.get("text", "") for b in system)
+    return system or ""
+
+
+class _PerLoopClients:
+    """Async SDK clients are bound to the event loop they were created on."""
+
+    def __init__(self, factory):
+        self._factory = factory
+        self._clients = weakref.WeakKeyDictionary()
+
+    def get(self):
+        loop = asyncio.get_running_loop()
+        client = self._clients.get(loop)
+        if client is None:
+            client = self._factory()
+            self._clients[loop] = client
+        return client
+
+
+# ────────────────────────────────────────────
+# Anthropic
+# ────────────────────────────────────────────
+class AnthropicBackend:
+    """Claude through the official anthropic SDK."""
+
+    name = "anthropic"
+
+    def __init__(self, api_key: str = None):
+        api_key = api_key or config.ANTHROPIC_API_KEY
+        # Retries are handled by ai_client (shared rate limiter + backoff),
+        # not by the SDK
+        self._client = anthropic.Anthropic(api_key=api_key, max_retries=0)
+        self._async_clients = _PerLoopClients(
+            lambda: anthropic.AsyncAnthropic(api_key=api_key, max_retries=0))
+
+    @staticmethod
+    def _to_response(message, headers) -> LLMResponse:
+        usage = message.usage
+        return LLMResponse(
+            text=response_text(message),
+            input_tokens=usage.input_tokens,
+            output_tokens=usage.output_tokens,
+            cache_creation_input_tokens=(
+                getattr(usage, "cache_creation_input_tokens", 0) or 0),
+            cache_read_input_tokens=(
+                getattr(usage, "cache_read_input_tokens", 0) or 0),
+            stop_reason=getattr(message, "stop_reason", None),
+            headers=headers,
+        )
+
+    @staticmethod
+    def _translate(e: Exception):
+        headers = getattr(getattr(e, "response", None), "headers", None)
+        if isinstance(e, anthropic.RateLimitError):
+            return RateLimitedError(str(e), headers)
+        if isinstance(e, (anthropic.InternalServerError,
+                          anthropic.APIConnectionError)):
+            return TransientBackendError(f"{type(e).__name__}: {e}", headers)
+        return None
+
+    def create(self, params: dict) -> LLMResponse:
+        try:
+            raw = self._client.messages.with_raw_response.create(**params)
+            return self._to_response(raw.parse(), raw.headers)
+        except anthropic.APIError as e:
+            translated = self._translate(e)
+            if translated is None:
+                raise
+            raise translated from e
+
+    async def acreate(self, params: dict) -> LLMResponse:
+        client = self._async_clients.get()
+        try:
+            raw = await client.messages.with_raw_response.create(**params)
+            message = raw.parse()
+            if inspect.isawaitable(message):
+                message = await message
+            return self._to_response(message, raw.headers)
+        except anthropic.APIError as e:
+            translated = self._translate(e)
+            if translated is None:
+                raise
+            raise translated from e
+
+    async def astream(self, params: dict):
+        client = self._async_clients.get()
+        try:
+            async with client.messages.stream(**params) as stream:
+                async for text in stream.text_stream:
+                    yield text
+                message = await stream.get_final_message()
+                headers = getattr(getattr(stream, "response", None),
+                                  "headers", None)
+            yield self._to_response(message, headers)
+        except anthropic.APIError as e:
+            translated = self._translate(e)
+            if translated is None:
+                raise
+            raise translated from e
+
+
+# ────────────────────────────────────────────
+# OpenAI-compatible
+# ────────────────────────────────────────────
+class OpenAICompatibleBackend:
+    """
+    Any endpoint that speaks the OpenAI Chat Completions API.
+
+    Requests are translated from Messages-API parameters: the system
+    prompt becomes a system message and a forced tool call becomes a
+    forced function call. config.OPENAI_MODEL overrides the Claude model
+    name in the request.
+    """
+
+    name = "openai"
+
+    def __init__(self, base_url: str = None, api_key: str = None,
+                 model: str = None):
+        try:
+            import openai
+        except ImportError:
+            raise ImportError("openai required for the OpenAI-compatible "
+                              "backend: pip install openai")
+        self._openai = openai
+        base_url = base_url or config.OPENAI_BASE_URL or None
+        api_key = api_key or config.OPENAI_API_KEY
+        self.model = model or config.OPENAI_MODEL
+        self._client = openai.OpenAI(base_url=base_url, api_key=api_key,
+                                     max_retries=0)
+        self._async_clients = _PerLoopClients(
+            lambda: openai.AsyncOpenAI(base_url=base_url, api_key=api_key,
+                                       max_retries=0))
+
+    def _request(self, params: dict) -> dict:
+        messages = []
+        system = _system_text(params.get("system"))
+        if system:
+            messages.append({"role": "system", "content": system})
+        for msg in params["messages"]:
+            content = msg["content"]
+            if isinstance(content, list):
+                content = "".join(b.get("text", "") for b in content)
+            messages.append({"role": msg["role"], "content": content})
+
+        request = {
+            "model": self.model or params["model"],
+            "messages": messages,
+            "max_tokens": params["max_tokens"],
+            "temperature": params.get("temperature", 0.3),
+        }
+        if params.get("tools"):
+            request["tools"] = [{
+                "type": "function",
+                "function": {
+                    "name": t["name"],
+                    "description": t.get("description", ""),
+                    "parameters": t["input_schema"],
+                },
+            } for t in params["tools"]]
+            choice = params.get("tool_choice") or {}
+            if choice.get("type") == "tool":
+                request["tool_choice"] = {"type": "function",
+                                          "function": {"name": choice["name"]}}
+        return request
+
+    @staticmethod
+    def _to_response(completion, headers) -> LLMResponse:
+        choice = completion.choices[0]
+        tool_calls = getattr(choice.message, "tool_calls", None)
+        if tool_calls:
+            text = tool_calls[0].function.arguments
+        else:
+            text = choice.message.content or ""
+        usage = completion.usage
+        details = getattr(usage, "prompt_tokens_details", None)
+        cached = (getattr(details, "cached_tokens", 0) or 0) if details else 0
+        return LLMResponse(
+            text=text,
+            input_tokens=usage.prompt_tokens - cached,
+            output_tokens=usage.completion_tokens,
+            cache_read_input_tokens=cached,
+            stop_reason=choice.finish_reason,
+            headers=headers,
+        )
+
+    def _translate(self, e: Exception):
+        headers = getattr(getattr(e, "response", None), "headers", None)
+        if isinstance(e, self._openai.RateLimitError):
+            return RateLimitedError(str(e), headers)
+        if isinstance(e, (self._openai.InternalServerError,
+                          self._openai.APIConnectionError)):
+            return TransientBackendError(f"{type(e).__name__}: {e}", headers)
+        return None
+
+    def create(self, params: dict) -> LLMResponse:
+        try:
+            raw = self._client.chat.completions.with_raw_response.create(
+                **self._request(params))
+            return self._to_response(raw.parse(), raw.headers)
+        except self._openai.APIError as e:
+            translated = self._translate(e)
+            if translated is None:
+                raise
+            raise translated from e
+
+    async def acreate(self, params: dict) -> LLMResponse:
+        client = self._async_clients.get()
+        try:
+            raw = await client.chat.completions.with_raw_response.create(
+                **self._request(params))
+            completion = raw.parse()
+            if inspect.isawaitable(completion):
+                completion = await completion
+            return self._to_response(completion, raw.headers)
+        except self._openai.APIError as e:
+            translated = self._translate(e)
+            if translated is None:
+                raise
+            raise translated from e
+
+    async def astream(self, params: dict):
+        client = self._async_clients.get()
+        request = self._request(params)
+        request["stream"] = True
+        request["stream_options"] = {"include_usage": True}
+        parts = []
+        usage = None
+        finish_reason = None
+        try:
+            stream = await client.chat.completions.create(**request)
+            async for chunk in stream:
+                if chunk.usage is not None:
+                    usage = chunk.usage
+                if not chunk.choices:
+                    continue
+                choice = chunk.choices[0]
+                finish_reason = choice.finish_reason or finish_reason
+                text = choice.delta.content if choice.delta else None
+                if text:
+                    parts.append(text)
+                    yield text
+        except self._openai.APIError as e:
+            translated = self._translate(e)
+            if translated is None:
+                raise
+            raise translated from e
+
+        yield LLMResponse(
+            text="".join(parts),
+            input_tokens=getattr(usage, "prompt_tokens", 0) if usage else 0,
+            output_tokens=getattr(usage, "completion_tokens", 0) if usage else 0,
+            stop_reason=finish_reason,
+        )
+
+
+# ────────────────────────────────────────────
+# Fake (offline)
+# ────────────────────────────────────────────
+# Control IDs in prompts: "- PR.AA-01: description" lines (gap assessment)
+# or "control_id": "..." fields (controls/gaps passed as JSON)
+_CONTROL_LINE = re.compile(r"^\s*-\s*([A-Za-z0-9][\w.\-()]*):", re.MULTILINE)
+_CONTROL_FIELD = re.compile(r'"control_id":\s*"([^"]+)"')
+
+
+def _control_ids(prompt: str) -> list:
+    ids = [i for i in _CONTROL_LINE.findall(prompt)
+           if any(ch.isdigit() for ch in i)]
+    return ids or list(dict.fromkeys(_CONTROL_FIELD.findall(prompt)))
+
+
+_FAKE_DOCUMENT = """# {title}
+
+## 1. Purpose
+This is a synthetic document produced by the offline fake backend.
+It has the shape of a real response so downstream code can be exercised.
+
+## 2. Scope
+Applies to all workforce members, systems and data in scope.
+
+## 3. Requirements
+{requirements}
+
+## 4. Review
+Reviewed annually by the document owner.
+"""
+
+
+class FakeBackend:
+    """
+    Offline backend for load tests and profiling.
+
+    Responses are deterministic: the same request (and seed) always gives
+    the same answer. Structured calls get JSON generated from the tool's
+    input schema — one array item per control listed in the prompt — so
+    every engine runs end to end.
+
+    Latency is lognormal with median `latency` seconds and shape `jitter`
+    (0 = fixed). `error_rate` injects retryable server errors and
+    `rate_limit_rate` injects 429s (with a retry-after header).
+    """
+
+    name = "fake"
+
+    def __init__(self, latency: float = None, jitter: float = None,
+                 error_rate: float = None, rate_limit_rate: float = None,
+                 seed: int = None):
+        self.latency = (config.FAKE_LLM_LATENCY_SECONDS
+                        if latency is None else latency)
+        self.jitter = config.FAKE_LLM_LATENCY_JITTER if jitter is None else jitter
+        self.error_rate = (config.FAKE_LLM_ERROR_RATE
+                           if error_rate is None else error_rate)
+        self.rate_limit_rate = (config.FAKE_LLM_RATE_LIMIT_RATE
+                                if rate_limit_rate is None else rate_limit_rate)
+        self.seed = config.FAKE_LLM_SEED if seed is None else seed
+        # Latency and error draws vary per call; content does not
+        self._chaos = random.Random(self.seed)
+        self._chaos_lock = threading.Lock()
+
+    # -- behaviour ------------------------------------------------------
+    def _draw(self) -> tuple:
+        """(latency seconds, error to raise or None) for one call."""
+        with self._chaos_lock:
+            delay = self.latency
+            if self.jitter and self.latency > 0:
+                delay = self._chaos.lognormvariate(0.0, self.jitter) * self.latency
+            roll = self._chaos.random()
+        if roll < self.rate_limit_rate:
+            return delay * 0.1, RateLimitedError(
+                "Injected rate limit (fake backend)", {"retry-after": "1"})
+        if roll < self.rate_limit_rate + self.error_rate:
+            return delay * 0.5, TransientBackendError(
+                "Injected overload (fake backend)")
+        return delay, None
+
+    def _content_rng(self, params: dict) -> random.Random:
+        raw = json.dumps(params, sort_keys=True, default=str)
+        digest = hashlib.sha256(f"{self.seed}:{raw}".encode("utf-8")).digest()
+        return random.Random(int.from_bytes(digest[:8], "big"))
+
+    # -- content --------------------------------------------------------
+    def _fake_value(self, schema: dict, rng: random.Random, name: str,
+                    ids: list, index: int):
+        if "enum" in schema:
+            return rng.choice(schema["enum"])
+        kind = schema.get("type", "string")
+        if isinstance(kind, list):
+            kind = kind[0]
+        if kind == "object":
+            return {key: self._fake_value(sub, rng, key, ids, index)
+                    for key, sub in schema.get("properties", {}).items()}
+        if kind == "array":
+            item_schema = schema.get("items", {"type": "string"})
+            count = len(ids) if ids and item_schema.get("type") == "object" else 2
+            return [self._fake_value(item_schema, rng, name, ids, i)
+                    for i in range(count)]
+        if kind == "integer":
+            return rng.randint(schema.get("minimum", 1),
+                               schema.get("maximum", 5))
+        if kind == "number":
+            return round(rng.uniform(schema.get("minimum", 0),
+                                     schema.get("maximum", 1)), 2)
+        if kind == "boolean":
+            return rng.random() < 0.5
+        if name == "control_id" and ids:
+            return ids[index % len(ids)]
+        if name.endswith("_id"):
+            return f"{name[:-3].upper()}-{index + 1:03d}"
+        return f"Synthetic {name.replace('_', ' ')} #{index + 1}"
+
+    def _fake_text(self, params: dict, rng: random.Random) -> str:
+        prompt = params["messages"][-1]["content"]
+        if isinstance(prompt, list):
+            prompt = "".join(b.get("text", "") for b in prompt)
+
+        tools = params.get("tools")
+        if tools:
+            ids = _control_ids(prompt)
+            value = self._fake_value(tools[0]["input_schema"], rng,
+                                     "result", ids, 0)
+            return json.dumps(value)
+
+        if "valid JSON only" in _system_text(params.get("system")):
+            return "[]"
+
+        title = prompt.strip().splitlines()[0][:80] if prompt.strip() else "Response"
+        requirements = "\n".join(
+            f"- Requirement {i + 1}: control activity {rng.randint(100, 999)}."
+            for i in range(rng.randint(5, 12)))
+        return _FAKE_DOCUMENT.format(title=title, requirements=requirements)
+
+    def _response(self, params: dict) -> LLMResponse:
+        from utils.rate_limiter import estimate_tokens
+
+        text = self._fake_text(params, self._content_rng(params))
+        prompt = (_system_text(params.get("system"))
+                  + json.dumps(params["messages"]))
+        return LLMResponse(
+            text=text,
+            input_tokens=estimate_tokens(prompt),
+            output_tokens=estimate_tokens(text),
+            stop_reason="tool_use" if params.get("tools") else "end_turn",
+        )
+
+    # -- protocol -------------------------------------------------------
+    def create(self, params: dict) -> LLMResponse:
+        delay, error = self._draw()
+        time.sleep(delay)
+        if error:
+            raise error
+        return self._response(params)
+
+    async def acreate(self, params: dict) -> LLMResponse:
+        delay, error = self._draw()
+        await asyncio.sleep(delay)
+        if error:
+            raise error
+        return self._response(params)
+
+    async def astream(self, params: dict):
+        delay, error = self._draw()
+        # Roughly a third of the latency before the first token
+        await asyncio.sleep(delay / 3)
+        if error:
+            raise error
+        response = self._response(params)
+        chunks = [response.text[i:i + 40]
+                  for i in range(0, len(response.text), 40)] or [""]
+        for chunk in chunks:
+            await asyncio.sleep(delay * 2 / 3 / len(chunks))
+            yield chunk
+        yield response
+
+
+# ────────────────────────────────────────────
+# Selection
+# ────────────────────────────────────────────
+BACKENDS = {
+    "anthropic": AnthropicBackend,
+    "openai": OpenAICompatibleBackend,
+    "fake": FakeBackend,
+}
+
+_backends = {}
+_backends_lock = threading.Lock()
+
+
+def get_backend(name: str = None):
+    """Return the shared backend instance for `name` (default: config)."""
+    name = name or config.LLM_BACKEND
+    with _backends_lock:
+        if name not in _backends:
+            if name not in BACKENDS:
+                raise ValueError(f"Unknown LLM backend: {name} "
+                                 f"(choose from {', '.join(BACKENDS)})")
+            _backends[name] = BACKENDS[name]()
+        return _backends[name]
@@ -0,0 +1,229 @@
+"""
+utils/rate_limiter.py
+
+Process-wide rate limiting for Claude API calls.
+
+Anthropic enforces three budgets per minute: requests (RPM), input tokens
+(ITPM) and output tokens (OTPM). Instead of firing requests until we get
+a 429 and then sleeping, every caller reserves budget from a shared set of
+token buckets and waits exactly as long as needed for its turn.
+
+HOW IT WORKS:
+1. Before a request, reserve() takes 1 request and the estimated input
+   tokens from the buckets and returns how long the caller must wait.
+   Buckets are allowed to go negative, so concurrent callers queue up
+   behind each other instead of all waking at the same moment.
+2. Output tokens are only known after the response, so record_usage()
+   charges them afterwards; new requests wait while that bucket is in debt.
+3. observe_headers() syncs the buckets with the anthropic-ratelimit-*
+   headers and pauses everyone when the server says a budget is exhausted.
+4. backoff_delay() gives jittered exponential delays for retries, honoring
+   the server's retry-after header when present.
+"""
+
+import random
+import threading
+import time
+from datetime import datetime, timezone
+
+import config
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token estimate (~4 characters per token for English text)."""
+    return max(1, len(text) // 4)
+
+
+class TokenBucket:
+    """
+    A per-minute budget that refills continuously.
+
+    `level` may go negative: that is a reservation for capacity that will
+    only exist in the future, and wait_time() says how far in the future.
+    """
+
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.rate = self.capacity / 60.0
+        self.level = self.capacity
+        self.updated = time.monotonic()
+
+    def refill(self, now: float):
+        self.level = min(self.capacity,
+                         self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def take(self, amount: float):
+        # A single request larger than the whole budget can never fit;
+        # charge the full capacity so it still gets scheduled.
+        self.level -= min(amount, self.capacity)
+
+    def wait_time(self) -> float:
+        return -self.level / self.rate if self.level < 0 else 0.0
+
+
+class RateLimiter:
+    """
+    Shared request/input-token/output-token budget.
+
+    A limit of 0 (or None) disables that bucket. All methods are
+    thread-safe; callers do their own sleeping (time.sleep or
+    asyncio.sleep) on the returned delays.
+    """
+
+    def __init__(self, requests_per_minute: int = None,
+                 input_tokens_per_minute: int = None,
+                 output_tokens_per_minute: int = None):
+        self._lock = threading.Lock()
+        self.requests = (TokenBucket(requests_per_minute)
+                         if requests_per_minute else None)
+        self.input_tokens = (TokenBucket(input_tokens_per_minute)
+                             if input_tokens_per_minute else None)
+        self.output_tokens = (TokenBucket(output_tokens_per_minute)
+                              if output_tokens_per_minute else None)
+        self._paused_until = 0.0
+
+    def _buckets(self):
+        return [b for b in (self.requests, self.input_tokens,
+                            self.output_tokens) if b is not None]
+
+    def reserve(self, input_tokens: int = 0) -> float:
+        """
+        Reserve budget for one request.
+
+        Returns:
+            float: Seconds the caller must wait before sending.
+        """
+        with self._lock:
+            now = time.monotonic()
+            for bucket in self._buckets():
+                bucket.refill(now)
+
+            # Output debt from earlier responses gates new requests
+            wait = self.output_tokens.wait_time() if self.output_tokens else 0.0
+
+            if self.requests:
+                self.requests.take(1)
+                wait = max(wait, self.requests.wait_time())
+            if self.input_tokens:
+                self.input_tokens.take(input_tokens)
+                wait = max(wait, self.input_tokens.wait_time())
+
+            return max(wait, self._paused_until - now)
+
+    def record_usage(self, estimated_input: int, input_tokens: int,
+                     output_tokens: int):
+        """Correct the input estimate and charge actual output tokens."""
+        with self._lock:
+            now = time.monotonic()
+            if self.input_tokens:
+                self.input_tokens.refill(now)
+                self.input_tokens.level += estimated_input - input_tokens
+            if self.output_tokens:
+                self.output_tokens.refill(now)
+                self.output_tokens.take(output_tokens)
+
+    def pause(self, seconds: float):
+        """Block every caller for `seconds` (e.g. after a 429)."""
+        with self._lock:
+            self._paused_until = max(self._paused_until,
+                                     time.monotonic() + seconds)
+
+    def observe_headers(self, headers):
+        """
+        Sync with the server's view of our remaining budget.
+
+        Reads anthropic-ratelimit-{requests,input-tokens,output-tokens}-
+        remaining/-reset. If a budget is exhausted, pause until it resets.
+        """
+        if not headers:
+            return
+
+        pairs = [
+            ("requests", self.requests),
+            ("input-tokens", self.input_tokens),
+            ("output-tokens", self.output_tokens),
+        ]
+        pause_for = 0.0
+        with self._lock:
+            now = time.monotonic()
+            for name, bucket in pairs:
+                remaining = _header_int(
+                    headers.get(f"anthropic-ratelimit-{name}-remaining"))
+                if remaining is None:
+                    continue
+                if bucket is not None:
+                    bucket.refill(now)
+                    bucket.level = min(bucket.level, remaining)
+                if remaining <= 0:
+                    reset_in = _seconds_until(
+                        headers.get(f"anthropic-ratelimit-{name}-reset"))
+                    pause_for = max(pause_for, reset_in or 0.0)
+            if pause_for:
+                self._paused_until = max(self._paused_until, now + pause_for)
+
+
+def retry_after_seconds(headers):
+    """Parse the retry-after header (seconds) if present."""
+    if not headers:
+        return None
+    value = headers.get("retry-after")
+    try:
+        return max(0.0, float(value)) if value is not None else None
+    except ValueError:
+        return _seconds_until(value)
+
+
+def backoff_delay(attempt: int, retry_after: float = None) -> float:
+    """
+    Jittered exponential backoff ("full jitter").
+
+    Args:
+        attempt: 0 for the first retry, 1 for the second, ...
+        retry_after: Server-provided minimum wait, if any
+    """
+    ceiling = min(config.LLM_BACKOFF_MAX_SECONDS,
+                  config.LLM_BACKOFF_BASE_SECONDS * (2 ** attempt))
+    delay = random.uniform(0, ceiling)
+    if retry_after is not None:
+        # Honor the server's hint, spreading callers out a little so they
+        # don't all retry in the same instant
+        delay = retry_after + random.uniform(0, config.LLM_BACKOFF_BASE_SECONDS)
+    return delay
+
+
+def _header_int(value):
+    try:
+        return int(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+def _seconds_until(value):
+    """Seconds from now until an RFC 3339 timestamp (None if unparseable)."""
+    if not value:
+        return None
+    try:
+        reset = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    if reset.tzinfo is None:
+        reset = reset.replace(tzinfo=timezone.utc)
+    return max(0.0, (reset - datetime.now(timezone.utc)).total_seconds())
+
+
+_limiter = None
+_limiter_lock = threading.Lock()
+
+
+def get_rate_limiter() -> RateLimiter:
+    """Return the process-wide limiter configured from config.py."""
+    global _limiter
+    with _limiter_lock:
+        if _limiter is None:
+            _limiter = RateLimiter(
+                requests_per_minute=config.RATE_LIMIT_REQUESTS_PER_MINUTE,
+                input_tokens_per_minute=config.RATE_LIMIT_INPUT_TOKENS_PER_MINUTE,
+                output_tokens_per_minute=config.RATE_LIMIT_OUTPUT_TOKENS_PER_MINUTE,
+            )
+    return _limiter
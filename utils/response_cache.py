@@ -0,0 +1,178 @@
+"""
+utils/response_cache.py
+
+Persistent, content-addressed cache for Claude responses.
+
+Re-running the same assessment, policy or review with identical inputs
+returns the stored response instead of paying for another API call.
+
+HOW IT WORKS:
+1. Each request is hashed (model, system prompt, messages, temperature,
+   max_tokens) into a SHA-256 key
+2. Responses are stored in a single SQLite file (config.LLM_CACHE_PATH)
+3. Entries older than the TTL are treated as misses and dropped
+4. When the total size exceeds the byte cap, the least recently used
+   entries are evicted first
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+
+def make_cache_key(model: str, system, messages: list,
+                   temperature: float, max_tokens: int, **extra) -> str:
+    """
+    Build a stable content hash for a request.
+
+    `extra` holds any other request parameters that change the response
+    (e.g. a tool schema) — they are folded into the key as-is.
+    """
+    payload = {
+        "model": model,
+        "system": system,
+        "messages": messages,
+        "temperature": temperature,
+        "max_tokens": max_tokens,
+    }
+    payload.update(extra)
+    raw = json.dumps(payload, sort_keys=True, ensure_ascii=False,
+                     separators=(",", ":"))
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """
+    Disk-backed LRU cache with a byte-size cap and TTL.
+
+    Usage:
+        cache = ResponseCache(".cache/llm.sqlite3", max_bytes=256 * 2**20)
+        value = cache.get(key)
+        if value is None:
+            value = call_claude(...)
+            cache.put(key, value)
+    """
+
+    def __init__(self, path: str, max_bytes: int, ttl_seconds: int = None):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._conn = sqlite3.connect(path, check_same_thread=False,
+                                     isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            " key TEXT PRIMARY KEY,"
+            " value TEXT NOT NULL,"
+            " size INTEGER NOT NULL,"
+            " created REAL NOT NULL,"
+            " last_access REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_entries_last_access "
+            "ON entries (last_access)"
+        )
+        row = self._conn.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()
+        self._total_bytes = row[0]
+
+    def get(self, key: str):
+        """Return the cached value for `key`, or None on a miss."""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, size, created FROM entries WHERE key = ?",
+                (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+
+            value, size, created = row
+            if self.ttl_seconds and now - created > self.ttl_seconds:
+                self._conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+                self._total_bytes -= size
+                self.misses += 1
+                return None
+
+            self._conn.execute(
+                "UPDATE entries SET last_access = ? WHERE key = ?",
+                (now, key))
+            self.hits += 1
+            return value
+
+    def put(self, key: str, value: str):
+        """Store `value` under `key`, evicting LRU entries if over the cap."""
+        size = len(value.encode("utf-8"))
+        if size > self.max_bytes:
+            return
+
+        now = time.time()
+        with self._lock:
+            old = self._conn.execute(
+                "SELECT size FROM entries WHERE key = ?", (key,)).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO entries "
+                "(key, value, size, created, last_access) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (key, value, size, now, now))
+            self._total_bytes += size - (old[0] if old else 0)
+            if self._total_bytes > self.max_bytes:
+                self._evict()
+
+    def _evict(self):
+        """Drop least recently used entries until under the byte cap."""
+        rows = self._conn.execute(
+            "SELECT key, size FROM entries ORDER BY last_access ASC")
+        to_delete = []
+        for key, size in rows:
+            if self._total_bytes <= self.max_bytes:
+                break
+            to_delete.append((key,))
+            self._total_bytes -= size
+        self._conn.executemany("DELETE FROM entries WHERE key = ?", to_delete)
+        self.evictions += len(to_delete)
+
+    def delete(self, key: str):
+        """Remove a single entry (e.g. a response that failed validation)."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT size FROM entries WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return
+            self._conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+            self._total_bytes -= row[0]
+
+    def clear(self):
+        """Remove every cached entry."""
+        with self._lock:
+            self._conn.execute("DELETE FROM entries")
+            self._total_bytes = 0
+
+    def stats(self) -> dict:
+        """Return hit/miss counters and current size."""
+        with self._lock:
+            entries = self._conn.execute(
+                "SELECT COUNT(*) FROM entries").fetchone()[0]
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "evictions": self.evictions,
+            "entries": entries,
+            "bytes": self._total_bytes,
+            "max_bytes": self.max_bytes,
+        }
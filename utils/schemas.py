@@ -0,0 +1,351 @@
+"""
+utils/schemas.py
+
+JSON Schemas for the structured results the engines ask Claude for.
+
+structured_output(..., schema=...) hands the schema to Claude as a forced
+tool call, so the response is always well-formed JSON of the right shape,
+and then checks it locally with validate() before anything downstream
+uses it.
+
+Only the subset of JSON Schema these definitions need is supported:
+type, properties, required, items, enum, minimum, maximum.
+"""
+
+MATURITY_LEVELS = [
+    "Not Implemented",
+    "Minimally Implemented",
+    "Partially Implemented",
+    "Largely Implemented",
+    "Fully Implemented",
+]
+
+PRIORITIES = ["Critical", "High", "Medium", "Low"]
+
+RISK_LEVELS = ["Critical", "High", "Medium", "Low"]
+
+SEVERITIES = ["Critical", "High", "Medium", "Low", "Informational"]
+
+
+def list_of(item_schema: dict) -> dict:
+    """Schema for a JSON array of `item_schema` objects."""
+    return {"type": "array", "items": item_schema}
+
+
+def _rating(low: int, high: int) -> dict:
+    return {"type": "integer", "minimum": low, "maximum": high}
+
+
+# ────────────────────────────────────────────
+# Gap assessment
+# ────────────────────────────────────────────
+GAP_RESULT = {
+    "type": "object",
+    "description": "Assessment of one framework control",
+    "properties": {
+        "control_id": {"type": "string"},
+        "control_description": {"type": "string"},
+        "function": {"type": "string"},
+        "category": {"type": "string"},
+        "maturity": {"type": "string", "enum": MATURITY_LEVELS},
+        "score": _rating(1, 5),
+        "current_state_assessment": {"type": "string"},
+        "gap": {"type": "string"},
+        "recommendations": {"type": "string"},
+        "priority": {"type": "string", "enum": PRIORITIES},
+        "estimated_effort": {"type": "string"},
+    },
+    "required": ["control_id", "maturity", "score", "gap",
+                 "recommendations", "priority"],
+}
+
+GAP_RESULTS = list_of(GAP_RESULT)
+
+# Fast first pass: ratings only. The narrative fields are filled in later,
+# and only where they are needed (see GapAssessment.narrate).
+GAP_SCORE = {
+    "type": "object",
+    "description": "Rating of one framework control",
+    "properties": {
+        "control_id": {"type": "string"},
+        "maturity": {"type": "string", "enum": MATURITY_LEVELS},
+        "score": _rating(1, 5),
+        "priority": {"type": "string", "enum": PRIORITIES},
+        "estimated_effort": {"type": "string"},
+    },
+    "required": ["control_id", "maturity", "score", "priority",
+                 "estimated_effort"],
+}
+
+GAP_SCORES = list_of(GAP_SCORE)
+
+GAP_NARRATIVE = {
+    "type": "object",
+    "description": "Explanation of one control's rating",
+    "properties": {
+        "control_id": {"type": "string"},
+        "current_state_assessment": {"type": "string"},
+        "gap": {"type": "string"},
+        "recommendations": {"type": "string"},
+    },
+    "required": ["control_id", "current_state_assessment", "gap",
+                 "recommendations"],
+}
+
+GAP_NARRATIVES = list_of(GAP_NARRATIVE)
+
+# ────────────────────────────────────────────
+# Risk register
+# ────────────────────────────────────────────
+RISK_ENTRY = {
+    "type": "object",
+    "description": "One risk register entry",
+    "properties": {
+        "risk_id": {"type": "string"},
+        "risk_title": {"type": "string"},
+        "risk_description": {"type": "string"},
+        "risk_category": {"type": "string"},
+        "threat_source": {"type": "string"},
+        "vulnerability": {"type": "string"},
+        "impact_description": {"type": "string"},
+        "likelihood": _rating(1, 5),
+        "impact": _rating(1, 5),
+        "inherent_risk_score": _rating(1, 25),
+        "inherent_risk_level": {"type": "string", "enum": RISK_LEVELS},
+        "existing_controls": {"type": "string"},
+        "residual_likelihood": _rating(1, 5),
+        "residual_impact": _rating(1, 5),
+        "residual_risk_score": _rating(1, 25),
+        "residual_risk_level": {"type": "string", "enum": RISK_LEVELS},
+        "risk_treatment": {"type": "string",
+                           "enum": ["Mitigate", "Accept", "Transfer", "Avoid"]},
+        "treatment_plan": {"type": "string"},
+        "risk_owner": {"type": "string"},
+        "target_date": {"type": "string"},
+        "related_control_ids": {"type": "array", "items": {"type": "string"}},
+    },
+    "required": ["risk_id", "risk_title", "risk_description", "likelihood",
+                 "impact", "inherent_risk_score", "inherent_risk_level",
+                 "risk_treatment", "treatment_plan"],
+}
+
+RISK_ENTRIES = list_of(RISK_ENTRY)
+
+# ────────────────────────────────────────────
+# Evidence tracker
+# ────────────────────────────────────────────
+EVIDENCE_ITEM = {
+    "type": "object",
+    "description": "One evidence artifact an auditor will request",
+    "properties": {
+        "evidence_id": {"type": "string"},
+        "control_id": {"type": "string"},
+        "evidence_name": {"type": "string"},
+        "evidence_type": {"type": "string"},
+        "description": {"type": "string"},
+        "typical_source": {"type": "string"},
+        "frequency": {"type": "string"},
+        "priority": {"type": "string",
+                     "enum": ["Required", "Expected", "Nice-to-have"]},
+    },
+    "required": ["control_id", "evidence_name", "evidence_type",
+                 "description"],
+}
+
+EVIDENCE_ITEMS = list_of(EVIDENCE_ITEM)
+
+# ────────────────────────────────────────────
+# Document review
+# ────────────────────────────────────────────
+REVIEW_RESULT = {
+    "type": "object",
+    "description": "Review of a policy document against a framework",
+    "properties": {
+        "document_quality_assessment": {
+            "type": "object",
+            "properties": {
+                "overall_quality_score": _rating(1, 10),
+                "structure_and_organization": {"type": "string"},
+                "clarity_and_readability": {"type": "string"},
+                "completeness": {"type": "string"},
+            },
+            "required": ["overall_quality_score"],
+        },
+        "framework_alignment": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "control_id": {"type": "string"},
+                    "coverage": {"type": "string",
+                                 "enum": ["Full", "Partial", "None"]},
+                    "notes": {"type": "string"},
+                },
+                "required": ["control_id", "coverage"],
+            },
+        },
+        "content_gaps": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "topic": {"type": "string"},
+                    "description": {"type": "string"},
+                },
+                "required": ["topic", "description"],
+            },
+        },
+        "specific_findings": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "finding_id": {"type": "string"},
+                    "severity": {"type": "string", "enum": SEVERITIES},
+                    "section": {"type": "string"},
+                    "description": {"type": "string"},
+                    "recommendation": {"type": "string"},
+                    "framework_reference": {"type": "string"},
+                },
+                "required": ["finding_id", "severity", "description",
+                             "recommendation"],
+            },
+        },
+        "positive_observations": {"type": "array",
+                                  "items": {"type": "string"}},
+        "recommended_actions": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "action": {"type": "string"},
+                    "description": {"type": "string"},
+                    "priority": {"type": "string", "enum": PRIORITIES},
+                },
+                "required": ["action", "description"],
+            },
+        },
+    },
+    "required": ["document_quality_assessment", "content_gaps",
+                 "specific_findings", "recommended_actions"],
+}
+
+
+# ────────────────────────────────────────────
+# Framework files (frameworks/*.json, checked by build_frameworks.py)
+# ────────────────────────────────────────────
+FRAMEWORK_CONTROL = {
+    "type": "object",
+    "properties": {
+        "id": {"type": "string"},
+        "description": {"type": "string"},
+    },
+    "required": ["id", "description"],
+}
+
+FRAMEWORK_CATEGORY = {
+    "type": "object",
+    "properties": {
+        "id": {"type": "string"},
+        "name": {"type": "string"},
+        "subcategories": list_of(FRAMEWORK_CONTROL),
+    },
+    "required": ["id", "name", "subcategories"],
+}
+
+FRAMEWORK_FUNCTION = {
+    "type": "object",
+    "properties": {
+        "id": {"type": "string"},
+        "name": {"type": "string"},
+        "categories": list_of(FRAMEWORK_CATEGORY),
+    },
+    "required": ["id", "name", "categories"],
+}
+
+FRAMEWORK_FILE = {
+    "type": "object",
+    "properties": {
+        "framework": {"type": "string"},
+        "version": {"type": "string"},
+        "description": {"type": "string"},
+        "functions": list_of(FRAMEWORK_FUNCTION),
+    },
+    "required": ["framework", "functions"],
+}
+
+# ────────────────────────────────────────────
+# Validation
+# ────────────────────────────────────────────
+class SchemaValidationError(ValueError):
+    """Structured output did not match its schema."""
+
+    def __init__(self, errors: list, instance=None):
+        self.errors = errors
+        self.instance = instance
+        shown = "; ".join(errors[:5])
+        more = f" (+{len(errors) - 5} more)" if len(errors) > 5 else ""
+        super().__init__(f"Response does not match schema: {shown}{more}")
+
+
+_TYPES = {
+    "object": dict,
+    "array": list,
+    "string": str,
+    "number": (int, float),
+    "integer": int,
+    "boolean": bool,
+    "null": type(None),
+}
+
+
+def _type_ok(value, expected: str) -> bool:
+    # bool is a subclass of int, but true/false is not a number in JSON
+    if expected in ("integer", "number") and isinstance(value, bool):
+        return False
+    if expected == "integer" and isinstance(value, float):
+        return value.is_integer()
+    return isinstance(value, _TYPES[expected])
+
+
+def _validate(value, schema: dict, path: str, errors: list):
+    expected = schema.get("type")
+    if expected:
+        options = expected if isinstance(expected, list) else [expected]
+        if not any(_type_ok(value, t) for t in options):
+            errors.append(f"{path}: expected {' or '.join(options)}, "
+                          f"got {type(value).__name__}")
+            return
+
+    if "enum" in schema and value not in schema["enum"]:
+        errors.append(f"{path}: {value!r} is not one of {schema['enum']}")
+    if "minimum" in schema and value < schema["minimum"]:
+        errors.append(f"{path}: {value} is less than {schema['minimum']}")
+    if "maximum" in schema and value > schema["maximum"]:
+        errors.append(f"{path}: {value} is greater than {schema['maximum']}")
+
+    if isinstance(value, dict):
+        for key in schema.get("required", []):
+            if key not in value:
+                errors.append(f"{path}: missing required field '{key}'")
+        for key, sub_schema in schema.get("properties", {}).items():
+            if key in value:
+                _validate(value[key], sub_schema, f"{path}.{key}", errors)
+    elif isinstance(value, list) and "items" in schema:
+        for i, item in enumerate(value):
+            _validate(item, schema["items"], f"{path}[{i}]", errors)
+
+
+def schema_errors(instance, schema: dict) -> list:
+    """Return a list of human-readable validation errors (empty if valid)."""
+    errors = []
+    _validate(instance, schema, "$", errors)
+    return errors
+
+
+def validate(instance, schema: dict):
+    """Raise SchemaValidationError if `instance` does not match `schema`."""
+    errors = schema_errors(instance, schema)
+    if errors:
+        raise SchemaValidationError(errors, instance)
+    return instance
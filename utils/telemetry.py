@@ -0,0 +1,318 @@
+"""
+utils/telemetry.py
+
+Per-call LLM telemetry: where the time and money in a run go.
+
+ai_client emits one record per call (including response-cache hits and
+failed calls) with:
+    caller            engine method that made the call, e.g.
+                      "GapAssessment._evaluate_category"
+    backend, model, kind ("chat" / "structured" / "stream")
+    wall_seconds      start of the call to the complete answer, including
+                      time spent queued on the rate limiter / concurrency gate
+    wait_seconds      the queued part of wall_seconds
+    ttft_seconds      start of the call to the first token
+    input_tokens, output_tokens, cache_read_input_tokens,
+    cache_creation_input_tokens, cost_usd
+    stop_reason, retries, response_cache_hit, error
+
+Records go to every configured sink (config.TELEMETRY_SINKS):
+- MemorySink: always on; feeds run_summary()
+- JSONLSink: appends each record to a file for offline analysis
+- PrometheusTextfileSink: per-caller counters in node_exporter textfile
+  format, rewritten after every call
+"""
+
+import collections
+import json
+import os
+import sys
+import threading
+import time
+from datetime import datetime
+
+import config
+
+# Frames from these modules are plumbing, not the caller we want to report
+_PLUMBING = ("utils.ai_client", "utils.batch_client", "utils.telemetry",
+             "utils.llm_backends", "asyncio", "concurrent", "threading",
+             "contextlib", "queue")
+
+
+def caller_label(skip: int = 1) -> str:
+    """
+    Name the first stack frame outside the LLM plumbing, as
+    "ClassName.method" for methods or "module.function" otherwise.
+    """
+    frame = sys._getframe(skip)
+    while frame is not None:
+        module = frame.f_globals.get("__name__", "")
+        if not module.startswith(_PLUMBING):
+            name = frame.f_code.co_name
+            owner = frame.f_locals.get("self")
+            if owner is not None:
+                return f"{type(owner).__name__}.{name}"
+            if module == "__main__":
+                module = os.path.splitext(
+                    os.path.basename(frame.f_code.co_filename))[0]
+            return f"{module.rsplit('.', 1)[-1]}.{name}"
+        frame = frame.f_back
+    return "unknown"
+
+
+def estimate_cost(model: str, usage: dict) -> float:
+    """USD cost of one call from config.LLM_PRICES (0.0 if unknown)."""
+    prices = None
+    for prefix, table in config.LLM_PRICES.items():
+        if model and model.startswith(prefix):
+            prices = table
+            break
+    if prices is None:
+        return 0.0
+    return (usage.get("input_tokens", 0) * prices["input"]
+            + usage.get("output_tokens", 0) * prices["output"]
+            + usage.get("cache_creation_input_tokens", 0) * prices["cache_write"]
+            + usage.get("cache_read_input_tokens", 0) * prices["cache_read"]
+            ) / 1_000_000
+
+
+def _percentile(values: list, pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+# ────────────────────────────────────────────
+# Sinks
+# ────────────────────────────────────────────
+class MemorySink:
+    """Keeps the most recent records in memory for run summaries."""
+
+    def __init__(self, max_records: int = 100_000):
+        self.records = collections.deque(maxlen=max_records)
+        self._lock = threading.Lock()
+
+    def write(self, record: dict):
+        with self._lock:
+            self.records.append(record)
+
+    def snapshot(self) -> list:
+        with self._lock:
+            return list(self.records)
+
+    def clear(self):
+        with self._lock:
+            self.records.clear()
+
+
+class JSONLSink:
+    """Appends one JSON line per call."""
+
+    def __init__(self, path: str = None):
+        self.path = path or config.TELEMETRY_JSONL_PATH
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+
+    def write(self, record: dict):
+        line = json.dumps(record) + "\n"
+        with self._lock:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line)
+
+
+class PrometheusTextfileSink:
+    """
+    Per-caller counters for node_exporter's textfile collector.
+
+    The file is rewritten atomically after every call, so a scrape never
+    sees a half-written file.
+    """
+
+    _TOKEN_KINDS = ("input_tokens", "output_tokens", "cache_read_input_tokens",
+                    "cache_creation_input_tokens")
+
+    def __init__(self, path: str = None):
+        self.path = path or config.TELEMETRY_PROMETHEUS_PATH
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._counters = collections.defaultdict(float)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _labels(**labels) -> str:
+        def _escape(value) -> str:
+            return str(value).replace("\\", "\\\\").replace('"', '\\"')
+        inner = ",".join(f'{k}="{_escape(v)}"' for k, v in labels.items())
+        return "{" + inner + "}"
+
+    def write(self, record: dict):
+        caller = record["caller"]
+        status = "error" if record.get("error") else (
+            "cache_hit" if record.get("response_cache_hit") else "ok")
+        with self._lock:
+            c = self._counters
+            c[("grc_llm_calls_total", self._labels(
+                caller=caller, backend=record["backend"], status=status))] += 1
+            c[("grc_llm_call_seconds_total",
+               self._labels(caller=caller))] += record["wall_seconds"]
+            c[("grc_llm_retries_total",
+               self._labels(caller=caller))] += record["retries"]
+            c[("grc_llm_cost_usd_total",
+               self._labels(caller=caller))] += record["cost_usd"]
+            for kind in self._TOKEN_KINDS:
+                c[("grc_llm_tokens_total", self._labels(
+                    caller=caller, kind=kind))] += record.get(kind, 0)
+            self._flush()
+
+    def _flush(self):
+        lines = []
+        current = None
+        for (metric, labels), value in sorted(self._counters.items()):
+            if metric != current:
+                lines.append(f"# TYPE {metric} counter")
+                current = metric
+            lines.append(f"{metric}{labels} {value:g}")
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+        os.replace(tmp, self.path)
+
+
+SINKS = {
+    "jsonl": JSONLSink,
+    "prometheus": PrometheusTextfileSink,
+}
+
+
+# ────────────────────────────────────────────
+# Hub
+# ────────────────────────────────────────────
+class Telemetry:
+    """Fans records out to the sinks and summarizes the current run."""
+
+    def __init__(self, sinks: list = None):
+        self.memory = MemorySink()
+        self.sinks = [self.memory] + list(sinks or [])
+        self.started = time.time()
+        self._failed_sinks = set()
+
+    def add_sink(self, sink):
+        self.sinks.append(sink)
+
+    def record(self, record: dict):
+        record.setdefault("timestamp", datetime.now().isoformat())
+        for sink in self.sinks:
+            try:
+                sink.write(record)
+            except Exception as e:
+                # Telemetry must never break a run; warn once per sink
+                if id(sink) not in self._failed_sinks:
+                    self._failed_sinks.add(id(sink))
+                    print(f"[WARN] Telemetry sink {type(sink).__name__} "
+                          f"failed: {e}")
+
+    def reset(self):
+        """Start a new run: clear the in-memory records."""
+        self.memory.clear()
+        self.started = time.time()
+
+    def summary(self) -> dict:
+        """Totals for the run plus a per-caller breakdown, slowest first."""
+        records = self.memory.snapshot()
+        by_caller = collections.OrderedDict()
+        for r in records:
+            by_caller.setdefault(r["caller"], []).append(r)
+
+        def _stats(rows: list) -> dict:
+            walls = [r["wall_seconds"] for r in rows]
+            live = [r for r in rows if not r.get("response_cache_hit")]
+            ttfts = [r["ttft_seconds"] for r in live
+                     if r.get("ttft_seconds") is not None]
+            return {
+                "calls": len(rows),
+                "errors": sum(1 for r in rows if r.get("error")),
+                "retries": sum(r["retries"] for r in rows),
+                "cache_hits": len(rows) - len(live),
+                "wall_seconds": round(sum(walls), 3),
+                "mean_seconds": round(sum(walls) / len(walls), 3) if walls else 0.0,
+                "p95_seconds": round(_percentile(walls, 95), 3),
+                "wait_seconds": round(sum(r["wait_seconds"] for r in rows), 3),
+                "mean_ttft_seconds": (round(sum(ttfts) / len(ttfts), 3)
+                                      if ttfts else None),
+                "input_tokens": sum(r["input_tokens"] for r in rows),
+                "output_tokens": sum(r["output_tokens"] for r in rows),
+                "cache_read_input_tokens":
+                    sum(r["cache_read_input_tokens"] for r in rows),
+                "cache_creation_input_tokens":
+                    sum(r["cache_creation_input_tokens"] for r in rows),
+                "cost_usd": round(sum(r["cost_usd"] for r in rows), 4),
+            }
+
+        callers = []
+        for caller, rows in by_caller.items():
+            stats = _stats(rows)
+            stats["caller"] = caller
+            callers.append(stats)
+        callers.sort(key=lambda s: s["wall_seconds"], reverse=True)
+
+        totals = _stats(records)
+        totals["run_seconds"] = round(time.time() - self.started, 1)
+        return {"totals": totals, "by_caller": callers}
+
+
+def format_summary(summary: dict, top: int = 10) -> str:
+    """Render run_summary() as a plain-text table for the CLI."""
+    t = summary["totals"]
+    if not t["calls"]:
+        return "  No LLM calls in this run."
+    lines = [
+        f"  {t['calls']} LLM calls ({t['cache_hits']} cached, "
+        f"{t['errors']} failed, {t['retries']} retries) — "
+        f"{t['wall_seconds']:.1f}s call time, "
+        f"{t['input_tokens'] + t['cache_read_input_tokens'] + t['cache_creation_input_tokens']:,} in / "
+        f"{t['output_tokens']:,} out tokens, ${t['cost_usd']:.2f}",
+        "",
+        f"  {'Caller':<42}{'Calls':>6}{'Total s':>9}{'p95 s':>8}"
+        f"{'Out tok':>9}{'Cost $':>8}",
+    ]
+    for s in summary["by_caller"][:top]:
+        lines.append(f"  {s['caller'][:41]:<42}{s['calls']:>6}"
+                     f"{s['wall_seconds']:>9.1f}{s['p95_seconds']:>8.1f}"
+                     f"{s['output_tokens']:>9,}{s['cost_usd']:>8.2f}")
+    return "\n".join(lines)
+
+
+_telemetry = None
+_telemetry_lock = threading.Lock()
+
+
+def get_telemetry() -> Telemetry:
+    """Return the process-wide Telemetry configured from config.py."""
+    global _telemetry
+    with _telemetry_lock:
+        if _telemetry is None:
+            names = [n.strip() for n in config.TELEMETRY_SINKS.split(",")
+                     if n.strip() and n.strip() != "memory"]
+            sinks = []
+            for name in names:
+                if name not in SINKS:
+                    print(f"[WARN] Unknown telemetry sink ignored: {name}")
+                    continue
+                sinks.append(SINKS[name]())
+            _telemetry = Telemetry(sinks)
+    return _telemetry
+
+
+def run_summary() -> dict:
+    """Per-run LLM summary (totals + slowest/most expensive callers)."""
+    return get_telemetry().summary()
+
+
+def reset_run():
+    """Clear the in-memory records to start a new run summary."""
+    get_telemetry().reset()
@@ -0,0 +1,278 @@
+"""
+utils/text_router.py
+
+Route the paragraphs of a long free-text description to the framework
+categories they are about, locally and without any API call.
+
+The web app's bulk mode used to send the client's whole description to
+every category, so prompt size grew as categories × description length.
+With the router each category only receives the paragraphs relevant to it.
+
+HOW IT WORKS:
+1. split_paragraphs() cuts the text at blank lines and bullet points
+2. Each category gets a keyword profile built from its name, its
+   function's name and its control descriptions, expanded with a small
+   lexicon of common security tools and acronyms ("Okta" → identity,
+   authentication, access)
+3. Paragraphs and profiles are compared with TF-IDF cosine similarity.
+   A paragraph goes to the categories scoring close to its best match
+4. Paragraphs that match nothing, or match most categories, form the
+   "general" slice that every category receives
+5. A category nothing was routed to still gets its best-matching
+   paragraphs, so no category is assessed on an empty description
+"""
+
+import math
+import re
+
+_STOPWORDS = set("""
+a about above after all also an and any are as at be been being both but by
+can could do does doing each for from further had has have having how if in
+into is it its itself just more most no nor not of on once only or other our
+ours out over own same should so some such than that the their theirs them
+then there these they this those through to too under until up very was we
+were what when where which while who whom why will with would you your
+organization organizations organizational including include includes
+ensure ensures managed management established maintained
+""".split())
+
+# Tools and acronyms clients write that control descriptions never mention
+TOOL_LEXICON = {
+    "okta": "identity authentication access credentials",
+    "azure ad": "identity authentication access",
+    "entra": "identity authentication access",
+    "active directory": "identity accounts access",
+    "sso": "identity authentication access",
+    "mfa": "multifactor authentication access identity",
+    "2fa": "multifactor authentication access",
+    "pam": "privileged access accounts",
+    "cyberark": "privileged access accounts credentials",
+    "crowdstrike": "malware endpoint detection",
+    "sentinelone": "malware endpoint detection",
+    "defender": "malware endpoint detection",
+    "edr": "endpoint malware detection",
+    "antivirus": "malware endpoint",
+    "xdr": "detection monitoring endpoint",
+    "siem": "monitoring logs events detection analysis",
+    "splunk": "monitoring logs events",
+    "sentinel": "monitoring logs events",
+    "soc": "monitoring detection incident",
+    "firewall": "network boundary protection",
+    "firewalls": "network boundary protection",
+    "palo alto": "network boundary protection",
+    "vlan": "network segmentation",
+    "vlans": "network segmentation",
+    "vpn": "network remote access",
+    "zero trust": "network access identity",
+    "dlp": "data loss leakage protection",
+    "aes": "encryption data protection",
+    "tls": "encryption transmission data",
+    "kms": "encryption keys cryptographic",
+    "backup": "backups recovery data",
+    "backups": "backups recovery data",
+    "bcp": "continuity recovery resilience",
+    "dr": "recovery continuity resilience",
+    "rto": "recovery continuity",
+    "rpo": "recovery continuity backups",
+    "pentest": "vulnerability testing assessment",
+    "penetration": "vulnerability testing assessment",
+    "nessus": "vulnerability scanning",
+    "qualys": "vulnerability scanning",
+    "tenable": "vulnerability scanning",
+    "patching": "vulnerability patch updates",
+    "cmdb": "asset inventory",
+    "intune": "endpoint configuration devices",
+    "mdm": "devices endpoint configuration",
+    "ir": "incident response",
+    "tabletop": "incident response exercises testing",
+    "phishing": "awareness training",
+    "knowbe4": "awareness training",
+    "badge": "physical access facility",
+    "cctv": "physical monitoring facility",
+    "cameras": "physical monitoring facility",
+    "visitor": "physical access facility",
+    "vendor": "supplier third party supply chain",
+    "vendors": "supplier third party supply chain",
+    "sdlc": "development software secure",
+    "ci": "development software change",
+    "iso": "governance policy certification",
+    "ciso": "governance roles responsibilities leadership",
+    "board": "governance oversight leadership",
+}
+
+_BULLET = re.compile(r"^\s*(?:[-*•·▪‣◦]|\d+[.)]|[a-z][.)])\s+")
+_WORD = re.compile(r"[a-z0-9]+")
+
+
+def split_paragraphs(text: str) -> list:
+    """Split text into paragraphs at blank lines and bullet points."""
+    paragraphs = []
+    current = []
+    for line in (text or "").splitlines():
+        if not line.strip():
+            if current:
+                paragraphs.append(" ".join(current))
+                current = []
+            continue
+        if _BULLET.match(line) and current:
+            paragraphs.append(" ".join(current))
+            current = []
+        current.append(_BULLET.sub("", line).strip())
+    if current:
+        paragraphs.append(" ".join(current))
+    return [p for p in paragraphs if p]
+
+
+def _stem(word: str) -> str:
+    # Just enough stemming to match "monitoring"/"monitored"/"monitors"
+    for suffix in ("ations", "ation", "ments", "ment", "ities", "ity",
+                   "ing", "ies", "ed", "es", "s"):
+        if word.endswith(suffix) and len(word) - len(suffix) >= 4:
+            return word[:-len(suffix)]
+    return word
+
+
+def tokenize(text: str, expand: bool = False) -> list:
+    """Lowercase, drop stopwords and stem; optionally expand tool names."""
+    lowered = (text or "").lower()
+    words = _WORD.findall(lowered)
+    if expand:
+        padded = f" {' '.join(words)} "
+        for term, meaning in TOOL_LEXICON.items():
+            if f" {term} " in padded:
+                words.extend(meaning.split())
+    return [_stem(w) for w in words if w not in _STOPWORDS and len(w) > 1]
+
+
+class TextRouter:
+    """
+    TF-IDF router from paragraphs to categories.
+
+    Usage:
+        router = TextRouter({"PR.AA": "Identity Management ... MFA ...",
+                             "DE.CM": "Continuous Monitoring ..."})
+        slices = router.route(bulk_text)   # category_id -> text
+    """
+
+    def __init__(self, profiles: dict, min_score: float = 0.05,
+                 relative: float = 0.6, general_share: float = 0.5,
+                 fallback: int = 2):
+        """
+        Parameters:
+        -----------
+        profiles : dict
+            category_id -> text describing the category (name, control
+            descriptions, ...).
+
+        min_score : float
+            Paragraphs whose best similarity is below this are general.
+
+        relative : float
+            A paragraph also goes to every category scoring at least this
+            fraction of its best score.
+
+        general_share : float
+            Paragraphs matching more than this share of categories are
+            general.
+
+        fallback : int
+            Best-matching paragraphs given to a category nothing was
+            routed to.
+        """
+        self.min_score = min_score
+        self.relative = relative
+        self.general_share = general_share
+        self.fallback = fallback
+
+        docs = {cat_id: tokenize(text) for cat_id, text in profiles.items()}
+        n_docs = len(docs)
+        df = {}
+        for tokens in docs.values():
+            for term in set(tokens):
+                df[term] = df.get(term, 0) + 1
+        self.idf = {term: math.log((1 + n_docs) / (1 + count)) + 1
+                    for term, count in df.items()}
+        self.vectors = {cat_id: self._vector(tokens)
+                        for cat_id, tokens in docs.items()}
+
+    def _vector(self, tokens: list) -> dict:
+        counts = {}
+        for term in tokens:
+            if term in self.idf:
+                counts[term] = counts.get(term, 0) + 1
+        vector = {term: (1 + math.log(c)) * self.idf[term]
+                  for term, c in counts.items()}
+        norm = math.sqrt(sum(v * v for v in vector.values()))
+        return {term: v / norm for term, v in vector.items()} if norm else {}
+
+    def scores(self, paragraph: str) -> dict:
+        """Cosine similarity of a paragraph to every category."""
+        vector = self._vector(tokenize(paragraph, expand=True))
+        return {
+            cat_id: sum(w * cat_vector.get(term, 0.0)
+                        for term, w in vector.items())
+            for cat_id, cat_vector in self.vectors.items()
+        }
+
+    def route(self, text: str) -> dict:
+        """
+        Split `text` and give each category its relevant paragraphs plus
+        the general ones, in their original order.
+
+        Returns:
+        --------
+        dict : category_id -> text (empty string if the description has
+               no paragraphs at all).
+        """
+        paragraphs = split_paragraphs(text)
+        routed = {cat_id: set() for cat_id in self.vectors}
+        general = set()
+        all_scores = []
+
+        for index, paragraph in enumerate(paragraphs):
+            scores = self.scores(paragraph)
+            all_scores.append(scores)
+            best = max(scores.values(), default=0.0)
+            if best < self.min_score:
+                general.add(index)
+                continue
+            matches = [cat_id for cat_id, score in scores.items()
+                       if score >= best * self.relative]
+            if len(matches) > self.general_share * len(scores):
+                general.add(index)
+                continue
+            for cat_id in matches:
+                routed[cat_id].add(index)
+
+        for cat_id, chosen in routed.items():
+            if chosen or general:
+                continue
+            ranked = sorted(range(len(paragraphs)),
+                            key=lambda i: all_scores[i][cat_id], reverse=True)
+            chosen.update(i for i in ranked[:self.fallback]
+                          if all_scores[i][cat_id] > 0)
+
+        self.last_stats = {
+            "paragraphs": len(paragraphs),
+            "general": len(general),
+            "avg_per_category": (
+                sum(len(c) for c in routed.values()) / len(routed)
+                if routed else 0),
+        }
+        return {
+            cat_id: "\n\n".join(paragraphs[i]
+                                for i in sorted(chosen | general))
+            for cat_id, chosen in routed.items()
+        }
+
+
+def category_profiles(categories: dict) -> dict:
+    """
+    Router profiles from GapAssessment-style category data
+    (category_id -> {"function", "category", "controls": [...]}).
+    """
+    return {
+        cat_id: " ".join([cat["function"], cat["category"], cat["category"]]
+                         + [c["description"] for c in cat["controls"]])
+        for cat_id, cat in categories.items()
+    }
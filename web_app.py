@@ -17,6 +17,7 @@ import streamlit as st
 import json
 import os
 import io
+import time
 import pandas as pd
 from datetime import datetime, timedelta
 
@@ -35,7 +36,9 @@ from engines.document_reviewer import DocumentReviewer
 from engines.evidence_tracker import EvidenceTracker
 from engines.audit_readiness import AuditReadinessAssessor
 from engines.control_mapper import ControlMapper
-from utils.framework_loader import load_framework, get_all_controls
+from utils.telemetry import run_summary, reset_run
+from utils.framework_loader import get_framework, get_registry
+from utils.control_search import search_controls
 from utils.document_exporter import (
     export_gap_assessment_xlsx,
     export_risk_register_xlsx,
@@ -87,6 +90,16 @@ st.markdown("""
 # ============================================================
 def get_framework_categories(framework: str) -> dict:
     """Return major assessment domains for a given framework."""
+    # Frameworks with a control file: one domain per function, from the
+    # indexed framework (parsed once per process)
+    indexed = get_framework(framework)
+    if indexed.functions:
+        return {
+            function_id: f"{function['name']} — " + ", ".join(
+                cat["category"] for cat in indexed.categories_of(function_id))
+            for function_id, function in indexed.functions.items()
+        }
+
     catalog = {
         "NIST CSF 2.0": {
             "GV": "Govern — Organizational Context, Risk Strategy, Oversight, Cybersecurity Supply Chain",
@@ -159,6 +172,34 @@ def get_framework_categories(framework: str) -> dict:
     })
 
 
+# ============================================================
+# HELPER: STREAM GENERATED TEXT INTO THE PAGE
+# ============================================================
+class StreamingMarkdown:
+    """
+    on_token callback that renders streamed text into an st.empty()
+    placeholder as it arrives. Redraws are throttled because re-rendering
+    a long markdown document on every token is slower than the model.
+    """
+
+    def __init__(self, placeholder=None, interval: float = 0.1):
+        self.placeholder = placeholder or st.empty()
+        self.interval = interval
+        self.text = ""
+        self._last_draw = 0.0
+
+    def __call__(self, delta: str):
+        self.text += delta
+        now = time.monotonic()
+        if now - self._last_draw >= self.interval:
+            self.placeholder.markdown(self.text + "▌")
+            self._last_draw = now
+
+    def clear(self):
+        """Remove the live preview once the final result is displayed."""
+        self.placeholder.empty()
+
+
 # ============================================================
 # HELPER: DISPLAY GAP ASSESSMENT RESULTS
 # ============================================================
@@ -280,6 +321,28 @@ def display_gap_results(results: list, assessment_obj=None):
             "gap", "recommendations", "priority", "estimated_effort"
         ] if c in df.columns]
         st.dataframe(df[show_cols], use_container_width=True, height=500)
+
+        # --- Control details (narrative written on demand) ---
+        selected = st.selectbox(
+            "🔎 Control details", [r.get("control_id", "N/A") for r in filtered],
+            key="tbl_detail")
+        item = next(r for r in filtered if r.get("control_id") == selected)
+        with st.expander(f"{selected} — {item.get('control_description', '')}",
+                         expanded=True):
+            st.markdown(f"**Maturity:** {item.get('maturity', 'N/A')} "
+                        f"({item.get('score', '?')}/5) · "
+                        f"**Priority:** {item.get('priority', 'N/A')} · "
+                        f"**Effort:** {item.get('estimated_effort', 'N/A')}")
+            if item.get("narrative_pending") and assessment_obj:
+                if st.button("✍️ Write detailed findings", key="btn_narrate"):
+                    with st.spinner(f"Writing findings for {selected}..."):
+                        assessment_obj.narrate([selected])
+            if item.get("narrative_pending"):
+                st.caption("Detailed findings not written yet for this control.")
+            else:
+                st.markdown(f"**Current state:** {item.get('current_state_assessment', '')}")
+                st.markdown(f"**Gap:** {item.get('gap', '')}")
+                st.markdown(f"**Recommendations:** {item.get('recommendations', '')}")
     else:
         st.info("No results match current filters.")
 
@@ -402,6 +465,35 @@ def render_sidebar() -> tuple:
     return company, framework
 
 
+def render_llm_usage():
+    """Sidebar summary of LLM calls made by this server process."""
+    summary = run_summary()
+    totals = summary["totals"]
+
+    st.sidebar.divider()
+    st.sidebar.header("📈 LLM Usage")
+    if not totals["calls"]:
+        st.sidebar.caption("No LLM calls yet.")
+        return
+
+    c1, c2 = st.sidebar.columns(2)
+    c1.metric("Calls", totals["calls"])
+    c2.metric("Est. Cost", f"${totals['cost_usd']:.2f}")
+    c1.metric("Call Time", f"{totals['wall_seconds']:.0f}s")
+    c2.metric("Cache Hits", totals["cache_hits"])
+
+    with st.sidebar.expander("Slowest stages"):
+        df = pd.DataFrame(summary["by_caller"])[[
+            "caller", "calls", "wall_seconds", "p95_seconds",
+            "output_tokens", "cost_usd", "retries", "errors",
+        ]]
+        st.dataframe(df, hide_index=True, use_container_width=True)
+
+    if st.sidebar.button("Reset usage", key="reset_llm_usage"):
+        reset_run()
+        st.rerun()
+
+
 # ============================================================
 # TAB 1 — GAP ASSESSMENT
 # ============================================================
@@ -451,57 +543,45 @@ def render_tab_gap_assessment(company: dict, framework: str):
 
             try:
                 assessment = GapAssessment(company, framework)
-
-                # Load framework controls grouped by category
-                fw_data = load_framework(framework)
-                controls = get_all_controls(fw_data)
-                cat_controls = {}
-                for ctrl in controls:
-                    ck = ctrl["category_id"]
-                    if ck not in cat_controls:
-                        cat_controls[ck] = {
-                            "function": ctrl["function"],
-                            "function_id": ctrl["function_id"],
-                            "category": ctrl["category"],
-                            "category_id": ctrl["category_id"],
-                            "controls": [],
-                        }
-                    cat_controls[ck]["controls"].append(ctrl)
-
-                all_results = []
                 total = len(filled)
-                for idx, (cat_id, state_text) in enumerate(filled.items()):
-                    status.text(f"Assessing {cat_id}...")
-                    progress.progress((idx) / total,
-                                       text=f"Assessing {cat_id} "
-                                            f"({idx+1}/{total})...")
-
-                    if cat_id in cat_controls:
-                        res = assessment._evaluate_category(
-                            cat_controls[cat_id], state_text
-                        )
-                        all_results.extend(res)
-                    else:
-                        # If no matching controls in JSON, use AI knowledge
-                        dummy_cat = {
-                            "function": cat_id,
-                            "function_id": cat_id,
-                            "category": categories[cat_id],
-                            "category_id": cat_id,
-                            "controls": [{
-                                "control_id": f"{cat_id}-GEN",
-                                "description": categories[cat_id],
-                            }],
-                        }
-                        res = assessment._evaluate_category(
-                            dummy_cat, state_text
-                        )
-                        all_results.extend(res)
+                status.text(f"Assessing {total} domains in parallel...")
+
+                def _on_progress(event):
+                    progress.progress(
+                        event["completed"] / event["total"],
+                        text=f"Assessed {event['category_id']} "
+                             f"({event['completed']}/{event['total']})...")
+
+                # Domains without matching controls in the framework file
+                # are assessed from Claude's own knowledge of the area.
+                # Ratings come first; the narrative follows for the gaps.
+                all_results = assessment.run_assessment(
+                    filled, labels=categories, on_progress=_on_progress,
+                    detail="scores")
+
+                preview = st.container()
+                with preview:
+                    scored = [r for r in all_results if r.get("score")]
+                    st.caption(
+                        f"Rated {len(all_results)} controls — average "
+                        f"{sum(r['score'] for r in scored) / max(len(scored), 1):.1f} / 5. "
+                        f"Writing detailed findings for the gaps...")
+                    st.dataframe(pd.DataFrame(all_results)[[
+                        "control_id", "category", "maturity", "score",
+                        "priority"]], use_container_width=True, height=300)
+
+                def _on_narrative(event):
+                    progress.progress(
+                        event["completed"] / event["total"],
+                        text=f"Writing findings for {event['category_id']} "
+                             f"({event['completed']}/{event['total']})...")
+
+                assessment.narrate(on_progress=_on_narrative)
+                preview.empty()
 
                 progress.progress(1.0, text="✅ Assessment complete!")
                 status.empty()
 
-                assessment.results = all_results
                 st.session_state.gap_results = all_results
                 st.session_state.gap_assessment = assessment
 
@@ -544,8 +624,10 @@ def render_tab_gap_assessment(company: dict, framework: str):
                 try:
                     assessment = GapAssessment(company, framework)
                     cats = get_framework_categories(framework)
-                    state_map = {cat_id: bulk for cat_id in cats}
-                    results = assessment.run_bulk_assessment(state_map)
+                    # Each category gets only the paragraphs about it
+                    state_map = assessment.route_bulk_text(bulk, labels=cats)
+                    results = assessment.run_bulk_assessment(state_map,
+                                                             labels=cats)
 
                     st.session_state.gap_results = results
                     st.session_state.gap_assessment = assessment
@@ -624,18 +706,21 @@ def render_tab_policy_generator(company: dict, framework: str):
                 st.error("Please select or enter a policy type.")
                 return
             fw = framework if align_fw == "Auto-detect" else align_fw
-            with st.spinner(f"Generating {policy_type}..."):
-                try:
-                    content = gen.generate_policy(
-                        policy_type,
-                        framework=fw,
-                        additional_context=context,
-                        custom_requirements=custom_reqs,
-                    )
-                    st.session_state.gen_policy = content
-                    st.session_state.gen_policy_name = policy_type
-                except Exception as e:
-                    st.error(f"Generation failed: {e}")
+            st.caption(f"Generating {policy_type}...")
+            live = StreamingMarkdown()
+            try:
+                content = gen.generate_policy(
+                    policy_type,
+                    framework=fw,
+                    additional_context=context,
+                    custom_requirements=custom_reqs,
+                    on_token=live,
+                )
+                st.session_state.gen_policy = content
+                st.session_state.gen_policy_name = policy_type
+            except Exception as e:
+                st.error(f"Generation failed: {e}")
+            live.clear()
 
         if "gen_policy" in st.session_state:
             st.divider()
@@ -692,17 +777,20 @@ def render_tab_policy_generator(company: dict, framework: str):
             if not proc_name:
                 st.error("Please enter a procedure name.")
                 return
-            with st.spinner(f"Generating: {proc_name}..."):
-                try:
-                    content = gen.generate_procedure(
-                        proc_name,
-                        related_policy=related_pol,
-                        additional_context=proc_ctx,
-                    )
-                    st.session_state.gen_procedure = content
-                    st.session_state.gen_procedure_name = proc_name
-                except Exception as e:
-                    st.error(f"Generation failed: {e}")
+            st.caption(f"Generating: {proc_name}...")
+            live = StreamingMarkdown()
+            try:
+                content = gen.generate_procedure(
+                    proc_name,
+                    related_policy=related_pol,
+                    additional_context=proc_ctx,
+                    on_token=live,
+                )
+                st.session_state.gen_procedure = content
+                st.session_state.gen_procedure_name = proc_name
+            except Exception as e:
+                st.error(f"Generation failed: {e}")
+            live.clear()
 
         if "gen_procedure" in st.session_state:
             st.divider()
@@ -896,101 +984,63 @@ def render_tab_document_review(company: dict, framework: str):
 
             review_data = st.session_state.fw_review
 
-            if isinstance(review_data, dict) and review_data.get("format") != "text":
-                # Structured JSON response
-                # Quality score
-                quality = review_data.get("document_quality_assessment",
-                                           review_data.get("quality_assessment", {}))
-                if isinstance(quality, dict):
-                    score = quality.get("overall_quality_score",
-                                        quality.get("score", "N/A"))
-                    q1, q2, q3 = st.columns(3)
-                    q1.metric("Overall Quality Score", f"{score}/10")
-                    q2.metric("Framework", review_data.get("framework", ""))
-                    q3.metric("Review Date",
-                              review_data.get("review_date", "")[:10])
-
-                # Findings
-                findings = review_data.get("specific_findings",
-                                            review_data.get("findings", []))
-                if findings and isinstance(findings, list):
-                    st.subheader("🔎 Specific Findings")
-                    for f in findings:
-                        sev = f.get("severity", "Info")
-                        icon = {"Critical": "🔴", "High": "🟠",
-                                "Medium": "🟡", "Low": "🟢",
-                                "Informational": "ℹ️"}.get(sev, "⬜")
-                        with st.expander(
-                            f"{icon} [{sev}] "
-                            f"{f.get('finding_id', '')}: "
-                            f"{f.get('section', f.get('area', 'General'))}",
-                            expanded=(sev in ["Critical", "High"])
-                        ):
-                            st.write(f"**Issue:** {f.get('description', '')}")
-                            st.write(f"**Recommendation:** "
-                                     f"{f.get('recommendation', '')}")
-                            ref = f.get("reference", f.get("framework_reference", ""))
-                            if ref:
-                                st.write(f"**Framework Reference:** {ref}")
-
-                # Gaps
-                gaps = review_data.get("content_gaps",
-                                        review_data.get("gaps", []))
-                if gaps:
-                    st.subheader("🕳️ Content Gaps")
-                    if isinstance(gaps, list):
-                        for g in gaps:
-                            if isinstance(g, dict):
-                                st.write(f"- **{g.get('topic', 'Gap')}**: "
-                                         f"{g.get('description', str(g))}")
-                            else:
-                                st.write(f"- {g}")
-                    elif isinstance(gaps, dict):
-                        for k, v in gaps.items():
-                            st.write(f"- **{k}**: {v}")
-
-                # Positive observations
-                positives = review_data.get("positive_observations",
-                                             review_data.get("strengths", []))
-                if positives:
-                    st.subheader("✅ Positive Observations")
-                    if isinstance(positives, list):
-                        for p in positives:
-                            st.write(f"- {p if isinstance(p, str) else p.get('observation', str(p))}")
-
-                # Recommended actions
-                actions = review_data.get("recommended_actions",
-                                           review_data.get("recommendations", []))
-                if actions:
-                    st.subheader("📋 Recommended Actions")
-                    if isinstance(actions, list):
-                        for idx, a in enumerate(actions, 1):
-                            if isinstance(a, dict):
-                                st.write(f"{idx}. **{a.get('action', a.get('title', ''))}** "
-                                         f"— {a.get('description', a.get('detail', ''))}")
-                            else:
-                                st.write(f"{idx}. {a}")
-
-                # Download full review
-                st.download_button(
-                    "📥 Download Full Review (JSON)",
-                    json.dumps(review_data, indent=2),
-                    file_name=f"review_{st.session_state.fw_review_doc}.json",
-                    mime="application/json", key="dl_fw_review"
-                )
-
-            else:
-                # Plain text fallback
-                content = (review_data.get("review", str(review_data))
-                           if isinstance(review_data, dict)
-                           else str(review_data))
-                st.markdown(content)
-                st.download_button(
-                    "📥 Download Review",
-                    content,
-                    file_name=f"review_{st.session_state.fw_review_doc}.md",
-                    mime="text/markdown", key="dl_fw_review_md"
-                )
+            # Shape guaranteed by utils.schemas.REVIEW_RESULT
+            # Quality score
+            quality = review_data["document_quality_assessment"]
+            q1, q2, q3 = st.columns(3)
+            q1.metric("Overall Quality Score",
+                      f"{quality['overall_quality_score']}/10")
+            q2.metric("Framework", review_data.get("framework", ""))
+            q3.metric("Review Date", review_data.get("review_date", "")[:10])
+
+            # Findings
+            findings = review_data["specific_findings"]
+            if findings:
+                st.subheader("🔎 Specific Findings")
+                for f in findings:
+                    sev = f["severity"]
+                    icon = {"Critical": "🔴", "High": "🟠",
+                            "Medium": "🟡", "Low": "🟢",
+                            "Informational": "ℹ️"}.get(sev, "⬜")
+                    with st.expander(
+                        f"{icon} [{sev}] "
+                        f"{f['finding_id']}: {f.get('section', 'General')}",
+                        expanded=(sev in ["Critical", "High"])
+                    ):
+                        st.write(f"**Issue:** {f['description']}")
+                        st.write(f"**Recommendation:** {f['recommendation']}")
+                        ref = f.get("framework_reference", "")
+                        if ref:
+                            st.write(f"**Framework Reference:** {ref}")
+
+            # Gaps
+            gaps = review_data["content_gaps"]
+            if gaps:
+                st.subheader("🕳️ Content Gaps")
+                for g in gaps:
+                    st.write(f"- **{g['topic']}**: {g['description']}")
+
+            # Positive observations
+            positives = review_data.get("positive_observations", [])
+            if positives:
+                st.subheader("✅ Positive Observations")
+                for p in positives:
+                    st.write(f"- {p}")
+
+            # Recommended actions
+            actions = review_data["recommended_actions"]
+            if actions:
+                st.subheader("📋 Recommended Actions")
+                for idx, a in enumerate(actions, 1):
+                    st.write(f"{idx}. **{a['action']}** — {a['description']}")
+
+            # Download full review
+            st.download_button(
+                "📥 Download Full Review (JSON)",
+                json.dumps(review_data, indent=2),
+                file_name=f"review_{st.session_state.fw_review_doc}.json",
+                mime="application/json", key="dl_fw_review"
+            )
 
     # ---- QUALITY ASSESSMENT ----
     elif "Quality Assessment" in review_mode:
@@ -1188,6 +1238,7 @@ def render_tab_risk_register(company: dict, framework: str):
                 try:
                     # Convert description into pseudo gap results
                     from utils.ai_client import structured_output
+                    from utils.schemas import GAP_RESULTS
                     system_prompt = f"""You are a risk analyst. Convert the following risk 
 description into gap assessment format for risk register generation.
 For each risk area, create an entry with:
@@ -1200,11 +1251,9 @@ Return as a JSON array."""
 
                     pseudo_gaps = structured_output(
                         system_prompt,
-                        f"Risk areas:\n{risk_desc}"
+                        f"Risk areas:\n{risk_desc}",
+                        schema=GAP_RESULTS,
                     )
-                    if isinstance(pseudo_gaps, dict):
-                        pseudo_gaps = pseudo_gaps.get("gaps",
-                                     pseudo_gaps.get("results", [pseudo_gaps]))
 
                     risks = risk_engine.generate_from_gap_assessment(pseudo_gaps)
                     st.session_state.risk_register = risks
@@ -1342,11 +1391,12 @@ Return as a JSON array."""
 
         with ex3:
             if st.button("📝 Generate Treatment Plans", key="gen_treatment"):
-                with st.spinner("Generating detailed treatment plans..."):
-                    engine = st.session_state.get("risk_engine", risk_engine)
-                    engine.risks = risks
-                    plans = engine.generate_risk_treatment_plans()
-                    st.session_state.treatment_plans = plans
+                engine = st.session_state.get("risk_engine", risk_engine)
+                engine.risks = risks
+                live = StreamingMarkdown()
+                plans = engine.generate_risk_treatment_plans(on_token=live)
+                live.clear()
+                st.session_state.treatment_plans = plans
 
         if "treatment_plans" in st.session_state:
             with st.expander("📝 Risk Treatment Plans", expanded=True):
@@ -1552,24 +1602,26 @@ def render_tab_audit_readiness(company: dict, framework: str):
 
         if st.button("✅ Assess Readiness", type="primary",
                      key="run_ar"):
-            with st.spinner("Assessing audit readiness..."):
-                try:
-                    gap_data = st.session_state.get("gap_results")
-                    ev_summary = None
-                    if has_evidence:
-                        trk = st.session_state.get("evidence_tracker")
-                        if trk:
-                            ev_summary = trk.get_collection_summary()
-
-                    result = assessor.assess_readiness(
-                        gap_results=gap_data,
-                        evidence_summary=ev_summary,
-                        policy_list=policy_list,
-                    )
-                    st.session_state.ar_result = result
-                except Exception as e:
-                    st.error(f"Assessment failed: {e}")
-                    st.exception(e)
+            live = StreamingMarkdown()
+            try:
+                gap_data = st.session_state.get("gap_results")
+                ev_summary = None
+                if has_evidence:
+                    trk = st.session_state.get("evidence_tracker")
+                    if trk:
+                        ev_summary = trk.get_collection_summary()
+
+                result = assessor.assess_readiness(
+                    gap_results=gap_data,
+                    evidence_summary=ev_summary,
+                    policy_list=policy_list,
+                    on_token=live,
+                )
+                st.session_state.ar_result = result
+            except Exception as e:
+                st.error(f"Assessment failed: {e}")
+                st.exception(e)
+            live.clear()
 
         if "ar_result" in st.session_state:
             st.divider()
@@ -1614,6 +1666,46 @@ def render_tab_audit_readiness(company: dict, framework: str):
             )
 
 
+# ============================================================
+# TAB 7 — CONTROL SEARCH
+# ============================================================
+def render_tab_control_search(framework: str):
+    st.header("🔎 Control Search")
+    st.write("Find controls by keyword, tool name or control ID across "
+             "every loaded framework.")
+
+    available = get_registry().available()
+    c1, c2 = st.columns([3, 1])
+    with c1:
+        query = st.text_input(
+            "Search controls", key="cs_query",
+            placeholder='e.g. "MFA", "backup", "vendor risk", "PR.AA"')
+    with c2:
+        k = st.number_input("Results", min_value=5, max_value=100,
+                            value=20, step=5, key="cs_k")
+    selected = st.multiselect(
+        "Frameworks", available, key="cs_frameworks",
+        default=[framework] if framework in available else available)
+
+    if not query.strip():
+        return
+    if not selected:
+        st.info("Select at least one framework to search.")
+        return
+
+    hits = search_controls(query, selected, int(k))
+    if not hits:
+        st.info(f"No controls match \"{query}\".")
+        return
+
+    st.caption(f"{len(hits)} best matches")
+    df = pd.DataFrame(hits)[[
+        "framework", "control_id", "description", "category",
+        "function", "score",
+    ]]
+    st.dataframe(df, hide_index=True, use_container_width=True)
+
+
 # ============================================================
 # MAIN APPLICATION ENTRY POINT
 # ============================================================
@@ -1640,13 +1732,14 @@ def main():
         st.stop()
 
     # Main tabs
-    tab1, tab2, tab3, tab4, tab5, tab6 = st.tabs([
+    tab1, tab2, tab3, tab4, tab5, tab6, tab7 = st.tabs([
         "🔍 Gap Assessment",
         "📋 Policy Generator",
         "📄 Document Review",
         "⚠️ Risk Register",
         "📁 Evidence Tracker",
         "✅ Audit Readiness",
+        "🔎 Control Search",
     ])
 
     with tab1:
@@ -1667,6 +1760,12 @@ def main():
     with tab6:
         render_tab_audit_readiness(company, framework)
 
+    with tab7:
+        render_tab_control_search(framework)
+
+    # Rendered last so it includes the calls made during this rerun
+    render_llm_usage()
+
 
 # ============================================================
 # RUN